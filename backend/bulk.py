@@ -0,0 +1,97 @@
+"""
+Dialect-aware bulk writes: INSERT ... ON CONFLICT on SQLite and
+PostgreSQL, and COPY for large PostgreSQL batches
+"""
+import io
+import os
+from datetime import date, datetime
+from typing import List, Optional
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+# Batches at least this large are loaded with COPY on PostgreSQL
+BULK_COPY_MIN_ROWS = int(os.getenv("BULK_COPY_MIN_ROWS", "500"))
+
+_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def insert_statement(db: Session, model: type):
+    """
+    INSERT for `model` that supports on_conflict_do_nothing / on_conflict_do_update
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect not in _INSERTS:
+        raise NotImplementedError(f"No upsert support for the {dialect} dialect")
+    return _INSERTS[dialect](model)
+
+
+def bulk_insert(db: Session, model: type, rows: List[dict], conflict_columns: Optional[List[str]] = None):
+    """
+    Insert `rows` (dicts with the same keys) in the session's transaction.
+    With `conflict_columns`, rows that collide with an existing row on
+    them are skipped. Large PostgreSQL batches go through COPY (psycopg2).
+    """
+    if not rows:
+        return
+    dialect = db.get_bind().dialect
+    if dialect.name == "postgresql" and dialect.driver == "psycopg2" and len(rows) >= BULK_COPY_MIN_ROWS:
+        _copy_rows(db, model.__table__, rows, conflict_columns)
+        return
+    stmt = insert_statement(db, model)
+    if conflict_columns:
+        stmt = stmt.on_conflict_do_nothing(index_elements=conflict_columns)
+    db.execute(stmt, rows)
+
+
+def _copy_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _with_defaults(table, rows: List[dict]) -> List[dict]:
+    """
+    Fill in Python-side column defaults, which COPY bypasses
+    """
+    defaults = {}
+    for column in table.columns:
+        if column.name in rows[0] or column.primary_key or column.default is None:
+            continue
+        if column.default.is_callable:
+            defaults[column.name] = column.default.arg(None)
+        elif column.default.is_scalar:
+            defaults[column.name] = column.default.arg
+    return [{**defaults, **row} for row in rows] if defaults else rows
+
+
+def _copy_rows(db: Session, table, rows: List[dict], conflict_columns: Optional[List[str]]):
+    rows = _with_defaults(table, rows)
+    columns = list(rows[0])
+    column_list = ", ".join(columns)
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(row[name]) for name in columns))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        if not conflict_columns:
+            cursor.copy_expert(f"COPY {table.name} ({column_list}) FROM STDIN", buffer)
+            return
+        # COPY cannot skip conflicts: stage the rows, then INSERT ... SELECT ... ON CONFLICT
+        staging = f"_bulk_{table.name}"
+        cursor.execute(f"CREATE TEMP TABLE {staging} AS SELECT {column_list} FROM {table.name} WITH NO DATA")
+        cursor.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN", buffer)
+        cursor.execute(
+            f"INSERT INTO {table.name} ({column_list}) SELECT {column_list} FROM {staging} "
+            f"ON CONFLICT ({', '.join(conflict_columns)}) DO NOTHING"
+        )
+        cursor.execute(f"DROP TABLE {staging}")
+    finally:
+        cursor.close()
@@ -0,0 +1,275 @@
+"""
+In-memory LRU cache with TTL and an optional SQLite persistence tier,
+plus single-flight coalescing of concurrent identical calls
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class TTLCache:
+    """
+    Bounded LRU cache of JSON-serializable values.
+
+    Entries expire after `ttl_seconds` (never, if None). When `db_path` is
+    given, entries are written through to a SQLite table so they survive
+    restarts and are shared between workers; memory misses fall back to it.
+    Writes to that tier run on a dedicated writer thread, and coroutines
+    read it with aget(), so the event loop never waits on SQLite.
+    """
+
+    # Access-time updates of persistent entries are written in batches of this size
+    TOUCH_BATCH_SIZE = 256
+
+    def __init__(self, name: str, max_entries: int = 1024, ttl_seconds: Optional[float] = None,
+                 db_path: Optional[str] = None, max_persistent_entries: Optional[int] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.max_persistent_entries = max_persistent_entries
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self._touched: Dict[str, float] = {}  # key -> accessed_at not yet written
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"cache-{name}") if db_path else None
+        if db_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS cache_entries ("
+                    "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                    "expires_at REAL, accessed_at REAL NOT NULL, "
+                    "PRIMARY KEY (namespace, key))"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed "
+                    "ON cache_entries (namespace, accessed_at)"
+                )
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shareable across threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # a cache can lose its last writes on power loss
+            self._local.conn = conn
+        return conn
+
+    def _expiry(self) -> Optional[float]:
+        return time.time() + self.ttl_seconds if self.ttl_seconds else None
+
+    def get(self, key: str) -> Any:
+        """
+        Return the cached value for `key`, or None on a miss
+        """
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is None and self.db_path:
+            value = self._promote(key, self._get_persistent(key, now))
+        return value
+
+    async def aget(self, key: str) -> Any:
+        """
+        get() for coroutines: a memory miss reads the SQLite tier in a worker thread
+        """
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is None and self.db_path:
+            value = self._promote(key, await asyncio.to_thread(self._get_persistent, key, now))
+        return value
+
+    def set(self, key: str, value: Any):
+        """
+        Store `value` under `key`, evicting the least recently used entries.
+        The SQLite write is queued on the writer thread; callers never wait for it.
+        """
+        expires_at = self._expiry()
+        with self._lock:
+            self._store(key, expires_at, value)
+        if self.db_path:
+            self._writer.submit(self._set_persistent, key, expires_at, value)
+
+    def flush(self):
+        """
+        Wait for queued SQLite writes, including pending access times
+        """
+        if self.db_path:
+            self._writer.submit(self._write_touches).result()
+
+    def close(self):
+        """
+        Flush and stop the writer thread. Called on application shutdown.
+        """
+        if self.db_path:
+            self.flush()
+            self._writer.shutdown(wait=True)
+
+    def _get_memory(self, key: str, now: float) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            if not self.db_path:
+                self.misses += 1
+        return None
+
+    def _promote(self, key: str, entry) -> Any:
+        # Count a lookup that fell through to the SQLite tier, keeping a hit in memory
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.persistent_hits += 1
+            self._store(key, entry[0], entry[1])
+            return entry[1]
+
+    def _store(self, key: str, expires_at: Optional[float], value: Any):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _get_persistent(self, key: str, now: float):
+        # Read-only: expired rows are trimmed and access times recorded by the writer thread
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+            (self.name, key)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= now:
+            return None
+        with self._lock:
+            self._touched[key] = now
+            full = len(self._touched) == self.TOUCH_BATCH_SIZE
+        if full:
+            self._writer.submit(self._write_touches)
+        return expires_at, json.loads(value)
+
+    def _apply_touches(self, conn: sqlite3.Connection):
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        if touched:
+            conn.executemany(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                [(accessed_at, self.name, key) for key, accessed_at in touched.items()]
+            )
+
+    def _write_touches(self):
+        conn = self._connect()
+        self._apply_touches(conn)
+        conn.commit()
+
+    def _set_persistent(self, key: str, expires_at: Optional[float], value: Any):
+        try:
+            self._write_persistent(key, expires_at, value)
+        except sqlite3.Error as e:
+            # Runs on the writer thread, where nobody would see the exception
+            print(f"Cache write failed ({self.name}): {e}")
+
+    def _write_persistent(self, key: str, expires_at: Optional[float], value: Any):
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (self.name, key, json.dumps(value), expires_at, now)
+        )
+        self._apply_touches(conn)
+        self._writes += 1
+        # Trim expired and least recently used rows every so often, not on every write
+        if self._writes % 100 == 0:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+                (self.name, now)
+            )
+            if self.max_persistent_entries:
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+                    "SELECT key FROM cache_entries WHERE namespace = ? "
+                    "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.name, self.name, self.max_persistent_entries)
+                )
+        conn.commit()
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters and current size
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "persistent_hits": self.persistent_hits,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "ttl_seconds": self.ttl_seconds,
+            "persistent": bool(self.db_path),
+            "persistent_entries": self.persistent_size() if self.db_path else None,
+            "max_persistent_entries": self.max_persistent_entries,
+        }
+
+    def persistent_size(self) -> int:
+        """
+        Number of entries in the SQLite tier
+        """
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.name,)
+        ).fetchone()[0]
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one in-flight call.
+
+    The shared call runs as its own task, so a caller that is cancelled
+    (e.g. a client disconnect) does not cancel it for everyone else.
+    """
+
+    def __init__(self):
+        self.executed = 0
+        self.coalesced = 0
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+        }
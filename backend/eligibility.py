@@ -0,0 +1,193 @@
+"""
+Cheap, local eligibility checks used to pre-filter trials before any LLM call
+"""
+import re
+from typing import List, Optional, Tuple
+
+_UNIT_TO_YEARS = {"year": 1.0, "month": 1 / 12, "week": 1 / 52, "day": 1 / 365}
+_AGE = r"(\d+(?:\.\d+)?)\s*(years?|months?|weeks?|days?)"
+
+# Every pattern needs an age keyword ("age", "aged", "... of age", "... old"): bare
+# comparisons such as "life expectancy >= 3 months" or "<= 4 weeks" are durations
+_OF_AGE = r"\s*(?:of\s+age|old)"
+_MIN_AGE_PATTERNS = [
+    re.compile(r"\bminimum\s+age\s*:?\s*" + _AGE, re.I),
+    re.compile(r"\b(?:aged?|age\s+of)\s*:?\s*(?:>=|≥|at\s+least)\s*" + _AGE, re.I),
+    re.compile(_AGE + r"\s*(?:of\s+age\s+|old\s+)?(?:and|or)\s+(?:older|over|above)", re.I),
+    re.compile(r"(?:≥|>=|at\s+least)\s*" + _AGE + _OF_AGE, re.I),
+]
+_MAX_AGE_PATTERNS = [
+    re.compile(r"\bmaximum\s+age\s*:?\s*" + _AGE, re.I),
+    re.compile(r"\b(?:aged?|age\s+of)\s*:?\s*(?:<=|≤|at\s+most|up\s+to)\s*" + _AGE, re.I),
+    re.compile(_AGE + r"\s*(?:of\s+age\s+|old\s+)?(?:and|or)\s+(?:younger|under|below)", re.I),
+    re.compile(r"(?:≤|<=|at\s+most)\s*" + _AGE + _OF_AGE, re.I),
+]
+_RANGE = r"(\d+(?:\.\d+)?)\s*(?:(years?|months?)\s*)?(?:-|–|to|and)\s*(\d+(?:\.\d+)?)\s*(years?|months?)"
+_AGE_RANGES = [
+    re.compile(r"\b(?:aged?|ages)\s*:?\s*(?:between\s+|from\s+)?" + _RANGE, re.I),
+    re.compile(r"\b(?:between|from)\s+" + _RANGE + _OF_AGE, re.I),
+]
+_SEX_FIELD = re.compile(r"(?:sex|gender)\s*:\s*(all|both|female|male|women|men)", re.I)
+_SEX_ONLY = re.compile(r"\b(female|male|women|men)\s+(?:patients?\s+|participants?\s+|subjects?\s+)?only\b", re.I)
+_EXCLUSION_HEADER = re.compile(r"exclusion\s+criteria\s*:?", re.I)
+
+_STOPWORDS = {
+    "and", "or", "the", "of", "in", "with", "for", "to", "a", "an", "on", "by", "type",
+    "disease", "disorder", "syndrome", "chronic", "acute", "patients", "patient",
+}
+
+
+def _years(value: str, unit: str) -> float:
+    return float(value) * _UNIT_TO_YEARS[unit.lower().rstrip("s")]
+
+
+def parse_age_bounds(text: Optional[str]) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Minimum and maximum age in years mentioned in eligibility text, if any
+    """
+    if not text:
+        return None, None
+    min_age = max_age = None
+    for pattern in _MIN_AGE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            min_age = _years(*match.groups())
+            break
+    for pattern in _MAX_AGE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            max_age = _years(*match.groups())
+            break
+    if min_age is None and max_age is None:
+        for pattern in _AGE_RANGES:
+            match = pattern.search(text)
+            if match:
+                low, low_unit, high, high_unit = match.groups()
+                min_age, max_age = _years(low, low_unit or high_unit), _years(high, high_unit)
+                break
+    return min_age, max_age
+
+
+def parse_age(value: Optional[str]) -> Optional[float]:
+    """
+    Convert a ClinicalTrials.gov age such as "18 Years" or "6 Months" to years
+    """
+    if not value:
+        return None
+    match = re.fullmatch(r"\s*" + _AGE + r"\s*", value, re.I)
+    return _years(*match.groups()) if match else None
+
+
+def normalize_sex(value: Optional[str]) -> Optional[str]:
+    """
+    Map free-text sex/gender to "FEMALE", "MALE" or None (no restriction / unknown)
+    """
+    if not value:
+        return None
+    value = value.strip().lower()
+    if value in ("female", "women", "woman", "f"):
+        return "FEMALE"
+    if value in ("male", "men", "man", "m"):
+        return "MALE"
+    return None
+
+
+def parse_sex(text: Optional[str]) -> Optional[str]:
+    """
+    Sex restriction stated in eligibility text: "FEMALE", "MALE" or None
+    """
+    if not text:
+        return None
+    match = _SEX_FIELD.search(text) or _SEX_ONLY.search(text)
+    return normalize_sex(match.group(1)) if match else None
+
+
+def split_criteria(text: Optional[str]) -> Tuple[str, str]:
+    """
+    Split eligibility text into its inclusion and exclusion sections
+    """
+    if not text:
+        return "", ""
+    match = _EXCLUSION_HEADER.search(text)
+    if not match:
+        return text, ""
+    return text[:match.start()], text[match.end():]
+
+
+def structured_eligibility(module: dict) -> dict:
+    """
+    Typed eligibility fields from a ClinicalTrials.gov eligibilityModule.
+    Free-text criteria are split into inclusion and exclusion sections.
+    The structured age fields are authoritative (a minimumAge without a
+    maximumAge means no upper limit); ages are parsed from the text only
+    when the module has neither. Sex falls back to the text the same way.
+    """
+    criteria = module.get("eligibilityCriteria") or ""
+    inclusion, exclusion = split_criteria(criteria)
+    if "minimumAge" in module or "maximumAge" in module:
+        min_age = parse_age(module.get("minimumAge"))
+        max_age = parse_age(module.get("maximumAge"))
+    else:
+        min_age, max_age = parse_age_bounds(criteria)
+    sex = (module.get("sex") or "").upper() or None
+    healthy_volunteers = module.get("healthyVolunteers")
+    return {
+        "eligibility": criteria or None,
+        "min_age_years": min_age,
+        "max_age_years": max_age,
+        "sex": sex if sex in ("ALL", "FEMALE", "MALE") else parse_sex(criteria),
+        "healthy_volunteers": healthy_volunteers if isinstance(healthy_volunteers, bool) else None,
+        "inclusion_criteria": inclusion.strip() or None,
+        "exclusion_criteria": exclusion.strip() or None,
+    }
+
+
+def keywords(text: Optional[str]) -> List[str]:
+    """
+    Lower-cased content words used for condition matching. Numbers are
+    kept so that e.g. "type 1" and "type 2" diabetes stay distinct.
+    """
+    if not text:
+        return []
+    return [
+        word for word in re.findall(r"[a-z0-9]+", text.lower())
+        if (len(word) > 2 or word.isdigit()) and word not in _STOPWORDS
+    ]
+
+
+def prefilter(patient_age: Optional[float], patient_sex: Optional[str], patient_condition: str,
+              trial_condition: Optional[str], eligibility: Optional[str],
+              min_age: Optional[float] = None, max_age: Optional[float] = None,
+              sex: Optional[str] = None) -> Tuple[bool, float, List[str]]:
+    """
+    Screen one patient against one trial without an LLM.
+
+    Age bounds and sex come from the trial's structured columns when known
+    and are otherwise parsed from the eligibility text. Returns
+    (passes, score, reasons): a trial fails on a hard age or sex mismatch
+    or when the patient's condition is listed as an exclusion; the score
+    (0-1) ranks survivors by how well the condition matches.
+    """
+    reasons = []
+    if min_age is None and max_age is None:
+        min_age, max_age = parse_age_bounds(eligibility)
+    if patient_age is not None:
+        if min_age is not None and patient_age < min_age:
+            reasons.append(f"Below minimum age ({min_age:g} years)")
+        if max_age is not None and patient_age > max_age:
+            reasons.append(f"Above maximum age ({max_age:g} years)")
+
+    required_sex = normalize_sex(sex) if sex else parse_sex(eligibility)
+    patient_sex = normalize_sex(patient_sex)
+    if required_sex and patient_sex and required_sex != patient_sex:
+        reasons.append(f"Trial enrolls {required_sex.lower()} participants only")
+
+    condition_words = set(keywords(patient_condition))
+    inclusion, exclusion = split_criteria(eligibility)
+    target_words = set(keywords(trial_condition)) | set(keywords(inclusion))
+    # Only trust an exclusion match when the trial is not about that condition
+    if condition_words and condition_words <= set(keywords(exclusion)) and not condition_words <= target_words:
+        reasons.append("Condition is listed under exclusion criteria")
+
+    score = len(condition_words & target_words) / len(condition_words) if condition_words else 0.0
+    return not reasons, round(score, 4), reasons
@@ -0,0 +1,167 @@
+"""
+Geospatial helpers: SQLite R*Tree indexes over trial, trial-site and user
+coordinates, with radius and nearest-neighbour queries
+"""
+import math
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query
+
+from models import ExternalTrialSite, Trial, User
+
+EARTH_RADIUS_KM = 6371.0
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM  # half the circumference: every point is within it
+KNN_START_RADIUS_KM = 25.0
+
+# model -> R*Tree table name
+SPATIAL_INDEXES: Dict[type, str] = {
+    Trial: "trials_geo",
+    ExternalTrialSite: "external_trial_sites_geo",
+    User: "users_geo",
+}
+
+# False until init_spatial_index() has built the indexes (and always on non-SQLite databases)
+rtree_enabled = False
+
+
+def _index_ddl(source: str, rtree: str) -> List[str]:
+    point = "new.latitude, new.latitude, new.longitude, new.longitude"
+    has_point = "new.latitude IS NOT NULL AND new.longitude IS NOT NULL"
+    # Points are stored as degenerate boxes; triggers keep the tree in sync with the source table
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {rtree} USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+        f"CREATE TRIGGER IF NOT EXISTS {rtree}_ai AFTER INSERT ON {source} WHEN {has_point} BEGIN "
+        f"INSERT INTO {rtree} VALUES (new.id, {point}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {rtree}_ad AFTER DELETE ON {source} BEGIN "
+        f"DELETE FROM {rtree} WHERE id = old.id; END",
+        f"CREATE TRIGGER IF NOT EXISTS {rtree}_au AFTER UPDATE OF latitude, longitude ON {source} BEGIN "
+        f"DELETE FROM {rtree} WHERE id = old.id; "
+        f"INSERT INTO {rtree} SELECT new.id, {point} WHERE {has_point}; END",
+    ]
+
+
+def init_spatial_index(engine: Engine):
+    """
+    Create the R*Tree tables and sync triggers if missing, and load rows
+    that existed before them. Queries fall back to a bounding box on the
+    latitude/longitude columns when the database is not SQLite or lacks R*Tree.
+    """
+    global rtree_enabled
+    if engine.dialect.name != "sqlite":
+        return
+    try:
+        with engine.begin() as conn:
+            existing = {
+                name for (name,) in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'")
+            }
+            for model, rtree in SPATIAL_INDEXES.items():
+                source = model.__tablename__
+                for statement in _index_ddl(source, rtree):
+                    conn.exec_driver_sql(statement)
+                if rtree not in existing:
+                    conn.exec_driver_sql(
+                        f"INSERT INTO {rtree} SELECT id, latitude, latitude, longitude, longitude "
+                        f"FROM {source} WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+                    )
+        rtree_enabled = True
+    except Exception as e:
+        print(f"Spatial index unavailable, falling back to bounding-box filters: {e}")
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle distance in kilometres
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> Tuple[float, float, Optional[float], Optional[float]]:
+    """
+    (min_lat, max_lat, min_lon, max_lon) enclosing the circle. The longitude
+    bounds are None when the circle reaches a pole or crosses the antimeridian.
+    """
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), None, None
+    dlon = math.degrees(math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat)))))
+    if lon - dlon < -180 or lon + dlon > 180:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, lon - dlon, lon + dlon
+
+
+def filter_bounding_box(query: Query, model: type, lat: float, lon: float, radius_km: float) -> Query:
+    """
+    Restrict `query` to rows whose coordinates fall in the circle's bounding
+    box: an R*Tree lookup, or a range filter on the indexed columns without it
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    if not rtree_enabled:
+        query = query.filter(model.latitude.between(min_lat, max_lat), model.longitude.isnot(None))
+        if min_lon is not None:
+            query = query.filter(model.longitude.between(min_lon, max_lon))
+        return query
+    rtree = SPATIAL_INDEXES[model]
+    conditions = "min_lat <= :max_lat AND max_lat >= :min_lat"
+    params = {"min_lat": min_lat, "max_lat": max_lat}
+    if min_lon is not None:
+        conditions += " AND min_lon <= :max_lon AND max_lon >= :min_lon"
+        params.update(min_lon=min_lon, max_lon=max_lon)
+    ids = select(text("id")).select_from(text(rtree)).where(text(conditions).bindparams(**params))
+    return query.filter(model.id.in_(ids))
+
+
+def within_radius(query: Query, model: type, lat: float, lon: float, radius_km: float) -> List[Tuple[object, float]]:
+    """
+    (row, distance_km) for rows of `query` within `radius_km`, nearest first
+    """
+    rows = filter_bounding_box(query, model, lat, lon, radius_km).all()
+    matches = [(row, haversine_km(lat, lon, row.latitude, row.longitude)) for row in rows]
+    matches = [(row, distance) for row, distance in matches if distance <= radius_km]
+    matches.sort(key=lambda match: match[1])
+    return matches
+
+
+def nearest(query: Query, model: type, lat: float, lon: float, k: int) -> List[Tuple[object, float]]:
+    """
+    The k rows of `query` nearest to (lat, lon), found by doubling the
+    search radius until enough rows are inside it
+    """
+    radius_km = KNN_START_RADIUS_KM
+    while True:
+        matches = within_radius(query, model, lat, lon, radius_km)
+        if len(matches) >= k or radius_km >= MAX_DISTANCE_KM:
+            return matches[:k]
+        radius_km = min(radius_km * 2, MAX_DISTANCE_KM)
+
+
+def proximity_mode(lat: Optional[float], lon: Optional[float],
+                   radius_km: Optional[float], nearest_k: Optional[int]) -> bool:
+    """
+    Whether list-endpoint parameters ask for a proximity search; rejects incomplete ones
+    """
+    if radius_km is None and not nearest_k:
+        return False
+    if lat is None or lon is None:
+        raise HTTPException(status_code=400, detail="lat and lon are required with radius_km or nearest")
+    if radius_km is not None and radius_km <= 0:
+        raise HTTPException(status_code=400, detail="radius_km must be positive")
+    return True
+
+
+def proximity_search(query: Query, model: type, lat: float, lon: float,
+                     radius_km: Optional[float] = None, k: Optional[int] = None) -> List[Tuple[object, float]]:
+    """
+    Radius mode (`radius_km`), kNN mode (`k`) or both: the k nearest within the radius
+    """
+    if radius_km is not None:
+        matches = within_radius(query, model, lat, lon, radius_km)
+        return matches[:k] if k else matches
+    return nearest(query, model, lat, lon, k or 10)
@@ -0,0 +1,281 @@
+"""
+Shared outbound HTTP clients for CuraLink's external integrations
+"""
+import asyncio
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+# Connection pool sizing, applied separately to every upstream host
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+HTTP_MAX_KEEPALIVE_PER_HOST = int(os.getenv("HTTP_MAX_KEEPALIVE_PER_HOST", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+
+# One pooled, keep-alive client per upstream origin (scheme://host:port)
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def get_client(url: str) -> httpx.AsyncClient:
+    """
+    Get the shared async client for the host serving `url`.
+    Each host gets its own connection pool, so the pool limits act as
+    per-host connection limits.
+    """
+    origin = _origin(url)
+    client = _clients.get(origin)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS_PER_HOST,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_PER_HOST,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            timeout=HTTP_TIMEOUT,
+        )
+        _clients[origin] = client
+    return client
+
+
+async def close_clients():
+    """
+    Close every pooled client. Called on application shutdown.
+    """
+    for client in list(_clients.values()):
+        await client.aclose()
+    _clients.clear()
+
+
+class RateLimiter:
+    """
+    Async token-bucket rate limiter: `rate` requests per second with bursts
+    of up to `burst` requests
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """
+        Wait until a request may be sent. Returns the seconds spent waiting.
+        """
+        started = time.monotonic()
+        waited = False
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return now - started if waited else 0.0
+                waited = True
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class UpstreamUnavailable(Exception):
+    """
+    Raised when an upstream call fails after retries or its circuit is open
+    """
+
+    def __init__(self, upstream: str, reason: str, retry_after: Optional[float] = None):
+        super().__init__(f"{upstream} is unavailable: {reason}")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and fails fast
+    until `reset_timeout` seconds have passed. Then a single probe request
+    is let through (half-open): success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+            return True
+        # Open, or a half-open probe is already in flight
+        return False
+
+    def retry_after(self) -> float:
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+
+    def release_probe(self):
+        """
+        Give up a half-open probe that ended without an outcome (it was
+        cancelled), so the next call can probe again right away
+        """
+        if self.state == "half_open":
+            self.state = "open"
+
+
+# Responses worth retrying: throttling and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "2"))
+UPSTREAM_BACKOFF_BASE = float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.5"))
+UPSTREAM_BACKOFF_MAX = float(os.getenv("UPSTREAM_BACKOFF_MAX", "8"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+_upstreams: Dict[str, "Upstream"] = {}
+
+
+class Upstream:
+    """
+    Outbound-call policy for one external API: a token-bucket rate limiter,
+    a circuit breaker and jittered exponential-backoff retries.
+
+    Only GET is exposed, so every retried request is idempotent.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int = 1,
+                 max_retries: int = UPSTREAM_MAX_RETRIES,
+                 failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.name = name
+        self.max_retries = max_retries
+        self.limiter = RateLimiter(rate, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.metrics = {
+            "requests": 0,
+            "successes": 0,
+            "failures": 0,
+            "retries": 0,
+            "throttled_responses": 0,
+            "rate_limited": 0,
+            "rate_limit_wait_seconds": 0.0,
+            "short_circuited": 0,
+        }
+        _upstreams[name] = self
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), UPSTREAM_BACKOFF_MAX)
+            except ValueError:
+                pass
+        # Full jitter keeps concurrent retries from synchronizing
+        return random.uniform(0, min(UPSTREAM_BACKOFF_MAX, UPSTREAM_BACKOFF_BASE * 2 ** attempt))
+
+    async def _send(self, url: str, params: Optional[dict], headers: Optional[dict], stream: bool) -> httpx.Response:
+        if not self.breaker.allow():
+            self.metrics["short_circuited"] += 1
+            raise UpstreamUnavailable(self.name, "circuit open", self.breaker.retry_after())
+
+        # Every path out records an outcome, or a half-open probe would hold the circuit forever
+        try:
+            response = await self._send_with_retries(url, params, headers, stream)
+        except Exception:
+            self.metrics["failures"] += 1
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled, e.g. the caller's client disconnected: says nothing about the upstream
+            self.breaker.release_probe()
+            raise
+        self.metrics["successes"] += 1
+        self.breaker.record_success()
+        return response
+
+    async def _send_with_retries(self, url: str, params: Optional[dict], headers: Optional[dict],
+                                 stream: bool) -> httpx.Response:
+        client = get_client(url)
+        reason = ""
+        for attempt in range(self.max_retries + 1):
+            waited = await self.limiter.acquire()
+            if waited > 0:
+                self.metrics["rate_limited"] += 1
+                self.metrics["rate_limit_wait_seconds"] += waited
+            self.metrics["requests"] += 1
+
+            retry_after = None
+            try:
+                request = client.build_request("GET", url, params=params, headers=headers)
+                response = await client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                reason = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    return response
+                if response.status_code == 429:
+                    self.metrics["throttled_responses"] += 1
+                reason = f"HTTP {response.status_code}"
+                retry_after = response.headers.get("Retry-After")
+                await response.aclose()
+
+            if attempt < self.max_retries:
+                self.metrics["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+
+        raise UpstreamUnavailable(self.name, reason)
+
+    async def get(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> httpx.Response:
+        """
+        Rate-limited, retried GET returning the fully read response
+        """
+        return await self._send(url, params, headers, stream=False)
+
+    @asynccontextmanager
+    async def stream(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None):
+        """
+        Like get(), but the body is left unread so it can be consumed incrementally
+        """
+        response = await self._send(url, params, headers, stream=True)
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+    def stats(self) -> dict:
+        return {
+            **self.metrics,
+            "rate_limit_wait_seconds": round(self.metrics["rate_limit_wait_seconds"], 3),
+            "rate_per_second": self.limiter.rate,
+            "circuit_state": self.breaker.state,
+            "circuit_opened": self.breaker.times_opened,
+            "consecutive_failures": self.breaker.failures,
+        }
+
+
+def upstream_metrics() -> dict:
+    """
+    Metrics for every registered upstream, keyed by name
+    """
+    return {name: upstream.stats() for name, upstream in _upstreams.items()}
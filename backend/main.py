@@ -1,13 +1,27 @@
 """
 Main FastAPI application for CuraLink
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base
-from routers import users, trials, publications, forum, ai, connections, meetings, external_apis
+from fastapi.responses import JSONResponse
+from database import engine, Base, write_queue
+from geo import init_spatial_index
+from migrations import migration_engine, run_migrations
+from pagination import NEXT_CURSOR_HEADER
+from search_index import init_search_index
+from http_client import UpstreamUnavailable, close_clients
+from summary_pipeline import SUMMARY_PIPELINE_ENABLED, summary_pipeline
+from routers import users, trials, publications, forum, ai, connections, meetings, external_apis, search
+from routers import recommendations as recommendations_router
+import recommendations
+import vector_index
 
 # Create database tables
-Base.metadata.create_all(bind=engine)
+with migration_engine(engine) as schema_engine:
+    Base.metadata.create_all(bind=schema_engine)
+    run_migrations(schema_engine)
+init_search_index(engine)
+init_spatial_index(engine)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -28,6 +42,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include routers
@@ -39,6 +54,46 @@ app.include_router(ai.router, prefix="/api/ai", tags=["AI"])
 app.include_router(connections.router, prefix="/api/connections", tags=["Connections"])
 app.include_router(meetings.router, prefix="/api/meetings", tags=["Meeting Requests"])
 app.include_router(external_apis.router, prefix="/api/external", tags=["External APIs"])
+app.include_router(search.router, prefix="/api/search", tags=["Search"])
+app.include_router(recommendations_router.router, prefix="/api/recommendations", tags=["Recommendations"])
+
+
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailable):
+    """
+    Report a failing or circuit-broken external API as 503 instead of empty results
+    """
+    headers = {"Retry-After": str(int(exc.retry_after) + 1)} if exc.retry_after is not None else None
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers=headers)
+
+
+@app.on_event("startup")
+async def start_background_work():
+    """
+    Start the background summarization and embedding of cached external records,
+    and the recommendation backfill
+    """
+    if SUMMARY_PIPELINE_ENABLED:
+        summary_pipeline.start()
+    # Embed cached records that are missing from the semantic search index
+    vector_index.start_backfill()
+    # Score patients that have no precomputed recommendations yet
+    recommendations.start_backfill()
+
+
+@app.on_event("shutdown")
+async def shutdown_background_work():
+    """
+    Stop background work, drain queued database and cache writes and close
+    pooled outbound HTTP connections
+    """
+    await summary_pipeline.stop()
+    vector_index.stop()
+    recommendations.stop()
+    write_queue.stop()
+    ai.summary_cache.close()
+    external_apis.search_cache.close()
+    await close_clients()
 
 
 @app.get("/")
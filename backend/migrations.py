@@ -0,0 +1,201 @@
+"""
+Versioned schema migrations. create_all() only creates missing tables, so
+columns and indexes added to existing tables are applied here, once each,
+and recorded in the schema_version table.
+"""
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator, List, Tuple
+
+from sqlalchemy import Column, create_engine, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import NullPool
+
+from models import ExternalPublication, ExternalTrial, Trial
+
+
+class Migration:
+    """
+    New columns (taken from the models) and indexes (name, table, columns) for
+    one schema version. Every step is idempotent, so a migration that was
+    interrupted, or that create_all() already covered, can safely run again.
+    """
+
+    def __init__(self, version: int, description: str, columns: List[Column] = (),
+                 indexes: List[Tuple[str, str, List[str]]] = ()):
+        self.version = version
+        self.description = description
+        self.columns = list(columns)
+        self.indexes = list(indexes)
+
+    def add_columns(self, conn: Connection):
+        for column in self.columns:
+            table = column.table.name
+            if column.name not in {existing["name"] for existing in inspect(conn).get_columns(table)}:
+                ddl_type = column.type.compile(dialect=conn.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column.name} {ddl_type}")
+
+    def create_indexes(self, conn: Connection):
+        # CONCURRENTLY builds a Postgres index without blocking writes (it runs outside a transaction)
+        concurrently = " CONCURRENTLY" if conn.dialect.name == "postgresql" else ""
+        for name, table, columns in self.indexes:
+            if concurrently:
+                self.drop_if_invalid(conn, name)
+            conn.exec_driver_sql(
+                f"CREATE INDEX{concurrently} IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+            )
+
+    @staticmethod
+    def drop_if_invalid(conn: Connection, name: str):
+        # A failed or interrupted concurrent build leaves an INVALID index behind,
+        # which IF NOT EXISTS would then skip instead of rebuilding
+        valid = conn.execute(
+            text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"), {"name": name}
+        ).scalar()
+        if valid is False:
+            conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+    def apply(self, engine: Engine):
+        with engine.begin() as conn:
+            self.add_columns(conn)
+            if engine.dialect.name != "postgresql":
+                self.create_indexes(conn)
+        if engine.dialect.name == "postgresql":
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                self.create_indexes(conn)
+
+
+# Append only: never edit or reorder a migration that has shipped
+MIGRATIONS = [
+    Migration(1, "Change tracking for cached external trials", columns=[
+        ExternalTrial.__table__.c.content_hash,
+        ExternalTrial.__table__.c.updated_at,
+    ]),
+    Migration(2, "Structured eligibility for cached external trials", columns=[
+        ExternalTrial.__table__.c.min_age_years,
+        ExternalTrial.__table__.c.max_age_years,
+        ExternalTrial.__table__.c.sex,
+        ExternalTrial.__table__.c.healthy_volunteers,
+        ExternalTrial.__table__.c.inclusion_criteria,
+        ExternalTrial.__table__.c.exclusion_criteria,
+    ], indexes=[
+        ("ix_external_trials_min_age_years", "external_trials", ["min_age_years"]),
+        ("ix_external_trials_max_age_years", "external_trials", ["max_age_years"]),
+        ("ix_external_trials_sex", "external_trials", ["sex"]),
+    ]),
+    Migration(3, "Trial and user coordinates", columns=[
+        Trial.__table__.c.latitude,
+        Trial.__table__.c.longitude,
+    ], indexes=[
+        ("ix_trials_lat_lon", "trials", ["latitude", "longitude"]),
+        ("ix_users_lat_lon", "users", ["latitude", "longitude"]),
+    ]),
+    Migration(4, "Connection pair and keyset pagination indexes", indexes=[
+        ("ix_connections_requester_receiver", "connections", ["requester_id", "receiver_id"]),
+        ("ix_connections_receiver_requester", "connections", ["receiver_id", "requester_id"]),
+        ("ix_users_created_id", "users", ["created_at", "id"]),
+        ("ix_trials_created_id", "trials", ["created_at", "id"]),
+        ("ix_publications_created_id", "publications", ["created_at", "id"]),
+        ("ix_forum_posts_created_id", "forum_posts", ["created_at", "id"]),
+        ("ix_connections_created_id", "connections", ["created_at", "id"]),
+        ("ix_meeting_requests_created_id", "meeting_requests", ["created_at", "id"]),
+    ]),
+    Migration(5, "Foreign key and filter column indexes", indexes=[
+        ("ix_users_role_created", "users", ["role", "created_at", "id"]),
+        ("ix_trials_researcher_id", "trials", ["researcher_id"]),
+        ("ix_publications_researcher_id", "publications", ["researcher_id"]),
+        ("ix_forum_posts_author_id", "forum_posts", ["author_id"]),
+        ("ix_forum_posts_category", "forum_posts", ["category"]),
+        ("ix_forum_posts_parent_created", "forum_posts", ["parent_id", "created_at", "id"]),
+        ("ix_favorites_user_id", "favorites", ["user_id"]),
+        ("ix_connections_status", "connections", ["status"]),
+        ("ix_meeting_requests_requester_id", "meeting_requests", ["requester_id"]),
+        ("ix_meeting_requests_expert_id", "meeting_requests", ["expert_id"]),
+        ("ix_meeting_requests_status", "meeting_requests", ["status"]),
+    ]),
+    Migration(6, "Failed summarization attempts for cached external records", columns=[
+        ExternalPublication.__table__.c.summary_failures,
+        ExternalTrial.__table__.c.summary_failures,
+    ]),
+]
+
+
+@contextmanager
+def migration_engine(engine: Engine) -> Iterator[Engine]:
+    """
+    Engine for schema changes (create_all() and run_migrations()). On
+    PostgreSQL it is a separate, unpooled engine without the app's statement
+    timeout, which is sized for requests: index builds and table rewrites on
+    large tables outlast it.
+    """
+    if engine.dialect.name != "postgresql":
+        yield engine
+        return
+    schema_engine = create_engine(engine.url, connect_args={"options": "-c statement_timeout=0"}, poolclass=NullPool)
+    try:
+        yield schema_engine
+    finally:
+        schema_engine.dispose()
+
+
+# Session-level advisory lock key that serializes run_migrations() across workers on PostgreSQL
+MIGRATION_LOCK_KEY = 7_146_501_223
+
+
+@contextmanager
+def migration_lock(engine: Engine) -> Iterator[None]:
+    """
+    Hold the migration advisory lock on PostgreSQL, so one worker at a time
+    applies migrations (a worker whose migration is still building an index
+    CONCURRENTLY must not see that index dropped as INVALID by another).
+    The lock is released with its connection if the process dies.
+    """
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+
+def run_migrations(engine: Engine):
+    """
+    Apply pending migrations in version order. Run at startup after
+    create_all(), which has already created any missing tables, with an
+    engine from migration_engine().
+    """
+    with migration_lock(engine):
+        _apply_pending(engine)
+
+
+def _apply_pending(engine: Engine):
+    # Read under the lock: a worker that waited sees what the previous holder applied
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER PRIMARY KEY, description VARCHAR NOT NULL, applied_at TIMESTAMP NOT NULL)"
+        )
+        applied = {version for (version,) in conn.exec_driver_sql("SELECT version FROM schema_version")}
+
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        if migration.version in applied:
+            continue
+        start = time.perf_counter()
+        migration.apply(engine)
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    text("INSERT INTO schema_version (version, description, applied_at) "
+                         "VALUES (:version, :description, :applied_at)"),
+                    {"version": migration.version, "description": migration.description,
+                     "applied_at": datetime.utcnow()}
+                )
+        except IntegrityError:
+            pass  # another process recorded it first
+        print(f"Applied schema migration {migration.version}: {migration.description} "
+              f"({time.perf_counter() - start:.2f}s)")
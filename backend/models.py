@@ -1,7 +1,7 @@
 """
 SQLAlchemy ORM models for CuraLink
 """
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Boolean, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, DateTime, Boolean, Float, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -12,6 +12,12 @@ class User(Base):
     User model for both patients and researchers
     """
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_lat_lon", "latitude", "longitude"),
+        Index("ix_users_created_id", "created_at", "id"),
+        # Role filters (researcher lists, expert directory) in pagination order
+        Index("ix_users_role_created", "role", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -55,14 +61,20 @@ class Trial(Base):
     Clinical trial model
     """
     __tablename__ = "trials"
+    __table_args__ = (
+        Index("ix_trials_lat_lon", "latitude", "longitude"),
+        Index("ix_trials_created_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     condition = Column(String, nullable=False)
     phase = Column(String, nullable=False)  # Phase I, II, III, IV
     location = Column(String, nullable=False)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
     description = Column(Text, nullable=True)
-    researcher_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    researcher_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -74,11 +86,15 @@ class Publication(Base):
     Research publication model
     """
     __tablename__ = "publications"
+    # Keyset pagination order
+    __table_args__ = (
+        Index("ix_publications_created_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     summary = Column(Text, nullable=False)
-    researcher_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    researcher_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -90,12 +106,18 @@ class ForumPost(Base):
     Forum post model for community discussions
     """
     __tablename__ = "forum_posts"
+    __table_args__ = (
+        # Keyset pagination order
+        Index("ix_forum_posts_created_id", "created_at", "id"),
+        # Top-level posts (parent_id IS NULL) and a post's replies, in pagination order
+        Index("ix_forum_posts_parent_created", "parent_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    author_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     content = Column(Text, nullable=False)
     title = Column(String, nullable=True)
-    category = Column(String, nullable=True)  # e.g., "Cancer Research", "Clinical Trials"
+    category = Column(String, nullable=True, index=True)  # e.g., "Cancer Research", "Clinical Trials"
     is_question = Column(Boolean, default=False)  # True if posted by patient
     parent_id = Column(Integer, ForeignKey("forum_posts.id"), nullable=True)  # For replies
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -112,7 +134,7 @@ class Favorite(Base):
     __tablename__ = "favorites"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     item_type = Column(String, nullable=False)  # "trial", "publication", "expert", "collaborator"
     item_id = Column(Integer, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -126,11 +148,18 @@ class Connection(Base):
     Connection/Follow model for researcher collaborations and patient-expert follows
     """
     __tablename__ = "connections"
+    __table_args__ = (
+        # Both directions, for "is there a connection between A and B" lookups from either
+        # side; they also serve filters on requester_id or receiver_id alone
+        Index("ix_connections_requester_receiver", "requester_id", "receiver_id"),
+        Index("ix_connections_receiver_requester", "receiver_id", "requester_id"),
+        Index("ix_connections_created_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     requester_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     receiver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    status = Column(String, default="pending")  # "pending", "accepted", "rejected"
+    status = Column(String, default="pending", index=True)  # "pending", "accepted", "rejected"
     connection_type = Column(String, nullable=False)  # "follow" or "collaborate"
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -145,13 +174,17 @@ class MeetingRequest(Base):
     Meeting request model for patients to request meetings with experts
     """
     __tablename__ = "meeting_requests"
+    # Keyset pagination order
+    __table_args__ = (
+        Index("ix_meeting_requests_created_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    requester_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # Patient
-    expert_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # Researcher/Expert
+    requester_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)  # Patient
+    expert_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)  # Researcher/Expert
     message = Column(Text, nullable=True)
     contact_info = Column(String, nullable=True)
-    status = Column(String, default="pending")  # "pending", "accepted", "rejected"
+    status = Column(String, default="pending", index=True)  # "pending", "accepted", "rejected"
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -176,6 +209,7 @@ class ExternalPublication(Base):
     publication_date = Column(String, nullable=True)
     url = Column(String, nullable=True)
     ai_summary = Column(Text, nullable=True)
+    summary_failures = Column(Integer, nullable=True)  # failed summarization attempts
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
@@ -197,4 +231,63 @@ class ExternalTrial(Base):
     contact_email = Column(String, nullable=True)
     url = Column(String, nullable=True)
     ai_summary = Column(Text, nullable=True)
+    summary_failures = Column(Integer, nullable=True)  # failed summarization attempts
+    # Structured eligibility from the eligibilityModule, for SQL patient matching
+    min_age_years = Column(Float, nullable=True, index=True)
+    max_age_years = Column(Float, nullable=True, index=True)
+    sex = Column(String, nullable=True, index=True)  # "ALL", "FEMALE" or "MALE"
+    healthy_volunteers = Column(Boolean, nullable=True)
+    inclusion_criteria = Column(Text, nullable=True)
+    exclusion_criteria = Column(Text, nullable=True)
+    content_hash = Column(String, nullable=True)  # SHA-256 of the fetched fields
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    sites = relationship("ExternalTrialSite", back_populates="trial", cascade="all, delete-orphan")
+
+
+class ExternalTrialSite(Base):
+    """
+    One recruiting site of an external trial, from the contactsLocationsModule
+    """
+    __tablename__ = "external_trial_sites"
+    __table_args__ = (
+        Index("ix_external_trial_sites_lat_lon", "latitude", "longitude"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    trial_id = Column(Integer, ForeignKey("external_trials.id"), nullable=False, index=True)
+    facility = Column(String, nullable=True)
+    city = Column(String, nullable=True)
+    state = Column(String, nullable=True)
+    country = Column(String, nullable=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    
+    # Relationships
+    trial = relationship("ExternalTrial", back_populates="sites")
+
+
+class TrialRecommendation(Base):
+    """
+    Precomputed patient -> trial recommendation scores, kept up to date by
+    recommendations.py so reads are a single indexed range scan
+    """
+    __tablename__ = "trial_recommendations"
+    __table_args__ = (
+        UniqueConstraint("patient_id", "trial_type", "trial_id", name="uq_trial_recommendations_patient_trial"),
+        Index("ix_trial_recommendations_patient_score", "patient_id", "score"),
+        Index("ix_trial_recommendations_trial", "trial_type", "trial_id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    patient_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    trial_type = Column(String, nullable=False)  # "trial" (Trial) or "external" (ExternalTrial)
+    trial_id = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+    condition_score = Column(Float, nullable=False)
+    distance_km = Column(Float, nullable=True)  # None when either side has no coordinates
+    phase_score = Column(Float, nullable=False)
+    status_score = Column(Float, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,338 @@
+"""
+Patient -> trial recommendations: scoring, and incremental maintenance of
+the materialized trial_recommendations table
+"""
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
+
+from bulk import bulk_insert
+from database import SessionLocal
+from eligibility import keywords
+from geo import haversine_km
+from models import ExternalTrial, Trial, TrialRecommendation, User
+from search_index import apply_search
+
+# Weights of the score components; each component is in [0, 1]
+REC_WEIGHT_CONDITION = float(os.getenv("REC_WEIGHT_CONDITION", "0.6"))
+REC_WEIGHT_DISTANCE = float(os.getenv("REC_WEIGHT_DISTANCE", "0.15"))
+REC_WEIGHT_PHASE = float(os.getenv("REC_WEIGHT_PHASE", "0.1"))
+REC_WEIGHT_STATUS = float(os.getenv("REC_WEIGHT_STATUS", "0.15"))
+REC_DISTANCE_SCALE_KM = float(os.getenv("REC_DISTANCE_SCALE_KM", "100"))  # distance at which proximity scores 0.5
+REC_CANDIDATES = int(os.getenv("REC_CANDIDATES", "1000"))  # per trial table, when rescoring a patient
+REC_MAX_PER_PATIENT = int(os.getenv("REC_MAX_PER_PATIENT", "200"))
+
+# trial_type -> model
+TRIAL_MODELS = {"trial": Trial, "external": ExternalTrial}
+
+STATUS_SCORES = {
+    "RECRUITING": 1.0,
+    "NOT_YET_RECRUITING": 0.7,
+    "AVAILABLE": 0.7,
+    "ENROLLING_BY_INVITATION": 0.4,
+}
+PHASE_SCORES = {1: 0.6, 2: 0.8, 3: 1.0, 4: 0.7}
+_PHASE_NUMBERS = {"i": 1, "ii": 2, "iii": 3, "iv": 4, "1": 1, "2": 2, "3": 3, "4": 4}
+NEUTRAL_SCORE = 0.5
+
+
+class PatientProfile:
+    """
+    The parts of a patient's profile used for scoring
+    """
+
+    def __init__(self, user: User):
+        self.id = user.id
+        self.condition_terms = set(keywords(user.condition))
+        self.symptom_terms = set(keywords(user.symptoms))
+        self.latitude = user.latitude
+        self.longitude = user.longitude
+
+    def search_text(self) -> str:
+        return " ".join(self.condition_terms | self.symptom_terms)
+
+
+def phase_score(phase: Optional[str]) -> float:
+    """
+    Later phases rank higher ("PHASE2, PHASE3" and "Phase II/III" count as phase 3)
+    """
+    if not phase:
+        return NEUTRAL_SCORE
+    tokens = re.findall(r"(?<![a-z])(iv|iii|ii|i|[1-4])(?![a-z])", phase.lower().replace("phase", " "))
+    numbers = [_PHASE_NUMBERS[token] for token in tokens]
+    return PHASE_SCORES[max(numbers)] if numbers else NEUTRAL_SCORE
+
+
+def status_score(trial_type: str, trial) -> float:
+    if trial_type == "trial":
+        # Researcher-listed trials have no status and are shown as open
+        return 1.0
+    status = "_".join((trial.status or "").replace("-", " ").upper().split())
+    return STATUS_SCORES.get(status, 0.0)
+
+
+class TrialFeatures:
+    """
+    The parts of a trial used for scoring, derived once so a batch of trials
+    can be scored against every patient without re-tokenizing its text
+    """
+
+    def __init__(self, trial_type: str, trial):
+        self.trial_type = trial_type
+        self.trial = trial
+        self.target_terms = set(keywords(f"{trial.condition or ''} {trial.title or ''}"))
+        self.described_terms = self.target_terms | set(keywords(trial.description))
+        self.points = _trial_points(trial_type, trial)
+        self.phase = phase_score(trial.phase)
+        self.status = status_score(trial_type, trial)
+
+
+def condition_score(profile: PatientProfile, features: TrialFeatures) -> float:
+    """
+    Share of the patient's condition words found in the trial's condition
+    and title, with a smaller weight for symptom words anywhere in the trial
+    """
+    score = 0.0
+    if profile.condition_terms:
+        score += 0.8 * len(profile.condition_terms & features.target_terms) / len(profile.condition_terms)
+    if profile.symptom_terms:
+        score += 0.2 * len(profile.symptom_terms & features.described_terms) / len(profile.symptom_terms)
+    return score
+
+
+def _trial_points(trial_type: str, trial) -> List[Tuple[float, float]]:
+    if trial_type == "trial":
+        points = [(trial.latitude, trial.longitude)]
+    else:
+        points = [(site.latitude, site.longitude) for site in trial.sites]
+    return [(lat, lon) for lat, lon in points if lat is not None and lon is not None]
+
+
+def distance(profile: PatientProfile, features: TrialFeatures) -> Tuple[Optional[float], float]:
+    """
+    (km to the trial's nearest site, proximity score). The score decays as
+    1 / (1 + d / REC_DISTANCE_SCALE_KM) and is neutral when either side has no coordinates.
+    """
+    if profile.latitude is None or profile.longitude is None or not features.points:
+        return None, NEUTRAL_SCORE
+    km = min(haversine_km(profile.latitude, profile.longitude, lat, lon) for lat, lon in features.points)
+    return round(km, 3), 1.0 / (1.0 + km / REC_DISTANCE_SCALE_KM)
+
+
+def score_trial(profile: PatientProfile, features: TrialFeatures) -> Optional[dict]:
+    """
+    Recommendation row for one patient and trial, or None if the trial is
+    unrelated to the patient's condition and symptoms
+    """
+    condition = condition_score(profile, features)
+    if condition <= 0:
+        return None
+    distance_km, proximity = distance(profile, features)
+    score = (
+        REC_WEIGHT_CONDITION * condition
+        + REC_WEIGHT_DISTANCE * proximity
+        + REC_WEIGHT_PHASE * features.phase
+        + REC_WEIGHT_STATUS * features.status
+    )
+    return {
+        "patient_id": profile.id,
+        "trial_type": features.trial_type,
+        "trial_id": features.trial.id,
+        "score": round(score, 6),
+        "condition_score": round(condition, 6),
+        "distance_km": distance_km,
+        "phase_score": features.phase,
+        "status_score": features.status,
+    }
+
+
+def _trial_query(db: Session, trial_type: str):
+    model = TRIAL_MODELS[trial_type]
+    query = db.query(model)
+    if model is ExternalTrial:
+        # Sites of each batch in one IN query, not one query per trial
+        query = query.options(selectinload(ExternalTrial.sites))
+    return query
+
+
+def _patients(db: Session, patient_ids: Optional[List[int]] = None) -> List[PatientProfile]:
+    query = db.query(User).filter(User.role == "patient", User.condition.isnot(None))
+    if patient_ids is not None:
+        query = query.filter(User.id.in_(patient_ids))
+    return [PatientProfile(user) for user in query]
+
+
+def recompute_patient(db: Session, patient_id: int):
+    """
+    Rebuild one patient's recommendations. Candidates come from a full-text
+    search on their condition and symptom words, so only plausible trials are scored.
+    """
+    db.query(TrialRecommendation).filter(TrialRecommendation.patient_id == patient_id).delete()
+    for profile in _patients(db, [patient_id]):
+        rows = []
+        for trial_type, model in TRIAL_MODELS.items():
+            candidates = apply_search(_trial_query(db, trial_type), model, profile.search_text(), match_any=True)
+            for trial in candidates.limit(REC_CANDIDATES):
+                row = score_trial(profile, TrialFeatures(trial_type, trial))
+                if row:
+                    rows.append(row)
+        rows.sort(key=lambda row: row["score"], reverse=True)
+        bulk_insert(db, TrialRecommendation, rows[:REC_MAX_PER_PATIENT])
+    db.commit()
+
+
+def update_trials(db: Session, trial_type: str, trial_ids: List[int]):
+    """
+    Rescore new or changed trials against every patient, in one transaction
+    """
+    if not trial_ids:
+        return
+    model = TRIAL_MODELS[trial_type]
+    trials = _trial_query(db, trial_type).filter(model.id.in_(trial_ids)).all()
+    db.query(TrialRecommendation).filter(
+        TrialRecommendation.trial_type == trial_type,
+        TrialRecommendation.trial_id.in_(trial_ids)
+    ).delete(synchronize_session=False)
+
+    # Tokenize each trial once, and skip patients sharing no word with any of them
+    features = [TrialFeatures(trial_type, trial) for trial in trials]
+    batch_terms = set().union(*(feature.described_terms for feature in features))
+    rows = []
+    for profile in _patients(db):
+        if not (profile.condition_terms | profile.symptom_terms) & batch_terms:
+            continue
+        for feature in features:
+            row = score_trial(profile, feature)
+            if row:
+                rows.append(row)
+    if rows:
+        bulk_insert(db, TrialRecommendation, rows)
+        _trim(db, {row["patient_id"] for row in rows})
+    db.commit()
+
+
+def _trim(db: Session, patient_ids: Set[int]):
+    """
+    Keep at most REC_MAX_PER_PATIENT rows for each of the given patients
+    """
+    counts = db.query(TrialRecommendation.patient_id, func.count()).filter(
+        TrialRecommendation.patient_id.in_(patient_ids)
+    ).group_by(TrialRecommendation.patient_id)
+    for patient_id, count in counts:
+        if count <= REC_MAX_PER_PATIENT:
+            continue
+        keep = db.query(TrialRecommendation.id).filter(
+            TrialRecommendation.patient_id == patient_id
+        ).order_by(TrialRecommendation.score.desc()).limit(REC_MAX_PER_PATIENT)
+        db.query(TrialRecommendation).filter(
+            TrialRecommendation.patient_id == patient_id,
+            TrialRecommendation.id.notin_(keep.scalar_subquery())
+        ).delete(synchronize_session=False)
+
+
+def update_external_trials(db: Session, nct_ids: List[str]):
+    ids = [row_id for (row_id,) in db.query(ExternalTrial.id).filter(ExternalTrial.nct_id.in_(nct_ids))]
+    update_trials(db, "external", ids)
+
+
+def remove_trial(db: Session, trial_type: str, trial_id: int):
+    db.query(TrialRecommendation).filter(
+        TrialRecommendation.trial_type == trial_type,
+        TrialRecommendation.trial_id == trial_id
+    ).delete()
+    db.commit()
+
+
+def backfill(db: Session):
+    """
+    Compute recommendations for patients that have none yet
+    """
+    scored = db.query(TrialRecommendation.patient_id).distinct()
+    for (patient_id,) in db.query(User.id).filter(
+        User.role == "patient", User.condition.isnot(None), User.id.notin_(scored)
+    ).all():
+        recompute_patient(db, patient_id)
+
+
+def load_recommendations(db: Session, patient_id: int, limit: int) -> List[dict]:
+    """
+    Top recommendations for a patient: one index range scan plus one
+    lookup per trial table, independent of how many trials exist
+    """
+    recommendations = db.query(TrialRecommendation).filter(
+        TrialRecommendation.patient_id == patient_id
+    ).order_by(TrialRecommendation.score.desc()).limit(limit).all()
+
+    trials: Dict[Tuple[str, int], object] = {}
+    for trial_type, model in TRIAL_MODELS.items():
+        ids = [rec.trial_id for rec in recommendations if rec.trial_type == trial_type]
+        if ids:
+            trials.update({(trial_type, trial.id): trial for trial in db.query(model).filter(model.id.in_(ids))})
+
+    results = []
+    for rec in recommendations:
+        trial = trials.get((rec.trial_type, rec.trial_id))
+        if trial is None:
+            continue
+        results.append({
+            "trial_type": rec.trial_type,
+            "trial_id": rec.trial_id,
+            "score": rec.score,
+            "condition_score": rec.condition_score,
+            "distance_km": rec.distance_km,
+            "phase_score": rec.phase_score,
+            "status_score": rec.status_score,
+            "updated_at": rec.updated_at,
+            "title": trial.title,
+            "condition": trial.condition,
+            "phase": trial.phase,
+            "location": trial.location,
+            "status": getattr(trial, "status", None),
+            "url": getattr(trial, "url", None),
+        })
+    return results
+
+
+# ============ Background maintenance ============
+# One worker thread, so the materialized table has a single writer
+_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recommendations")
+
+
+def _run(fn, *args):
+    db = SessionLocal()
+    try:
+        fn(db, *args)
+    except Exception as e:
+        db.rollback()
+        print(f"Recommendation update failed ({fn.__name__}): {e}")
+    finally:
+        db.close()
+
+
+def patient_changed(patient_id: int):
+    _worker.submit(_run, recompute_patient, patient_id)
+
+
+def trials_changed(trial_type: str, trial_ids: List[int]):
+    _worker.submit(_run, update_trials, trial_type, list(trial_ids))
+
+
+def external_trials_changed(nct_ids: List[str]):
+    if nct_ids:
+        _worker.submit(_run, update_external_trials, list(nct_ids))
+
+
+def trial_removed(trial_type: str, trial_id: int):
+    _worker.submit(_run, remove_trial, trial_type, trial_id)
+
+
+def start_backfill():
+    _worker.submit(_run, backfill)
+
+
+def stop():
+    _worker.shutdown(wait=False, cancel_futures=True)
@@ -1,10 +1,23 @@
 """
 AI router - Google Gemini AI integration for summarization and NLP
 """
-from fastapi import APIRouter, HTTPException
-from schemas import SummarizeRequest, SummarizeResponse
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from cache import TTLCache
+from database import SessionLocal
+from eligibility import prefilter
+from models import ExternalTrial
+from schemas import (
+    EligibilityScreenRequest, SummarizeBatchRequest, SummarizeBatchResponse, SummarizeRequest, SummarizeResponse
+)
+from typing import Dict, List, Optional
 import google.generativeai as genai
+import asyncio
+import hashlib
+import json
 import os
+import re
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -14,53 +27,281 @@ router = APIRouter()
 
 # Configure Gemini API
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+AI_MODEL_NAME = os.getenv("AI_MODEL_NAME", "gemini-2.5-flash")  # Latest fast model
 if GOOGLE_API_KEY and GOOGLE_API_KEY != "your-api-key-here":
     genai.configure(api_key=GOOGLE_API_KEY)
-    model = genai.GenerativeModel('gemini-2.5-flash')  # Latest fast model
+    model = genai.GenerativeModel(AI_MODEL_NAME)
 else:
     model = None
     print("⚠️ WARNING: GOOGLE_API_KEY not configured. AI features will use fallback mode.")
 
+# Per-call timeout and the number of generations allowed in flight at once
+AI_TIMEOUT_SECONDS = float(os.getenv("AI_TIMEOUT_SECONDS", "30"))
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "16"))
+_generation_slots = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+generation_metrics = {"in_flight": 0, "completed": 0, "timeouts": 0, "cancelled": 0}
+
+
+class ClientDisconnected(Exception):
+    """
+    Raised when the client went away before the model answered
+    """
+
+
+async def _wait_for_disconnect(request: Request, poll_interval: float = 0.25):
+    while not await request.is_disconnected():
+        await asyncio.sleep(poll_interval)
+
+
+async def generate_text(prompt: str, request: Optional[Request] = None) -> str:
+    """
+    Run one Gemini generation without blocking the event loop.
+    Bounded by AI_MAX_CONCURRENCY, limited to AI_TIMEOUT_SECONDS and
+    cancelled if `request`'s client disconnects first.
+    """
+    async with _generation_slots:
+        generation_metrics["in_flight"] += 1
+        generation = asyncio.ensure_future(
+            asyncio.wait_for(model.generate_content_async(prompt), AI_TIMEOUT_SECONDS)
+        )
+        watchers = {generation}
+        if request is not None:
+            watchers.add(asyncio.ensure_future(_wait_for_disconnect(request)))
+        try:
+            done, _ = await asyncio.wait(watchers, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            generation_metrics["in_flight"] -= 1
+            for task in watchers:
+                if not task.done():
+                    task.cancel()
+        if generation not in done:
+            generation_metrics["cancelled"] += 1
+            raise ClientDisconnected("Client disconnected before the AI response was ready")
+        try:
+            response = generation.result()
+        except asyncio.TimeoutError:
+            generation_metrics["timeouts"] += 1
+            raise TimeoutError(f"AI generation timed out after {AI_TIMEOUT_SECONDS:g}s")
+    generation_metrics["completed"] += 1
+    return response.text.strip()
+
+
+# ============ Summary cache ============
+# Bump SUMMARY_PROMPT_VERSION whenever SUMMARY_PROMPT changes so old entries stop matching
+SUMMARY_PROMPT_VERSION = "1"
+SUMMARY_PROMPT = """You are a medical expert assistant. Summarize the following medical/scientific text in simple, patient-friendly language. 
+        Keep it concise (2-3 sentences maximum) and focus on the key findings or main points.
+        
+        Text to summarize:
+        {text}
+        """
+
+# Estimated model pricing (USD per million tokens), used to report cache savings
+AI_COST_PER_1M_INPUT_TOKENS = float(os.getenv("AI_COST_PER_1M_INPUT_TOKENS", "0.30"))
+AI_COST_PER_1M_OUTPUT_TOKENS = float(os.getenv("AI_COST_PER_1M_OUTPUT_TOKENS", "2.50"))
+
+summary_cache = TTLCache(
+    "ai_summaries",
+    max_entries=int(os.getenv("AI_CACHE_MAX_ENTRIES", "2048")),
+    db_path=os.getenv("AI_CACHE_DB_PATH", "./ai_cache.db") or None,
+    max_persistent_entries=int(os.getenv("AI_CACHE_MAX_PERSISTENT_ENTRIES", "100000")),
+)
+summary_cache_savings = {"input_tokens": 0, "output_tokens": 0}
+
+
+def _estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text
+    return max(1, len(text) // 4)
+
+
+def summary_cache_key(text: str, prompt_version: str = SUMMARY_PROMPT_VERSION) -> str:
+    """
+    Content address of a summary: prompt template version, model name and
+    whitespace-normalized input text
+    """
+    normalized = " ".join(text.split())
+    payload = json.dumps([prompt_version, AI_MODEL_NAME, normalized], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def cached_summary(text: str, prompt_version: str = SUMMARY_PROMPT_VERSION) -> Optional[str]:
+    """
+    Look up a previously generated summary, counting the tokens it saved
+    """
+    summary = await summary_cache.aget(summary_cache_key(text, prompt_version))
+    if summary is not None:
+        summary_cache_savings["input_tokens"] += _estimate_tokens(SUMMARY_PROMPT) + _estimate_tokens(text)
+        summary_cache_savings["output_tokens"] += _estimate_tokens(summary)
+    return summary
+
+
+async def summarize(text: str, request: Optional[Request] = None) -> str:
+    """
+    Summarize `text` with Gemini, reusing a cached summary of the same text
+    """
+    summary = await cached_summary(text)
+    if summary is None:
+        summary = await generate_text(SUMMARY_PROMPT.format(text=text), request)
+        summary_cache.set(summary_cache_key(text), summary)
+    return summary
+
 
 @router.post("/summarize", response_model=SummarizeResponse)
-async def summarize_text(request: SummarizeRequest):
+async def summarize_text(request: SummarizeRequest, http_request: Request):
     """
     AI-powered text summarization using Google Gemini
     Falls back to simple summarization if API key not configured
     """
     if model is None:
         # Fallback to simple summarization
-        text = request.text
-        if len(text) > 100:
-            summary = text[:100] + "..."
-        else:
-            summary = text
-        return SummarizeResponse(summary=f"📝 Summary: {summary}")
+        return SummarizeResponse(summary=_unconfigured_summary(request.text))
     
     try:
-        # Use Gemini AI for summarization
-        prompt = f"""You are a medical expert assistant. Summarize the following medical/scientific text in simple, patient-friendly language. 
-        Keep it concise (2-3 sentences maximum) and focus on the key findings or main points.
-        
-        Text to summarize:
-        {request.text}
-        """
-        
-        response = model.generate_content(prompt)
-        summary = response.text.strip()
+        # Use Gemini AI for summarization (served from the cache when possible)
+        summary = await summarize(request.text, http_request)
         
         return SummarizeResponse(summary=summary)
     
     except Exception as e:
         print(f"Gemini API error: {str(e)}")
         # Fallback on error
-        text = request.text
-        summary = text[:150] + "..." if len(text) > 150 else text
-        return SummarizeResponse(summary=f"📝 {summary}")
+        return SummarizeResponse(summary=_error_summary(request.text))
+
+
+def _unconfigured_summary(text: str) -> str:
+    summary = text[:100] + "..." if len(text) > 100 else text
+    return f"📝 Summary: {summary}"
+
+
+def _error_summary(text: str) -> str:
+    summary = text[:150] + "..." if len(text) > 150 else text
+    return f"📝 {summary}"
+
+
+# ============ Batched summarization ============
+# How much input one packed model call may carry, and how many documents
+AI_BATCH_MAX_PROMPT_CHARS = int(os.getenv("AI_BATCH_MAX_PROMPT_CHARS", "120000"))
+AI_BATCH_MAX_ITEMS = int(os.getenv("AI_BATCH_MAX_ITEMS", "20"))
+
+# Summaries from the packed prompt are cached under their own prompt version, never as SUMMARY_PROMPT's
+BATCH_SUMMARY_PROMPT_VERSION = "batch-1"
+BATCH_SUMMARY_PROMPT = """You are a medical expert assistant. Below are {count} medical/scientific texts, each wrapped in <<<DOC n>>> ... <<<END DOC n>>> markers.
+Summarize EACH text separately in simple, patient-friendly language. Keep each summary concise (2-3 sentences maximum) and focus on the key findings or main points.
+
+Answer with one block per text, in this exact format and nothing else:
+<<<SUMMARY n>>>
+summary of text n
+
+{documents}
+"""
+
+_BATCH_SUMMARY_PATTERN = re.compile(r"<<<SUMMARY (\d+)>>>\s*(.*?)\s*(?=<<<SUMMARY \d+>>>|\Z)", re.DOTALL)
+
+
+def _pack_texts(texts: List[str]) -> List[List[int]]:
+    """
+    Group text indexes into as few model calls as the prompt budget allows
+    """
+    groups, current, current_chars = [], [], 0
+    for index, text in enumerate(texts):
+        if current and (current_chars + len(text) > AI_BATCH_MAX_PROMPT_CHARS or len(current) >= AI_BATCH_MAX_ITEMS):
+            groups.append(current)
+            current, current_chars = [], 0
+        current.append(index)
+        current_chars += len(text)
+    if current:
+        groups.append(current)
+    return groups
+
+
+async def _summarize_group(texts: List[str], request: Optional[Request]) -> List[Optional[str]]:
+    """
+    Summarize several texts with one model call. Entries that could not be
+    parsed from the answer come back as None.
+    """
+    if len(texts) == 1:
+        return [await summarize(texts[0], request)]
+    
+    documents = "\n\n".join(
+        f"<<<DOC {number}>>>\n{text}\n<<<END DOC {number}>>>"
+        for number, text in enumerate(texts, start=1)
+    )
+    answer = await generate_text(BATCH_SUMMARY_PROMPT.format(count=len(texts), documents=documents), request)
+    
+    summaries: List[Optional[str]] = [None] * len(texts)
+    for number, summary in _BATCH_SUMMARY_PATTERN.findall(answer):
+        position = int(number) - 1
+        if 0 <= position < len(texts) and summary and summaries[position] is None:
+            summaries[position] = summary
+            summary_cache.set(summary_cache_key(texts[position], BATCH_SUMMARY_PROMPT_VERSION), summary)
+    return summaries
+
+
+async def _cached_batch_summary(text: str) -> Optional[str]:
+    """
+    A cached summary from either prompt; the batch endpoint accepts both
+    """
+    summary = await cached_summary(text)
+    if summary is None:
+        summary = await cached_summary(text, BATCH_SUMMARY_PROMPT_VERSION)
+    return summary
+
+
+@router.post("/summarize/batch", response_model=SummarizeBatchResponse)
+async def summarize_batch(request: SummarizeBatchRequest, http_request: Request):
+    """
+    Summarize many texts at once. Cached summaries are reused and the rest
+    are packed into as few model calls as the prompt budget allows.
+    Summaries are returned in request order.
+    """
+    texts = [item.text for item in request.items]
+    if model is None:
+        return SummarizeBatchResponse(summaries=[SummarizeResponse(summary=_unconfigured_summary(text)) for text in texts])
+    
+    summaries: List[Optional[str]] = list(await asyncio.gather(*(_cached_batch_summary(text) for text in texts)))
+    
+    # Summarize each distinct uncached text once
+    missing: Dict[str, str] = {}
+    for text, summary in zip(texts, summaries):
+        if summary is None:
+            missing.setdefault(summary_cache_key(text), text)
+    missing_keys = list(missing)
+    missing_texts = list(missing.values())
+    
+    results: Dict[str, Optional[str]] = {}
+    if missing_texts:
+        groups = _pack_texts(missing_texts)
+        outcomes = await asyncio.gather(
+            *(_summarize_group([missing_texts[i] for i in group], http_request) for group in groups),
+            return_exceptions=True
+        )
+        for group, outcome in zip(groups, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"Gemini API error: {str(outcome)}")
+                outcome = [None] * len(group)
+            for index, summary in zip(group, outcome):
+                results[missing_keys[index]] = summary
+    
+        # Anything the packed answers did not cover is retried on its own
+        unresolved = [key for key in missing_keys if results.get(key) is None]
+        retries = await asyncio.gather(
+            *(summarize(missing[key], http_request) for key in unresolved),
+            return_exceptions=True
+        )
+        for key, summary in zip(unresolved, retries):
+            if isinstance(summary, Exception):
+                print(f"Gemini API error: {str(summary)}")
+                summary = _error_summary(missing[key])
+            results[key] = summary
+    
+    return SummarizeBatchResponse(summaries=[
+        SummarizeResponse(summary=summary if summary is not None else results[summary_cache_key(text)])
+        for text, summary in zip(texts, summaries)
+    ])
 
 
 @router.post("/extract-conditions")
-async def extract_conditions_from_symptoms(symptoms: str):
+async def extract_conditions_from_symptoms(symptoms: str, http_request: Request):
     """
     Extract medical conditions from natural language symptoms
     Use this in patient onboarding to auto-detect conditions
@@ -83,8 +324,7 @@ async def extract_conditions_from_symptoms(symptoms: str):
         Example: "Type 2 Diabetes" or "Hypertension, Cardiovascular disease"
         """
         
-        response = model.generate_content(prompt)
-        conditions = response.text.strip()
+        conditions = await generate_text(prompt, http_request)
         
         return {
             "conditions": conditions,
@@ -92,12 +332,14 @@ async def extract_conditions_from_symptoms(symptoms: str):
             "confidence": "high"
         }
     
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=f"Condition extraction failed: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Condition extraction failed: {str(e)}")
 
 
 @router.post("/match-experts")
-async def ai_match_experts(condition: str, symptoms: str = ""):
+async def ai_match_experts(http_request: Request, condition: str, symptoms: str = ""):
     """
     AI-powered expert matching based on condition and symptoms
     Returns recommended medical specialties to search for
@@ -120,8 +362,7 @@ async def ai_match_experts(condition: str, symptoms: str = ""):
         Explanation: [Brief 1-sentence explanation of why these specialties]
         """
         
-        response = model.generate_content(prompt)
-        result = response.text.strip()
+        result = await generate_text(prompt, http_request)
         
         # Parse the response
         lines = result.split('\n')
@@ -143,6 +384,8 @@ async def ai_match_experts(condition: str, symptoms: str = ""):
             "confidence": "high"
         }
     
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=f"Expert matching failed: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Expert matching failed: {str(e)}")
 
@@ -152,7 +395,8 @@ async def analyze_trial_eligibility(
     patient_age: int,
     patient_condition: str,
     patient_symptoms: str,
-    trial_criteria: str
+    trial_criteria: str,
+    http_request: Request
 ):
     """
     AI-powered trial eligibility analysis
@@ -166,7 +410,20 @@ async def analyze_trial_eligibility(
         }
     
     try:
-        prompt = f"""You are a clinical trial eligibility analyzer. Based on the patient information and trial criteria, determine if the patient is likely eligible.
+        prompt = _eligibility_prompt(patient_age, patient_condition, patient_symptoms, trial_criteria)
+        
+        result = await generate_text(prompt, http_request)
+        
+        return _parse_eligibility(result)
+    
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=f"Eligibility analysis failed: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Eligibility analysis failed: {str(e)}")
+
+
+def _eligibility_prompt(patient_age: int, patient_condition: str, patient_symptoms: str, trial_criteria: str) -> str:
+    return f"""You are a clinical trial eligibility analyzer. Based on the patient information and trial criteria, determine if the patient is likely eligible.
         
         Patient Information:
         - Age: {patient_age}
@@ -180,31 +437,284 @@ async def analyze_trial_eligibility(
         Eligible: [Yes/No/Maybe]
         Explanation: [Brief explanation why]
         """
+
+
+def _parse_eligibility(result: str) -> dict:
+    # Parse response
+    eligible = "maybe"
+    explanation = result
+    
+    if "Eligible: Yes" in result or "Eligible:Yes" in result:
+        eligible = "yes"
+    elif "Eligible: No" in result or "Eligible:No" in result:
+        eligible = "no"
+    
+    # Extract explanation
+    if "Explanation:" in result:
+        explanation = result.split("Explanation:")[-1].strip()
+    
+    return {
+        "eligible": eligible,
+        "explanation": explanation,
+        "confidence": "medium"
+    }
+
+
+# ============ Streaming (Server-Sent Events) ============
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    """
+    Format one Server-Sent Event with a JSON payload
+    """
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _sse_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def stream_text(prompt: str):
+    """
+    Yield partial text from Gemini's streaming API as it is generated.
+    Shares the generation semaphore and the AI_TIMEOUT_SECONDS budget with generate_text.
+    Client disconnects are handled by StreamingResponse, which cancels the generator.
+    """
+    async with _generation_slots:
+        generation_metrics["in_flight"] += 1
+        try:
+            deadline = asyncio.get_running_loop().time() + AI_TIMEOUT_SECONDS
+            
+            def remaining() -> float:
+                return max(0.0, deadline - asyncio.get_running_loop().time())
+            
+            try:
+                response = await asyncio.wait_for(model.generate_content_async(prompt, stream=True), remaining())
+                chunks = response.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), remaining())
+                    except StopAsyncIteration:
+                        break
+                    try:
+                        text = chunk.text
+                    except ValueError:
+                        # Chunks without text parts (e.g. safety metadata only)
+                        continue
+                    if text:
+                        yield text
+            except asyncio.TimeoutError:
+                generation_metrics["timeouts"] += 1
+                raise TimeoutError(f"AI generation timed out after {AI_TIMEOUT_SECONDS:g}s")
+            except asyncio.CancelledError:
+                generation_metrics["cancelled"] += 1
+                raise
+        finally:
+            generation_metrics["in_flight"] -= 1
+    generation_metrics["completed"] += 1
+
+
+@router.post("/summarize/stream")
+async def summarize_text_stream(request: SummarizeRequest):
+    """
+    Streaming variant of /summarize: partial summary text is sent as
+    Server-Sent Events ("data" events with {"text": ...}) followed by a
+    "done" event carrying the full summary
+    """
+    async def events():
+        if model is None:
+            summary = _unconfigured_summary(request.text)
+            yield _sse({"text": summary})
+            yield _sse({"summary": summary}, event="done")
+            return
         
-        response = model.generate_content(prompt)
-        result = response.text.strip()
+        summary = await cached_summary(request.text)
+        if summary is not None:
+            yield _sse({"text": summary})
+            yield _sse({"summary": summary, "cached": True}, event="done")
+            return
         
-        # Parse response
-        eligible = "maybe"
-        explanation = result
+        parts = []
+        try:
+            async for text in stream_text(SUMMARY_PROMPT.format(text=request.text)):
+                parts.append(text)
+                yield _sse({"text": text})
+        except Exception as e:
+            print(f"Gemini API error: {str(e)}")
+            yield _sse({"detail": f"Summarization failed: {str(e)}"}, event="error")
+            return
         
-        if "Eligible: Yes" in result or "Eligible:Yes" in result:
-            eligible = "yes"
-        elif "Eligible: No" in result or "Eligible:No" in result:
-            eligible = "no"
+        summary = "".join(parts).strip()
+        if not summary:
+            # Every chunk was empty (e.g. a safety block): nothing worth caching
+            yield _sse({"detail": "Summarization failed: the model returned no text"}, event="error")
+            return
+        summary_cache.set(summary_cache_key(request.text), summary)
+        yield _sse({"summary": summary}, event="done")
+    
+    return _sse_response(events())
+
+
+@router.post("/analyze-eligibility/stream")
+async def analyze_trial_eligibility_stream(
+    patient_age: int,
+    patient_condition: str,
+    patient_symptoms: str,
+    trial_criteria: str
+):
+    """
+    Streaming variant of /analyze-eligibility: the model's reasoning is sent
+    as Server-Sent Events while it is generated, followed by a "done" event
+    with the parsed eligibility result
+    """
+    async def events():
+        if model is None:
+            yield _sse({
+                "eligible": "unknown",
+                "explanation": "Please configure GOOGLE_API_KEY",
+                "confidence": "low"
+            }, event="done")
+            return
         
-        # Extract explanation
-        if "Explanation:" in result:
-            explanation = result.split("Explanation:")[-1].strip()
+        parts = []
+        prompt = _eligibility_prompt(patient_age, patient_condition, patient_symptoms, trial_criteria)
+        try:
+            async for text in stream_text(prompt):
+                parts.append(text)
+                yield _sse({"text": text})
+        except Exception as e:
+            yield _sse({"detail": f"Eligibility analysis failed: {str(e)}"}, event="error")
+            return
         
-        return {
-            "eligible": eligible,
-            "explanation": explanation,
-            "confidence": "medium"
-        }
+        yield _sse(_parse_eligibility("".join(parts).strip()), event="done")
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Eligibility analysis failed: {str(e)}")
+    return _sse_response(events())
+
+
+# ============ Bulk eligibility screening ============
+AI_SCREEN_CONCURRENCY = int(os.getenv("AI_SCREEN_CONCURRENCY", "8"))
+AI_SCREEN_MAX_TRIALS = int(os.getenv("AI_SCREEN_MAX_TRIALS", "500"))
+
+# Ranking order of LLM verdicts in the final summary
+_ELIGIBILITY_RANK = {"yes": 0, "maybe": 1, "unknown": 2, "no": 3}
+
+
+def _load_screen_trials(trial_ids: List[int]) -> List[dict]:
+    db = SessionLocal()
+    try:
+        trials = db.query(ExternalTrial).filter(ExternalTrial.id.in_(trial_ids)).all()
+        return [
+            {
+                "id": trial.id,
+                "nct_id": trial.nct_id,
+                "title": trial.title,
+                "condition": trial.condition,
+                "description": trial.description,
+                "eligibility": trial.eligibility,
+                "min_age_years": trial.min_age_years,
+                "max_age_years": trial.max_age_years,
+                "sex": trial.sex,
+            }
+            for trial in trials
+        ]
+    finally:
+        db.close()
+
+
+async def _screen_trial(request: EligibilityScreenRequest, trial: dict, score: float,
+                        slots: asyncio.Semaphore) -> dict:
+    result = {"trial_id": trial["id"], "nct_id": trial["nct_id"], "title": trial["title"], "prefilter_score": score}
+    if model is None:
+        return {**result, "eligible": "unknown", "explanation": "Please configure GOOGLE_API_KEY", "confidence": "low"}
+    
+    criteria = trial["eligibility"] or f"Condition: {trial['condition'] or ''}\n{trial['description'] or ''}"
+    prompt = _eligibility_prompt(request.patient_age, request.patient_condition, request.patient_symptoms, criteria)
+    async with slots:
+        try:
+            return {**result, **_parse_eligibility(await generate_text(prompt))}
+        except Exception as e:
+            print(f"Eligibility screening failed for trial {trial['id']}: {e}")
+            return {
+                **result,
+                "eligible": "unknown",
+                "explanation": f"Eligibility analysis failed: {str(e)}",
+                "confidence": "low"
+            }
+
+
+@router.post("/screen-eligibility")
+async def screen_trial_eligibility(request: EligibilityScreenRequest):
+    """
+    Screen one patient against many cached ClinicalTrials.gov trials.
+    
+    Trials are first pre-filtered locally on age bounds, sex and condition
+    keywords parsed from their eligibility text; only the survivors are sent
+    to the AI, at most AI_SCREEN_CONCURRENCY at a time. Results stream back
+    as NDJSON lines as they complete ({"type": "excluded"} for pre-filtered
+    trials, {"type": "result"} for AI verdicts), followed by one
+    {"type": "summary"} line with every result ranked.
+    """
+    if len(request.trial_ids) > AI_SCREEN_MAX_TRIALS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {AI_SCREEN_MAX_TRIALS} trials can be screened per request"
+        )
+    
+    trials = await run_in_threadpool(_load_screen_trials, request.trial_ids)
+    found_ids = {trial["id"] for trial in trials}
+    not_found = [trial_id for trial_id in dict.fromkeys(request.trial_ids) if trial_id not in found_ids]
+    
+    candidates, excluded = [], []
+    for trial in trials:
+        passes, score, reasons = prefilter(
+            request.patient_age, request.patient_sex, request.patient_condition,
+            trial["condition"], trial["eligibility"],
+            trial["min_age_years"], trial["max_age_years"], trial["sex"]
+        )
+        if passes:
+            candidates.append((trial, score))
+        else:
+            excluded.append({
+                "trial_id": trial["id"],
+                "nct_id": trial["nct_id"],
+                "title": trial["title"],
+                "eligible": "no",
+                "reasons": reasons
+            })
+    # Best keyword matches are sent to the AI first
+    candidates.sort(key=lambda candidate: candidate[1], reverse=True)
+    
+    async def lines():
+        for item in excluded:
+            yield json.dumps({"type": "excluded", **item}) + "\n"
+        
+        slots = asyncio.Semaphore(AI_SCREEN_CONCURRENCY)
+        tasks = [asyncio.ensure_future(_screen_trial(request, trial, score, slots)) for trial, score in candidates]
+        results = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                results.append(result)
+                yield json.dumps({"type": "result", **result}) + "\n"
+        finally:
+            # Client went away: stop the remaining AI calls
+            for task in tasks:
+                task.cancel()
+        
+        results.sort(key=lambda result: (_ELIGIBILITY_RANK.get(result["eligible"], 2), -result["prefilter_score"]))
+        yield json.dumps({
+            "type": "summary",
+            "screened": len(trials),
+            "prefiltered_out": len(excluded),
+            "ranked": results,
+            "excluded": excluded,
+            "not_found": not_found
+        }) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
 @router.get("/health")
@@ -219,11 +729,26 @@ def ai_health():
         "service": "Google Gemini Pro AI",
         "version": "2.0.0",
         "api_configured": api_configured,
+        "model": AI_MODEL_NAME,
+        "max_concurrency": AI_MAX_CONCURRENCY,
+        "generations": generation_metrics,
+        "summary_cache": {
+            **summary_cache.stats(),
+            "estimated_tokens_saved": summary_cache_savings["input_tokens"] + summary_cache_savings["output_tokens"],
+            "estimated_cost_saved_usd": round(
+                summary_cache_savings["input_tokens"] * AI_COST_PER_1M_INPUT_TOKENS / 1_000_000
+                + summary_cache_savings["output_tokens"] * AI_COST_PER_1M_OUTPUT_TOKENS / 1_000_000,
+                6
+            )
+        },
         "capabilities": [
             "Text summarization (medical content)",
+            "Batched multi-document summarization",
             "Condition extraction from symptoms",
             "Expert specialty matching",
-            "Trial eligibility analysis"
+            "Trial eligibility analysis",
+            "Bulk trial eligibility screening with local pre-filtering",
+            "Streaming (SSE) summarization and eligibility analysis"
         ],
         "fallback_mode": not api_configured
     }
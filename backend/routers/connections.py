@@ -1,21 +1,29 @@
 """
 Connections router - Manage collaborator connections and expert follows
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import func, select, union_all
 from sqlalchemy.orm import Session
 from typing import List
-from database import get_db
+from database import get_db, write_queue
 from models import Connection, User
 from schemas import ConnectionCreate, ConnectionResponse, ConnectionUpdate
+from geo import proximity_mode, proximity_search
+from pagination import page_size, paginate
+from search_index import apply_search
 
 router = APIRouter()
 
 
 @router.post("/", response_model=ConnectionResponse, status_code=201)
-def create_connection(connection: ConnectionCreate, db: Session = Depends(get_db)):
+def create_connection(connection: ConnectionCreate):
     """
     Create a new connection request (follow or collaborate)
     """
+    return write_queue.run(_insert_connection, connection)
+
+
+def _insert_connection(db: Session, connection: ConnectionCreate) -> Connection:
     # Check if connection already exists
     existing = db.query(Connection).filter(
         Connection.requester_id == connection.requester_id,
@@ -27,15 +35,15 @@ def create_connection(connection: ConnectionCreate, db: Session = Depends(get_db
     
     db_connection = Connection(**connection.model_dump())
     db.add(db_connection)
-    db.commit()
-    db.refresh(db_connection)
+    db.flush()
     return db_connection
 
 
 @router.get("/", response_model=List[ConnectionResponse])
-def get_connections(user_id: int = None, status: str = None, db: Session = Depends(get_db)):
+def get_connections(response: Response, user_id: int = None, status: str = None,
+                    cursor: str = None, limit: int = None, db: Session = Depends(get_db)):
     """
-    Get connections, optionally filtered by user and status
+    Get connections, optionally filtered by user and status, newest first and paged by `cursor`
     """
     query = db.query(Connection)
     
@@ -47,23 +55,27 @@ def get_connections(user_id: int = None, status: str = None, db: Session = Depen
     if status:
         query = query.filter(Connection.status == status)
     
-    return query.all()
+    return paginate(query, Connection, response, cursor, limit)
 
 
 @router.get("/sent/{user_id}", response_model=List[ConnectionResponse])
-def get_sent_connections(user_id: int, db: Session = Depends(get_db)):
+def get_sent_connections(user_id: int, response: Response, cursor: str = None, limit: int = None,
+                         db: Session = Depends(get_db)):
     """
-    Get all connection requests sent by a user
+    Get connection requests sent by a user, newest first and paged by `cursor`
     """
-    return db.query(Connection).filter(Connection.requester_id == user_id).all()
+    query = db.query(Connection).filter(Connection.requester_id == user_id)
+    return paginate(query, Connection, response, cursor, limit)
 
 
 @router.get("/received/{user_id}", response_model=List[ConnectionResponse])
-def get_received_connections(user_id: int, db: Session = Depends(get_db)):
+def get_received_connections(user_id: int, response: Response, cursor: str = None, limit: int = None,
+                             db: Session = Depends(get_db)):
     """
-    Get all connection requests received by a user
+    Get connection requests received by a user, newest first and paged by `cursor`
     """
-    return db.query(Connection).filter(Connection.receiver_id == user_id).all()
+    query = db.query(Connection).filter(Connection.receiver_id == user_id)
+    return paginate(query, Connection, response, cursor, limit)
 
 
 @router.put("/{connection_id}", response_model=ConnectionResponse)
@@ -96,43 +108,76 @@ def delete_connection(connection_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/collaborators/{user_id}", response_model=List[dict])
-def get_collaborators(user_id: int, specialty: str = None, db: Session = Depends(get_db)):
-    """
-    Get potential collaborators (researchers) for a user
-    """
+def get_collaborators(
+    user_id: int,
+    response: Response,
+    specialty: str = None,
+    q: str = None,
+    cursor: str = None,
+    limit: int = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get potential collaborators (researchers) for a user, with the status of
+    any connection between them, in one query. Newest first and paged by `cursor`.
+    `q` runs a full-text search over profiles and returns the best `limit` matches first.
+    """
+    # The user's connections keyed by the other party, earliest first if there are several
+    counterparts = union_all(
+        select(Connection.receiver_id.label("other_id"), Connection.id).where(Connection.requester_id == user_id),
+        select(Connection.requester_id.label("other_id"), Connection.id).where(Connection.receiver_id == user_id)
+    ).subquery()
+    first_connection = select(
+        counterparts.c.other_id, func.min(counterparts.c.id).label("connection_id")
+    ).group_by(counterparts.c.other_id).subquery()
+    
     query = db.query(User).filter(User.role == "researcher", User.id != user_id)
+    if q:
+        query = apply_search(query, User, q)
     
     if specialty:
         query = query.filter(User.specialties.ilike(f"%{specialty}%"))
     
-    collaborators = query.all()
-    
-    # Format response with connection status
-    result = []
-    for collab in collaborators:
-        connection = db.query(Connection).filter(
-            ((Connection.requester_id == user_id) & (Connection.receiver_id == collab.id)) |
-            ((Connection.requester_id == collab.id) & (Connection.receiver_id == user_id))
-        ).first()
-        
-        result.append({
-            "id": collab.id,
-            "name": collab.name,
-            "specialties": collab.specialties,
-            "research_interests": collab.research_interests,
-            "bio": collab.bio,
-            "connection_status": connection.status if connection else None
-        })
+    query = (
+        query.outerjoin(first_connection, first_connection.c.other_id == User.id)
+        .outerjoin(Connection, Connection.id == first_connection.c.connection_id)
+        .with_entities(User, Connection.status)
+    )
+    rows = query.limit(page_size(limit)).all() if q else paginate(query, User, response, cursor, limit)
     
-    return result
+    return [{
+        "id": collab.id,
+        "name": collab.name,
+        "specialties": collab.specialties,
+        "research_interests": collab.research_interests,
+        "bio": collab.bio,
+        "connection_status": status
+    } for collab, status in rows]
 
 
 @router.get("/experts", response_model=List[dict])
-def get_health_experts(condition: str = None, location: str = None, db: Session = Depends(get_db)):
-    """
-    Get health experts for patients to follow
+def get_health_experts(
+    response: Response,
+    condition: str = None,
+    location: str = None,
+    q: str = None,
+    lat: float = None,
+    lon: float = None,
+    radius_km: float = None,
+    nearest: int = None,
+    cursor: str = None,
+    limit: int = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get health experts for patients to follow, newest first and paged by `cursor`.
+    `q` runs a full-text search over profiles and returns the best `limit` matches first.
+    With lat/lon, `radius_km` returns experts within that distance and
+    `nearest` the k closest experts, nearest first.
     """
     query = db.query(User).filter(User.role == "researcher")
+    if q:
+        query = apply_search(query, User, q)
     
     if condition:
         query = query.filter(
@@ -143,7 +188,12 @@ def get_health_experts(condition: str = None, location: str = None, db: Session
     if location:
         query = query.filter(User.location.ilike(f"%{location}%"))
     
-    experts = query.all()
+    if proximity_mode(lat, lon, radius_km, nearest):
+        matches = proximity_search(query, User, lat, lon, radius_km, nearest)[:page_size(limit)]
+    elif q:
+        matches = [(expert, None) for expert in query.limit(page_size(limit))]
+    else:
+        matches = [(expert, None) for expert in paginate(query, User, response, cursor, limit)]
     
     return [{
         "id": expert.id,
@@ -152,5 +202,6 @@ def get_health_experts(condition: str = None, location: str = None, db: Session
         "research_interests": expert.research_interests,
         "bio": expert.bio,
         "location": expert.location,
-        "meeting_availability": expert.meeting_availability
-    } for expert in experts]
+        "meeting_availability": expert.meeting_availability,
+        "distance_km": round(distance, 3) if distance is not None else None
+    } for expert, distance in matches]
@@ -2,33 +2,170 @@
 External APIs router - Fetch data from PubMed, ClinicalTrials.gov, ORCID
 """
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import case, or_
 from sqlalchemy.orm import Session
-from typing import List, Optional
-import requests
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import hashlib
+import json
+import os
 from xml.etree import ElementTree as ET
-from database import get_db
-from models import ExternalPublication, ExternalTrial
+from cache import SingleFlight, TTLCache
+from bulk import bulk_insert, insert_statement
+from database import SessionLocal, get_db, write_queue
+from eligibility import keywords, normalize_sex, prefilter, structured_eligibility
+from geo import filter_bounding_box, haversine_km
+from http_client import Upstream, UpstreamUnavailable, upstream_metrics
+from models import ExternalPublication, ExternalTrial, ExternalTrialSite
 from schemas import ExternalPublicationResponse, ExternalTrialResponse
+from search_index import apply_search
+from summary_pipeline import summary_pipeline
+import recommendations
+import vector_index
 
 router = APIRouter()
 
+# Base URL of the NCBI E-utilities (override to point at a local stub server)
+PUBMED_EUTILS_URL = os.getenv("PUBMED_EUTILS_URL", "https://eutils.ncbi.nlm.nih.gov/entrez/eutils").rstrip("/")
+NCBI_API_KEY = os.getenv("NCBI_API_KEY") or None
+
+# Outbound-call policies (rate limit, circuit breaker, retries) per upstream.
+# NCBI allows 3 requests/second without an API key and 10 with one.
+pubmed_upstream = Upstream("pubmed", rate=10 if NCBI_API_KEY else 3)
+clinicaltrials_upstream = Upstream("clinicaltrials", rate=float(os.getenv("CLINICALTRIALS_RATE_LIMIT", "10")), burst=5)
+orcid_upstream = Upstream("orcid", rate=float(os.getenv("ORCID_RATE_LIMIT", "10")), burst=5)
+
+# Paginated retrieval: efetch batch size and how many batches run at once
+PUBMED_EFETCH_BATCH_SIZE = int(os.getenv("PUBMED_EFETCH_BATCH_SIZE", "200"))
+PUBMED_FETCH_CONCURRENCY = int(os.getenv("PUBMED_FETCH_CONCURRENCY", "3"))
+
+# ClinicalTrials.gov v2 studies endpoint and page size (the API caps pages at 1000)
+CLINICALTRIALS_API_URL = os.getenv("CLINICALTRIALS_API_URL", "https://clinicaltrials.gov/api/v2/studies")
+CLINICALTRIALS_PAGE_SIZE = int(os.getenv("CLINICALTRIALS_PAGE_SIZE", "100"))
+# Trials per multi-row upsert statement; each row binds ~20 parameters, and
+# stock SQLite allows 32766 per statement
+TRIAL_UPSERT_BATCH_SIZE = int(os.getenv("TRIAL_UPSERT_BATCH_SIZE", "500"))
+
+# Query -> result-ID cache in front of the upstream searches
+search_cache = TTLCache(
+    "external_search",
+    max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1024")),
+    ttl_seconds=float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "900")),
+    db_path=os.getenv("SEARCH_CACHE_DB_PATH") or None,
+)
+search_flight = SingleFlight()
+
+
+def _search_cache_key(source: str, query: str, max_results: int, status: Optional[str] = None) -> str:
+    """
+    Cache key for a search, normalized so that case and spacing don't matter
+    """
+    normalized_query = " ".join(query.lower().split())
+    normalized_status = (status or "").strip().lower()
+    return json.dumps([source, normalized_query, max_results, normalized_status])
+
 
 # ============ PubMed Integration ============
-def fetch_pubmed_articles(query: str, max_results: int = 10):
+def _parse_pubmed_article(article: ET.Element) -> Optional[dict]:
+    """
+    Extract the fields we cache from one <PubmedArticle> element.
+    Uses direct child paths so each lookup touches only the nodes it needs.
+    """
+    try:
+        citation = article.find("MedlineCitation")
+        pmid = citation.find("PMID").text
+        details = citation.find("Article")
+        
+        title_elem = details.find("ArticleTitle")
+        title = title_elem.text if title_elem is not None else "No title"
+        
+        abstract_elem = details.find("Abstract/AbstractText")
+        abstract = abstract_elem.text if abstract_elem is not None else "No abstract available"
+        
+        journal_elem = details.find("Journal/Title")
+        journal = journal_elem.text if journal_elem is not None else "Unknown"
+        
+        # Extract authors
+        authors_list = []
+        for author in details.iterfind("AuthorList/Author"):
+            lastname = author.find("LastName")
+            forename = author.find("ForeName")
+            if lastname is not None and forename is not None:
+                authors_list.append(f"{forename.text} {lastname.text}")
+        
+        authors = ", ".join(authors_list) if authors_list else "Unknown"
+        
+        pub_date = details.find("Journal/JournalIssue/PubDate/Year")
+        pub_year = pub_date.text if pub_date is not None else "Unknown"
+        
+        return {
+            "external_id": pmid,
+            "source": "pubmed",
+            "title": title,
+            "authors": authors,
+            "abstract": abstract if len(abstract) < 5000 else abstract[:5000] + "...",
+            "journal": journal,
+            "publication_date": pub_year,
+            "url": f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
+        }
+    except Exception:
+        return None
+
+
+def _pubmed_articles_from_events(events):
+    """
+    Yield one article dict per completed <PubmedArticle>, clearing each
+    element once parsed so memory stays flat regardless of response size
+    """
+    for _, elem in events:
+        if elem.tag == "PubmedArticle":
+            article = _parse_pubmed_article(elem)
+            elem.clear()
+            if article is not None:
+                yield article
+
+
+def _eutils_params(**params) -> dict:
+    """
+    Add the NCBI API key (when configured) to E-utilities query parameters
+    """
+    if NCBI_API_KEY:
+        params["api_key"] = NCBI_API_KEY
+    return params
+
+
+async def _efetch_articles(params: dict) -> List[dict]:
+    """
+    Run one efetch call and parse the response incrementally as it arrives
+    """
+    articles = []
+    parser = ET.XMLPullParser(events=("end",))
+    async with pubmed_upstream.stream(f"{PUBMED_EUTILS_URL}/efetch.fcgi", params=params) as fetch_response:
+        fetch_response.raise_for_status()
+        async for chunk in fetch_response.aiter_bytes():
+            parser.feed(chunk)
+            articles.extend(_pubmed_articles_from_events(parser.read_events()))
+    parser.close()
+    articles.extend(_pubmed_articles_from_events(parser.read_events()))
+    return articles
+
+
+async def fetch_pubmed_articles(query: str, max_results: int = 10):
     """
     Fetch articles from PubMed API
     """
-    # Step 1: Search PubMed for IDs
-    search_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
-    search_params = {
-        "db": "pubmed",
-        "term": query,
-        "retmax": max_results,
-        "retmode": "json"
-    }
-    
     try:
-        search_response = requests.get(search_url, params=search_params, timeout=10)
+        # Large result sets are paged through the E-utilities history server
+        if max_results > PUBMED_EFETCH_BATCH_SIZE:
+            batches = [batch async for batch in iter_pubmed_article_batches(query, max_results)]
+            return [article for _, articles in sorted(batches, key=lambda b: b[0]) for article in articles]
+        
+        # Step 1: Search PubMed for IDs
+        search_params = _eutils_params(db="pubmed", term=query, retmax=max_results, retmode="json")
+        search_response = await pubmed_upstream.get(f"{PUBMED_EUTILS_URL}/esearch.fcgi", params=search_params)
         search_data = search_response.json()
         
         if "esearchresult" not in search_data or "idlist" not in search_data["esearchresult"]:
@@ -40,192 +177,526 @@ def fetch_pubmed_articles(query: str, max_results: int = 10):
             return []
         
         # Step 2: Fetch details for each ID
-        fetch_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
-        fetch_params = {
-            "db": "pubmed",
-            "id": ",".join(pubmed_ids),
-            "retmode": "xml"
-        }
-        
-        fetch_response = requests.get(fetch_url, params=fetch_params, timeout=10)
-        root = ET.fromstring(fetch_response.content)
-        
-        articles = []
-        for article in root.findall(".//PubmedArticle"):
-            try:
-                pmid = article.find(".//PMID").text
-                title_elem = article.find(".//ArticleTitle")
-                title = title_elem.text if title_elem is not None else "No title"
-                
-                abstract_elem = article.find(".//AbstractText")
-                abstract = abstract_elem.text if abstract_elem is not None else "No abstract available"
-                
-                journal_elem = article.find(".//Journal/Title")
-                journal = journal_elem.text if journal_elem is not None else "Unknown"
-                
-                # Extract authors
-                authors_list = []
-                for author in article.findall(".//Author"):
-                    lastname = author.find("LastName")
-                    forename = author.find("ForeName")
-                    if lastname is not None and forename is not None:
-                        authors_list.append(f"{forename.text} {lastname.text}")
-                
-                authors = ", ".join(authors_list) if authors_list else "Unknown"
-                
-                pub_date = article.find(".//PubDate/Year")
-                pub_year = pub_date.text if pub_date is not None else "Unknown"
-                
-                articles.append({
-                    "external_id": pmid,
-                    "source": "pubmed",
-                    "title": title,
-                    "authors": authors,
-                    "abstract": abstract if len(abstract) < 5000 else abstract[:5000] + "...",
-                    "journal": journal,
-                    "publication_date": pub_year,
-                    "url": f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/"
-                })
-            except Exception as e:
-                continue
-        
-        return articles
+        fetch_params = _eutils_params(db="pubmed", id=",".join(pubmed_ids), retmode="xml")
+        return await _efetch_articles(fetch_params)
     
+    except UpstreamUnavailable:
+        raise
     except Exception as e:
         print(f"Error fetching PubMed data: {e}")
         return []
 
 
+async def iter_pubmed_article_batches(query: str, max_results: int, batch_size: int = None):
+    """
+    Page through a PubMed search with the history server (usehistory/WebEnv).
+    
+    efetch batches of `batch_size` run concurrently, bounded by
+    PUBMED_FETCH_CONCURRENCY and the NCBI rate limit. Yields
+    (retstart, articles) tuples in completion order.
+    """
+    batch_size = batch_size or PUBMED_EFETCH_BATCH_SIZE
+    
+    search_params = _eutils_params(db="pubmed", term=query, retmax=0, usehistory="y", retmode="json")
+    search_response = await pubmed_upstream.get(f"{PUBMED_EUTILS_URL}/esearch.fcgi", params=search_params)
+    search_response.raise_for_status()
+    search_result = search_response.json().get("esearchresult", {})
+    
+    total = min(int(search_result.get("count", 0)), max_results)
+    if not total:
+        return
+    
+    semaphore = asyncio.Semaphore(PUBMED_FETCH_CONCURRENCY)
+    
+    async def fetch_batch(retstart: int):
+        async with semaphore:
+            fetch_params = _eutils_params(
+                db="pubmed",
+                query_key=search_result["querykey"],
+                WebEnv=search_result["webenv"],
+                retstart=retstart,
+                retmax=min(batch_size, total - retstart),
+                retmode="xml"
+            )
+            return retstart, await _efetch_articles(fetch_params)
+    
+    tasks = [asyncio.create_task(fetch_batch(retstart)) for retstart in range(0, total, batch_size)]
+    try:
+        for next_batch in asyncio.as_completed(tasks):
+            yield await next_batch
+    finally:
+        # Stop outstanding fetches if the consumer goes away early
+        for task in tasks:
+            task.cancel()
+
+
+def _store_publications(db: Session, articles: List[dict]) -> List[str]:
+    """
+    Store fetched articles in one transaction and return their PMIDs in
+    the order they were fetched
+    """
+    if not articles:
+        return []
+    
+    external_ids = [article["external_id"] for article in articles]
+    
+    # One IN (...) lookup for the PMIDs we already have
+    existing_ids = {
+        row.external_id for row in db.query(ExternalPublication.external_id).filter(
+            ExternalPublication.external_id.in_(external_ids)
+        )
+    }
+    
+    # One batched insert for the rest (COPY for large PostgreSQL batches); concurrent writers are absorbed by ON CONFLICT
+    new_articles = list({
+        article["external_id"]: article for article in articles
+        if article["external_id"] not in existing_ids
+    }.values())
+    if new_articles:
+        bulk_insert(db, ExternalPublication, new_articles, conflict_columns=["external_id"])
+        db.commit()
+    
+    return external_ids
+
+
+def _load_publications(db: Session, external_ids: List[str]):
+    """
+    Load cached articles by PMID, preserving the given order
+    """
+    rows = {
+        article.external_id: article for article in db.query(ExternalPublication).filter(
+            ExternalPublication.external_id.in_(external_ids)
+        )
+    }
+    return [rows[external_id] for external_id in external_ids if external_id in rows]
+
+
 @router.get("/pubmed/search")
-def search_pubmed(query: str, max_results: int = 10, db: Session = Depends(get_db)):
+async def search_pubmed(query: str, max_results: int = 10, db: Session = Depends(get_db)):
     """
     Search PubMed for articles
     """
-    articles = fetch_pubmed_articles(query, max_results)
+    cache_key = _search_cache_key("pubmed", query, max_results)
+    cached_ids = await search_cache.aget(cache_key)
+    if cached_ids is not None:
+        cached_articles = await run_in_threadpool(_load_publications, db, cached_ids)
+        if len(cached_articles) == len(cached_ids):
+            return cached_articles
     
-    # Cache articles in database
-    cached_articles = []
-    for article_data in articles:
-        existing = db.query(ExternalPublication).filter(
-            ExternalPublication.external_id == article_data["external_id"]
-        ).first()
-        
-        if not existing:
-            article = ExternalPublication(**article_data)
-            db.add(article)
-            db.commit()
-            db.refresh(article)
-            cached_articles.append(article)
-        else:
-            cached_articles.append(existing)
+    async def fetch_and_store():
+        articles = await fetch_pubmed_articles(query, max_results)
+        # Cache articles in database, on the single writer thread
+        external_ids = await write_queue.run_async(_store_publications, articles)
+        summary_pipeline.enqueue("publication", external_ids)
+        vector_index.enqueue("publication", external_ids)
+        # Empty results are not cached: they are also what a failed upstream call returns
+        if external_ids:
+            search_cache.set(cache_key, external_ids)
+        return external_ids
     
-    return cached_articles
+    # Concurrent identical searches share one upstream fetch and one DB write
+    external_ids = await search_flight.do(cache_key, fetch_and_store)
+    return await run_in_threadpool(_load_publications, db, external_ids)
 
 
-# ============ ClinicalTrials.gov Integration ============
-def fetch_clinical_trials(condition: str, max_results: int = 10):
+@router.get("/pubmed/stream")
+async def stream_pubmed(query: str, max_results: int = 100):
     """
-    Fetch clinical trials from ClinicalTrials.gov API
+    Stream PubMed articles as NDJSON, one efetch batch at a time as batches arrive
     """
-    base_url = "https://clinicaltrials.gov/api/v2/studies"
+    async def article_lines():
+        db = SessionLocal()
+        try:
+            async for _, articles in iter_pubmed_article_batches(query, max_results):
+                stored_ids = await write_queue.run_async(_store_publications, articles)
+                cached_articles = await run_in_threadpool(_load_publications, db, stored_ids)
+                external_ids = [article.external_id for article in cached_articles]
+                summary_pipeline.enqueue("publication", external_ids)
+                vector_index.enqueue("publication", external_ids)
+                for article in cached_articles:
+                    yield ExternalPublicationResponse.model_validate(article).model_dump_json() + "\n"
+        except UpstreamUnavailable as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+        except Exception as e:
+            print(f"Error streaming PubMed data: {e}")
+            yield json.dumps({"error": "PubMed fetch failed"}) + "\n"
+        finally:
+            db.close()
     
+    return StreamingResponse(article_lines(), media_type="application/x-ndjson")
+
+
+# ============ ClinicalTrials.gov Integration ============
+def _parse_study(study: dict) -> Optional[dict]:
+    """
+    Extract the fields we cache from one ClinicalTrials.gov study record
+    """
+    try:
+        protocol = study.get("protocolSection", {})
+        identification = protocol.get("identificationModule", {})
+        status_module = protocol.get("statusModule", {})
+        description = protocol.get("descriptionModule", {})
+        conditions = protocol.get("conditionsModule", {})
+        design = protocol.get("designModule", {})
+        contacts = protocol.get("contactsLocationsModule", {})
+        eligibility = structured_eligibility(protocol.get("eligibilityModule", {}))
+        
+        nct_id = identification.get("nctId", "")
+        title = identification.get("briefTitle", "No title")
+        
+        condition_list = conditions.get("conditions", [])
+        condition_str = ", ".join(condition_list) if condition_list else "Unknown"
+        
+        phase_list = design.get("phases", [])
+        phase = ", ".join(phase_list) if phase_list else "Unknown"
+        
+        status = status_module.get("overallStatus", "Unknown")
+        
+        brief_summary = description.get("briefSummary", "No description available")
+        
+        # Get location
+        locations = contacts.get("locations", [])
+        location = locations[0].get("city", "Unknown") if locations else "Unknown"
+        sites = [
+            {
+                "facility": site.get("facility"),
+                "city": site.get("city"),
+                "state": site.get("state"),
+                "country": site.get("country"),
+                "latitude": site.get("geoPoint", {}).get("lat"),
+                "longitude": site.get("geoPoint", {}).get("lon"),
+            }
+            for site in locations
+        ]
+        
+        # Get contact email
+        central_contacts = contacts.get("centralContacts", [])
+        contact_email = central_contacts[0].get("email", "") if central_contacts else ""
+        
+        return {
+            "nct_id": nct_id,
+            "title": title,
+            "condition": condition_str,
+            "phase": phase,
+            "status": status,
+            "location": location,
+            "description": brief_summary if len(brief_summary) < 5000 else brief_summary[:5000] + "...",
+            "contact_email": contact_email,
+            "url": f"https://clinicaltrials.gov/study/{nct_id}",
+            "sites": sites,
+            **eligibility
+        }
+    except Exception:
+        return None
+
+
+def _overall_status_filter(status: Optional[str]) -> Optional[str]:
+    """
+    Convert user-facing statuses ("Recruiting, Not yet recruiting") into the
+    API's filter.overallStatus enum list ("RECRUITING,NOT_YET_RECRUITING")
+    """
+    if not status:
+        return None
+    values = [
+        "_".join(value.replace("-", " ").upper().split())
+        for value in status.split(",")
+    ]
+    return ",".join(value for value in values if value) or None
+
+
+async def iter_clinical_trial_pages(condition: str, max_results: int, status: Optional[str] = None):
+    """
+    Page through ClinicalTrials.gov search results by following nextPageToken.
+    The status filter is applied upstream. Yields one list of trials per page.
+    """
     params = {
         "query.cond": condition,
-        "pageSize": max_results,
         "format": "json"
     }
+    overall_status = _overall_status_filter(status)
+    if overall_status:
+        params["filter.overallStatus"] = overall_status
     
-    try:
-        response = requests.get(base_url, params=params, timeout=10)
+    remaining = max_results
+    while remaining > 0:
+        params["pageSize"] = min(remaining, CLINICALTRIALS_PAGE_SIZE)
+        response = await clinicaltrials_upstream.get(CLINICALTRIALS_API_URL, params=params)
+        response.raise_for_status()
         data = response.json()
         
-        trials = []
-        if "studies" in data:
-            for study in data["studies"]:
-                try:
-                    protocol = study.get("protocolSection", {})
-                    identification = protocol.get("identificationModule", {})
-                    status_module = protocol.get("statusModule", {})
-                    description = protocol.get("descriptionModule", {})
-                    conditions = protocol.get("conditionsModule", {})
-                    design = protocol.get("designModule", {})
-                    contacts = protocol.get("contactsLocationsModule", {})
-                    
-                    nct_id = identification.get("nctId", "")
-                    title = identification.get("briefTitle", "No title")
-                    
-                    condition_list = conditions.get("conditions", [])
-                    condition_str = ", ".join(condition_list) if condition_list else "Unknown"
-                    
-                    phase_list = design.get("phases", [])
-                    phase = ", ".join(phase_list) if phase_list else "Unknown"
-                    
-                    status = status_module.get("overallStatus", "Unknown")
-                    
-                    brief_summary = description.get("briefSummary", "No description available")
-                    
-                    # Get location
-                    locations = contacts.get("locations", [])
-                    location = locations[0].get("city", "Unknown") if locations else "Unknown"
-                    
-                    # Get contact email
-                    central_contacts = contacts.get("centralContacts", [])
-                    contact_email = central_contacts[0].get("email", "") if central_contacts else ""
-                    
-                    trials.append({
-                        "nct_id": nct_id,
-                        "title": title,
-                        "condition": condition_str,
-                        "phase": phase,
-                        "status": status,
-                        "location": location,
-                        "description": brief_summary if len(brief_summary) < 5000 else brief_summary[:5000] + "...",
-                        "contact_email": contact_email,
-                        "url": f"https://clinicaltrials.gov/study/{nct_id}"
-                    })
-                except Exception as e:
-                    continue
+        trials = [trial for trial in map(_parse_study, data.get("studies", [])) if trial]
+        trials = trials[:remaining]
+        remaining -= len(trials)
+        if trials:
+            yield trials
         
+        next_page_token = data.get("nextPageToken")
+        if not next_page_token or not trials:
+            break
+        params["pageToken"] = next_page_token
+
+
+async def fetch_clinical_trials(condition: str, max_results: int = 10, status: Optional[str] = None):
+    """
+    Fetch clinical trials from ClinicalTrials.gov API
+    """
+    try:
+        trials = []
+        async for page in iter_clinical_trial_pages(condition, max_results, status):
+            trials.extend(page)
         return trials
     
+    except UpstreamUnavailable:
+        raise
     except Exception as e:
         print(f"Error fetching ClinicalTrials.gov data: {e}")
         return []
 
 
+def _trial_content_hash(trial_data: dict) -> str:
+    """
+    Stable hash of the fetched trial fields, used to skip rewriting unchanged rows
+    """
+    payload = json.dumps(trial_data, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _store_trials(db: Session, trials: List[dict]) -> Tuple[List[str], List[str]]:
+    """
+    Insert new trials and refresh changed ones (and their sites) in one
+    transaction. Returns the NCT numbers in the order they were fetched, and
+    those of the trials that were new or changed.
+    """
+    if not trials:
+        return [], []
+    
+    now = datetime.utcnow()
+    rows = list({
+        trial["nct_id"]: {
+            **{field: value for field, value in trial.items() if field != "sites"},
+            "content_hash": _trial_content_hash(trial),
+            "updated_at": now
+        }
+        for trial in trials
+    }.values())
+    sites = {trial["nct_id"]: trial.get("sites", []) for trial in trials}
+    stored_hashes = dict(
+        db.query(ExternalTrial.nct_id, ExternalTrial.content_hash).filter(ExternalTrial.nct_id.in_(sites))
+    )
+    changed = [row["nct_id"] for row in rows if stored_hashes.get(row["nct_id"]) != row["content_hash"]]
+    
+    for start in range(0, len(rows), TRIAL_UPSERT_BATCH_SIZE):
+        batch = rows[start:start + TRIAL_UPSERT_BATCH_SIZE]
+        stmt = insert_statement(db, ExternalTrial).values(batch)
+        excluded = stmt.excluded
+        update_fields = {
+            field: excluded[field] for field in batch[0]
+            if field != "nct_id"
+        }
+        # A rewritten description invalidates the cached AI summary and earns it fresh attempts
+        description_changed = ExternalTrial.description.is_distinct_from(excluded.description)
+        update_fields["ai_summary"] = case((description_changed, None), else_=ExternalTrial.ai_summary)
+        update_fields["summary_failures"] = case((description_changed, None), else_=ExternalTrial.summary_failures)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["nct_id"],
+                set_=update_fields,
+                where=ExternalTrial.content_hash.is_distinct_from(excluded.content_hash)
+            )
+        )
+    
+    # Replace the sites of new and changed trials
+    if changed:
+        trial_ids = dict(db.query(ExternalTrial.nct_id, ExternalTrial.id).filter(ExternalTrial.nct_id.in_(changed)))
+        db.query(ExternalTrialSite).filter(
+            ExternalTrialSite.trial_id.in_(trial_ids.values())
+        ).delete(synchronize_session=False)
+        site_rows = [
+            {**site, "trial_id": trial_ids[nct_id]}
+            for nct_id in changed for site in sites[nct_id]
+        ]
+        bulk_insert(db, ExternalTrialSite, site_rows)
+    db.commit()
+    
+    return [trial["nct_id"] for trial in trials], changed
+
+
+def _load_trials(db: Session, nct_ids: List[str]):
+    """
+    Load cached trials by NCT number, preserving the given order
+    """
+    cached = {
+        trial.nct_id: trial for trial in db.query(ExternalTrial).filter(
+            ExternalTrial.nct_id.in_(nct_ids)
+        )
+    }
+    return [cached[nct_id] for nct_id in nct_ids if nct_id in cached]
+
+
 @router.get("/clinicaltrials/search")
-def search_clinical_trials(condition: str, status: str = None, max_results: int = 10, db: Session = Depends(get_db)):
+async def search_clinical_trials(condition: str, status: str = None, max_results: int = 10, db: Session = Depends(get_db)):
     """
     Search ClinicalTrials.gov for trials
     """
-    trials = fetch_clinical_trials(condition, max_results)
+    cache_key = _search_cache_key("clinicaltrials", condition, max_results, status)
+    cached_ids = await search_cache.aget(cache_key)
+    if cached_ids is not None:
+        cached_trials = await run_in_threadpool(_load_trials, db, cached_ids)
+        if len(cached_trials) == len(cached_ids):
+            return cached_trials
     
-    # Filter by status if provided
-    if status:
-        trials = [t for t in trials if status.lower() in t["status"].lower()]
+    async def fetch_and_store():
+        trials = await fetch_clinical_trials(condition, max_results, status)
+        # Cache trials in database, refreshing any that changed upstream
+        nct_ids, changed = await write_queue.run_async(_store_trials, trials)
+        summary_pipeline.enqueue("trial", nct_ids)
+        vector_index.enqueue("trial", nct_ids)
+        # Unchanged trials already have up-to-date recommendation rows
+        recommendations.external_trials_changed(changed)
+        if nct_ids:
+            search_cache.set(cache_key, nct_ids)
+        return nct_ids
     
-    # Cache trials in database
-    cached_trials = []
-    for trial_data in trials:
-        existing = db.query(ExternalTrial).filter(
-            ExternalTrial.nct_id == trial_data["nct_id"]
-        ).first()
-        
-        if not existing:
-            trial = ExternalTrial(**trial_data)
-            db.add(trial)
-            db.commit()
-            db.refresh(trial)
-            cached_trials.append(trial)
-        else:
-            cached_trials.append(existing)
+    # Concurrent identical searches share one upstream fetch and one DB write
+    nct_ids = await search_flight.do(cache_key, fetch_and_store)
+    return await run_in_threadpool(_load_trials, db, nct_ids)
+
+
+@router.get("/clinicaltrials/stream")
+async def stream_clinical_trials(condition: str, status: str = None, max_results: int = 100):
+    """
+    Stream ClinicalTrials.gov trials as NDJSON, one page at a time as pages arrive
+    """
+    async def trial_lines():
+        db = SessionLocal()
+        try:
+            async for page in iter_clinical_trial_pages(condition, max_results, status):
+                stored_ids, changed = await write_queue.run_async(_store_trials, page)
+                cached_trials = await run_in_threadpool(_load_trials, db, stored_ids)
+                nct_ids = [trial.nct_id for trial in cached_trials]
+                summary_pipeline.enqueue("trial", nct_ids)
+                vector_index.enqueue("trial", nct_ids)
+                recommendations.external_trials_changed(changed)
+                for trial in cached_trials:
+                    yield ExternalTrialResponse.model_validate(trial).model_dump_json() + "\n"
+        except UpstreamUnavailable as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+        except Exception as e:
+            print(f"Error streaming ClinicalTrials.gov data: {e}")
+            yield json.dumps({"error": "ClinicalTrials.gov fetch failed"}) + "\n"
+        finally:
+            db.close()
+    
+    return StreamingResponse(trial_lines(), media_type="application/x-ndjson")
+
+
+def _nearest_site_km(db: Session, trial_ids: List[int], lat: float, lon: float) -> dict:
+    """
+    Distance from (lat, lon) to the closest site of each trial
+    """
+    nearest = {}
+    sites = db.query(ExternalTrialSite.trial_id, ExternalTrialSite.latitude, ExternalTrialSite.longitude).filter(
+        ExternalTrialSite.trial_id.in_(trial_ids),
+        ExternalTrialSite.latitude.isnot(None),
+        ExternalTrialSite.longitude.isnot(None)
+    )
+    for trial_id, site_lat, site_lon in sites:
+        distance = haversine_km(lat, lon, site_lat, site_lon)
+        if distance < nearest.get(trial_id, float("inf")):
+            nearest[trial_id] = distance
+    return nearest
+
+
+def _match_trials(db: Session, age: float, sex: Optional[str], condition: Optional[str],
+                  status: Optional[str], healthy_volunteer: bool, limit: int,
+                  lat: Optional[float] = None, lon: Optional[float] = None, radius_km: Optional[float] = None):
+    """
+    Cached trials whose structured eligibility admits the patient, best condition match first.
+    With a radius, only trials with a site that close are kept.
+    """
+    query = db.query(ExternalTrial).filter(
+        or_(ExternalTrial.min_age_years.is_(None), ExternalTrial.min_age_years <= age),
+        or_(ExternalTrial.max_age_years.is_(None), ExternalTrial.max_age_years >= age)
+    )
+    if sex:
+        query = query.filter(or_(ExternalTrial.sex.is_(None), ExternalTrial.sex.in_(["ALL", sex])))
+    if healthy_volunteer:
+        query = query.filter(ExternalTrial.healthy_volunteers.is_(True))
+    statuses = _overall_status_filter(status)
+    if statuses:
+        query = query.filter(ExternalTrial.status.in_(statuses.split(",")))
+    if keywords(condition):
+        query = apply_search(query, ExternalTrial, " ".join(keywords(condition)))
+    near = radius_km is not None and lat is not None and lon is not None
+    if near:
+        nearby_sites = filter_bounding_box(
+            db.query(ExternalTrialSite.trial_id), ExternalTrialSite, lat, lon, radius_km
+        )
+        query = query.filter(ExternalTrial.id.in_(nearby_sites.scalar_subquery()))
     
-    return cached_trials
+    matches = []
+    # Over-fetch so trials dropped on exclusion criteria still leave `limit` rows
+    for trial in query.limit(limit * 4):
+        passes, score, _ = prefilter(
+            age, sex, condition or "", trial.condition, trial.eligibility,
+            trial.min_age_years, trial.max_age_years, trial.sex
+        )
+        if passes:
+            matches.append((score, trial))
+    if near:
+        distances = _nearest_site_km(db, [trial.id for _, trial in matches], lat, lon)
+        matches = [(score, trial) for score, trial in matches if distances.get(trial.id, float("inf")) <= radius_km]
+        for _, trial in matches:
+            trial.distance_km = round(distances[trial.id], 3)
+    matches.sort(key=lambda match: (-match[0], getattr(match[1], "distance_km", 0)))
+    return [trial for _, trial in matches[:limit]]
+
+
+@router.get("/clinicaltrials/match", response_model=List[ExternalTrialResponse])
+async def match_clinical_trials(
+    age: float,
+    sex: Optional[str] = None,
+    condition: Optional[str] = None,
+    status: Optional[str] = None,
+    healthy_volunteer: bool = False,
+    limit: int = 50,
+    lat: Optional[float] = None,
+    lon: Optional[float] = None,
+    radius_km: Optional[float] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Match a patient against cached trials with a SQL query on the structured
+    eligibility columns (age range, sex, healthy volunteers, status), then
+    drop trials whose exclusion criteria name the patient's condition.
+    lat/lon/radius_km keep only trials with a site within that distance.
+    """
+    limit = max(1, min(limit, 500))
+    return await run_in_threadpool(
+        _match_trials, db, age, normalize_sex(sex), condition, status, healthy_volunteer, limit,
+        lat, lon, radius_km
+    )
+
+
+@router.get("/clinicaltrials/cached", response_model=List[ExternalTrialResponse])
+def search_cached_trials(q: str, limit: int = 50, db: Session = Depends(get_db)):
+    """
+    Full-text search over trials already cached from ClinicalTrials.gov, best matches first
+    """
+    return apply_search(db.query(ExternalTrial), ExternalTrial, q).limit(max(1, min(limit, 500))).all()
+
+
+@router.get("/pubmed/cached", response_model=List[ExternalPublicationResponse])
+def search_cached_publications(q: str, limit: int = 50, db: Session = Depends(get_db)):
+    """
+    Full-text search over publications already cached from PubMed, best matches first
+    """
+    return apply_search(db.query(ExternalPublication), ExternalPublication, q).limit(max(1, min(limit, 500))).all()
 
 
 # ============ ORCID Integration ============
 @router.get("/orcid/{orcid_id}")
-def get_orcid_publications(orcid_id: str):
+async def get_orcid_publications(orcid_id: str):
     """
     Fetch researcher's publications from ORCID
     """
@@ -235,7 +706,7 @@ def get_orcid_publications(orcid_id: str):
     }
     
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = await orcid_upstream.get(url, headers=headers)
         if response.status_code == 200:
             data = response.json()
             works = data.get("group", [])
@@ -262,6 +733,8 @@ def get_orcid_publications(orcid_id: str):
         else:
             raise HTTPException(status_code=404, detail="ORCID profile not found")
     
+    except (HTTPException, UpstreamUnavailable):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching ORCID data: {str(e)}")
 
@@ -271,11 +744,17 @@ def external_api_health():
     """
     Check external API service health
     """
+    upstreams = upstream_metrics()
+    services = {
+        name: "active" if metrics["circuit_state"] == "closed" else f"circuit_{metrics['circuit_state']}"
+        for name, metrics in upstreams.items()
+    }
+    
     return {
-        "status": "healthy",
-        "services": {
-            "pubmed": "active",
-            "clinicaltrials": "active",
-            "orcid": "active"
-        }
+        "status": "healthy" if all(state == "active" for state in services.values()) else "degraded",
+        "services": services,
+        "upstreams": upstreams,
+        "search_cache": search_cache.stats(),
+        "single_flight": search_flight.stats(),
+        "summary_pipeline": summary_pipeline.stats()
     }
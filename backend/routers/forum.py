@@ -1,21 +1,26 @@
 """
 Forum router - Create and read forum posts with categories and replies
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List
-from database import get_db
+from database import get_db, write_queue
 from models import ForumPost, User
+from pagination import paginate
 from schemas import ForumPostCreate, ForumPostResponse
 
 router = APIRouter()
 
 
 @router.post("/", response_model=ForumPostResponse, status_code=201)
-def create_post(post: ForumPostCreate, db: Session = Depends(get_db)):
+def create_post(post: ForumPostCreate):
     """
     Create a new forum post or reply
     """
+    return write_queue.run(_insert_post, post)
+
+
+def _insert_post(db: Session, post: ForumPostCreate) -> ForumPost:
     # Verify author exists
     author = db.query(User).filter(User.id == post.author_id).first()
     if not author:
@@ -33,21 +38,23 @@ def create_post(post: ForumPostCreate, db: Session = Depends(get_db)):
     
     db_post = ForumPost(**post.model_dump())
     db.add(db_post)
-    db.commit()
-    db.refresh(db_post)
+    db.flush()
     return db_post
 
 
 @router.get("/", response_model=List[ForumPostResponse])
 def get_posts(
+    response: Response,
     author_id: int = None, 
     category: str = None, 
     is_question: bool = None,
     parent_id: int = None,
+    cursor: str = None,
+    limit: int = None,
     db: Session = Depends(get_db)
 ):
     """
-    Get all forum posts with optional filters
+    Get forum posts with optional filters, newest first and paged by `cursor`
     """
     query = db.query(ForumPost)
     
@@ -67,7 +74,7 @@ def get_posts(
     elif parent_id is None and 'parent_id' not in locals():
         query = query.filter(ForumPost.parent_id == None)
     
-    return query.order_by(ForumPost.created_at.desc()).all()
+    return paginate(query, ForumPost, response, cursor, limit)
 
 
 @router.get("/categories")
@@ -1,11 +1,12 @@
 """
 Meeting requests router - Manage patient-expert meeting requests
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List
 from database import get_db
 from models import MeetingRequest, User
+from pagination import paginate
 from schemas import MeetingRequestCreate, MeetingRequestResponse, MeetingRequestUpdate
 
 router = APIRouter()
@@ -36,9 +37,10 @@ def create_meeting_request(meeting: MeetingRequestCreate, db: Session = Depends(
 
 
 @router.get("/", response_model=List[MeetingRequestResponse])
-def get_meeting_requests(user_id: int = None, status: str = None, db: Session = Depends(get_db)):
+def get_meeting_requests(response: Response, user_id: int = None, status: str = None,
+                         cursor: str = None, limit: int = None, db: Session = Depends(get_db)):
     """
-    Get meeting requests, optionally filtered by user and status
+    Get meeting requests, optionally filtered by user and status, newest first and paged by `cursor`
     """
     query = db.query(MeetingRequest)
     
@@ -50,23 +52,27 @@ def get_meeting_requests(user_id: int = None, status: str = None, db: Session =
     if status:
         query = query.filter(MeetingRequest.status == status)
     
-    return query.all()
+    return paginate(query, MeetingRequest, response, cursor, limit)
 
 
 @router.get("/sent/{user_id}", response_model=List[MeetingRequestResponse])
-def get_sent_meetings(user_id: int, db: Session = Depends(get_db)):
+def get_sent_meetings(user_id: int, response: Response, cursor: str = None, limit: int = None,
+                      db: Session = Depends(get_db)):
     """
-    Get all meeting requests sent by a user (patient)
+    Get meeting requests sent by a user (patient), newest first and paged by `cursor`
     """
-    return db.query(MeetingRequest).filter(MeetingRequest.requester_id == user_id).all()
+    query = db.query(MeetingRequest).filter(MeetingRequest.requester_id == user_id)
+    return paginate(query, MeetingRequest, response, cursor, limit)
 
 
 @router.get("/received/{user_id}", response_model=List[MeetingRequestResponse])
-def get_received_meetings(user_id: int, db: Session = Depends(get_db)):
+def get_received_meetings(user_id: int, response: Response, cursor: str = None, limit: int = None,
+                          db: Session = Depends(get_db)):
     """
-    Get all meeting requests received by a user (expert)
+    Get meeting requests received by a user (expert), newest first and paged by `cursor`
     """
-    return db.query(MeetingRequest).filter(MeetingRequest.expert_id == user_id).all()
+    query = db.query(MeetingRequest).filter(MeetingRequest.expert_id == user_id)
+    return paginate(query, MeetingRequest, response, cursor, limit)
 
 
 @router.put("/{meeting_id}", response_model=MeetingRequestResponse)
@@ -1,12 +1,14 @@
 """
 Publications router - CRUD operations for research publications
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List
 from database import get_db
 from models import Publication
 from schemas import PublicationCreate, PublicationResponse
+from pagination import page_size, paginate
+from search_index import apply_search
 
 router = APIRouter()
 
@@ -24,14 +26,24 @@ def create_publication(publication: PublicationCreate, db: Session = Depends(get
 
 
 @router.get("/", response_model=List[PublicationResponse])
-def get_publications(researcher_id: int = None, db: Session = Depends(get_db)):
+def get_publications(
+    response: Response,
+    researcher_id: int = None,
+    q: str = None,
+    cursor: str = None,
+    limit: int = None,
+    db: Session = Depends(get_db)
+):
     """
-    Get all publications, optionally filtered by researcher
+    Get publications, optionally filtered by researcher, newest first and paged by `cursor`.
+    `q` runs a full-text search and returns the best `limit` matches first.
     """
     query = db.query(Publication)
     if researcher_id:
         query = query.filter(Publication.researcher_id == researcher_id)
-    return query.all()
+    if q:
+        return apply_search(query, Publication, q).limit(page_size(limit)).all()
+    return paginate(query, Publication, response, cursor, limit)
 
 
 @router.get("/{publication_id}", response_model=PublicationResponse)
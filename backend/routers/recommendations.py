@@ -0,0 +1,33 @@
+"""
+Recommendations router - Precomputed trial recommendations for patients
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+from database import get_db
+from models import User
+from recommendations import load_recommendations, patient_changed
+from schemas import TrialRecommendationResponse
+
+router = APIRouter()
+
+
+@router.get("/{patient_id}", response_model=List[TrialRecommendationResponse])
+def get_recommendations(patient_id: int, limit: int = 20, db: Session = Depends(get_db)):
+    """
+    Top trial recommendations for a patient, read from the materialized
+    scores (never computed on request)
+    """
+    return load_recommendations(db, patient_id, max(1, min(limit, 100)))
+
+
+@router.post("/{patient_id}/refresh", status_code=202)
+def refresh_recommendations(patient_id: int, db: Session = Depends(get_db)):
+    """
+    Queue a full rescoring of a patient's recommendations
+    """
+    patient = db.query(User).filter(User.id == patient_id, User.role == "patient").first()
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    patient_changed(patient_id)
+    return {"message": "Recommendation refresh queued"}
@@ -0,0 +1,55 @@
+"""
+Search router - Semantic search over cached trials and publications
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import List
+from database import get_db
+from schemas import ExternalPublicationResponse, ExternalTrialResponse, SemanticSearchResult
+from vector_index import SOURCES, vector_index
+
+router = APIRouter()
+
+
+def _semantic_search(db: Session, q: str, kind: str, k: int) -> List[dict]:
+    hits = vector_index.search(q, k, None if kind == "all" else kind)
+    records = {}
+    for source in SOURCES:
+        ids = [row_id for hit_kind, row_id, _ in hits if hit_kind == source]
+        if ids:
+            model = SOURCES[source][0]
+            records.update({(source, record.id): record for record in db.query(model).filter(model.id.in_(ids))})
+    
+    results = []
+    for hit_kind, row_id, score in hits:
+        record = records.get((hit_kind, row_id))
+        if record is None:
+            continue
+        result = {"type": hit_kind, "score": round(score, 4)}
+        if hit_kind == "trial":
+            result["trial"] = ExternalTrialResponse.model_validate(record)
+        else:
+            result["publication"] = ExternalPublicationResponse.model_validate(record)
+        results.append(result)
+    return results
+
+
+@router.get("/semantic", response_model=List[SemanticSearchResult])
+async def semantic_search(q: str, type: str = "all", k: int = 10, db: Session = Depends(get_db)):
+    """
+    Find cached trials and publications by meaning rather than exact keywords
+    (e.g. "heart attack" finds "myocardial infarction"), best matches first
+    """
+    if type != "all" and type not in SOURCES:
+        raise HTTPException(status_code=400, detail="type must be 'all', 'trial' or 'publication'")
+    k = max(1, min(k, 100))
+    return await run_in_threadpool(_semantic_search, db, q, type, k)
+
+
+@router.get("/semantic/stats")
+def semantic_search_stats():
+    """
+    Size and embedder of the semantic search index
+    """
+    return vector_index.stats()
@@ -1,12 +1,16 @@
 """
 Trials router - CRUD operations for clinical trials
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List
 from database import get_db
 from models import Trial
 from schemas import TrialCreate, TrialResponse
+from geo import proximity_mode, proximity_search
+from pagination import page_size, paginate
+from search_index import apply_search
+import recommendations
 
 router = APIRouter()
 
@@ -20,20 +24,49 @@ def create_trial(trial: TrialCreate, db: Session = Depends(get_db)):
     db.add(db_trial)
     db.commit()
     db.refresh(db_trial)
+    recommendations.trials_changed("trial", [db_trial.id])
     return db_trial
 
 
 @router.get("/", response_model=List[TrialResponse])
-def get_trials(condition: str = None, location: str = None, db: Session = Depends(get_db)):
+def get_trials(
+    response: Response,
+    condition: str = None,
+    location: str = None,
+    researcher_id: int = None,
+    q: str = None,
+    lat: float = None,
+    lon: float = None,
+    radius_km: float = None,
+    nearest: int = None,
+    cursor: str = None,
+    limit: int = None,
+    db: Session = Depends(get_db)
+):
     """
-    Get all trials with optional filters
+    Get trials with optional filters, newest first, one page at a time
+    (pass the X-Next-Cursor response header back as `cursor`).
+    `q` runs a full-text search and returns the best `limit` matches first.
+    With lat/lon, `radius_km` returns trials within that distance and
+    `nearest` the k closest trials, nearest first.
     """
     query = db.query(Trial)
+    if q:
+        query = apply_search(query, Trial, q)
     if condition:
         query = query.filter(Trial.condition.ilike(f"%{condition}%"))
     if location:
         query = query.filter(Trial.location.ilike(f"%{location}%"))
-    return query.all()
+    if researcher_id:
+        query = query.filter(Trial.researcher_id == researcher_id)
+    if proximity_mode(lat, lon, radius_km, nearest):
+        matches = proximity_search(query, Trial, lat, lon, radius_km, nearest)[:page_size(limit)]
+        for trial, distance in matches:
+            trial.distance_km = round(distance, 3)
+        return [trial for trial, _ in matches]
+    if q:
+        return query.limit(page_size(limit)).all()
+    return paginate(query, Trial, response, cursor, limit)
 
 
 @router.get("/{trial_id}", response_model=TrialResponse)
@@ -61,6 +94,7 @@ def update_trial(trial_id: int, trial_update: TrialCreate, db: Session = Depends
     
     db.commit()
     db.refresh(trial)
+    recommendations.trials_changed("trial", [trial.id])
     return trial
 
 
@@ -75,4 +109,5 @@ def delete_trial(trial_id: int, db: Session = Depends(get_db)):
     
     db.delete(trial)
     db.commit()
+    recommendations.trial_removed("trial", trial_id)
     return {"message": "Trial deleted successfully"}
@@ -1,12 +1,14 @@
 """
 User router - signup and login operations
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List
 from database import get_db
 from models import User
+from pagination import paginate
 from schemas import UserCreate, UserResponse, UserUpdate
+import recommendations
 
 router = APIRouter()
 
@@ -26,6 +28,8 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    if db_user.role == "patient":
+        recommendations.patient_changed(db_user.id)
     return db_user
 
 
@@ -41,14 +45,15 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/", response_model=List[UserResponse])
-def get_all_users(role: str = None, db: Session = Depends(get_db)):
+def get_all_users(response: Response, role: str = None, cursor: str = None, limit: int = None,
+                  db: Session = Depends(get_db)):
     """
-    Get all users, optionally filtered by role
+    Get users, optionally filtered by role, newest first and paged by `cursor`
     """
     query = db.query(User)
     if role:
         query = query.filter(User.role == role)
-    return query.all()
+    return paginate(query, User, response, cursor, limit)
 
 
 @router.put("/{user_id}", response_model=UserResponse)
@@ -67,6 +72,8 @@ def update_user(user_id: int, user_update: UserUpdate, db: Session = Depends(get
     
     db.commit()
     db.refresh(user)
+    if user.role == "patient":
+        recommendations.patient_changed(user.id)
     return user
 
 
@@ -1,9 +1,13 @@
 """
 Pydantic schemas for request/response validation
 """
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
 from datetime import datetime
+import os
+
+# Texts accepted by one /ai/summarize/batch request
+AI_SUMMARIZE_BATCH_MAX_TEXTS = int(os.getenv("AI_SUMMARIZE_BATCH_MAX_TEXTS", "100"))
 
 
 # ============ User Schemas ============
@@ -44,6 +48,8 @@ class UserUpdate(BaseModel):
     location: Optional[str] = None
     city: Optional[str] = None
     country: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     specialties: Optional[str] = None
     research_interests: Optional[str] = None
     orcid: Optional[str] = None
@@ -66,6 +72,8 @@ class TrialBase(BaseModel):
     condition: str
     phase: str
     location: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     description: Optional[str] = None
 
 
@@ -77,6 +85,7 @@ class TrialResponse(TrialBase):
     id: int
     researcher_id: int
     created_at: datetime
+    distance_km: Optional[float] = None  # Set by proximity searches
     
     class Config:
         from_attributes = True
@@ -222,10 +231,18 @@ class ExternalTrialResponse(BaseModel):
     location: Optional[str] = None
     description: Optional[str] = None
     eligibility: Optional[str] = None
+    min_age_years: Optional[float] = None
+    max_age_years: Optional[float] = None
+    sex: Optional[str] = None
+    healthy_volunteers: Optional[bool] = None
+    inclusion_criteria: Optional[str] = None
+    exclusion_criteria: Optional[str] = None
     contact_email: Optional[str] = None
     url: Optional[str] = None
     ai_summary: Optional[str] = None
     created_at: datetime
+    updated_at: Optional[datetime] = None
+    distance_km: Optional[float] = None  # Nearest site, set by proximity searches
     
     class Config:
         from_attributes = True
@@ -238,3 +255,45 @@ class SummarizeRequest(BaseModel):
 
 class SummarizeResponse(BaseModel):
     summary: str
+
+
+class SummarizeBatchRequest(BaseModel):
+    items: List[SummarizeRequest] = Field(max_length=AI_SUMMARIZE_BATCH_MAX_TEXTS)
+
+
+class SummarizeBatchResponse(BaseModel):
+    summaries: List[SummarizeResponse]
+
+
+class EligibilityScreenRequest(BaseModel):
+    patient_age: int
+    patient_sex: Optional[str] = None
+    patient_condition: str
+    patient_symptoms: str = ""
+    trial_ids: List[int]  # ExternalTrial IDs
+
+
+# ============ Search Schemas ============
+class SemanticSearchResult(BaseModel):
+    type: str  # "trial" or "publication"
+    score: float  # cosine similarity
+    trial: Optional[ExternalTrialResponse] = None
+    publication: Optional[ExternalPublicationResponse] = None
+
+
+# ============ Recommendation Schemas ============
+class TrialRecommendationResponse(BaseModel):
+    trial_type: str  # "trial" or "external"
+    trial_id: int
+    score: float
+    condition_score: float
+    distance_km: Optional[float] = None
+    phase_score: float
+    status_score: float
+    updated_at: Optional[datetime] = None
+    title: str
+    condition: Optional[str] = None
+    phase: Optional[str] = None
+    location: Optional[str] = None
+    status: Optional[str] = None
+    url: Optional[str] = None
@@ -0,0 +1,103 @@
+"""
+SQLite FTS5 full-text indexes over trials, publications, cached external
+records and user profiles, with bm25-ranked search
+"""
+import re
+from typing import Dict, List, Tuple
+
+from sqlalchemy import and_, column, func, literal_column, or_, table
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query
+
+from models import ExternalPublication, ExternalTrial, Publication, Trial, User
+
+# model -> (FTS table name, indexed columns)
+SEARCH_INDEXES: Dict[type, Tuple[str, List[str]]] = {
+    Trial: ("trials_fts", ["title", "condition", "location", "description"]),
+    Publication: ("publications_fts", ["title", "summary"]),
+    ExternalTrial: ("external_trials_fts", ["title", "condition", "description", "eligibility"]),
+    ExternalPublication: ("external_publications_fts", ["title", "authors", "abstract", "journal"]),
+    User: ("users_fts", ["name", "specialties", "research_interests", "bio", "location"]),
+}
+
+# False until init_search_index() has built the indexes (and always on non-SQLite databases)
+fts_enabled = False
+
+
+def _index_ddl(source: str, fts: str, columns: List[str]) -> List[str]:
+    cols = ", ".join(columns)
+    new_values = ", ".join(f"new.{name}" for name in columns)
+    old_values = ", ".join(f"old.{name}" for name in columns)
+    # External-content tables store only the index; triggers keep it in sync with the source table
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{cols}, content='{source}', content_rowid='id', tokenize='porter unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+    ]
+
+
+def init_search_index(engine: Engine):
+    """
+    Create the FTS5 tables and sync triggers if missing, and build the
+    index for rows that existed before it. Search falls back to LIKE
+    filters when the database is not SQLite or lacks FTS5.
+    """
+    global fts_enabled
+    if engine.dialect.name != "sqlite":
+        return
+    try:
+        with engine.begin() as conn:
+            existing = {
+                name for (name,) in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'")
+            }
+            for model, (fts, columns) in SEARCH_INDEXES.items():
+                for statement in _index_ddl(model.__tablename__, fts, columns):
+                    conn.exec_driver_sql(statement)
+                if fts not in existing:
+                    conn.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+        fts_enabled = True
+    except Exception as e:
+        print(f"Full-text search unavailable, falling back to LIKE: {e}")
+
+
+def _terms(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def match_expression(text: str, match_any: bool = False) -> str:
+    """
+    FTS5 query matching every word of `text` as a prefix, e.g. "breast canc"
+    -> '"breast"* AND "canc"*' (OR with `match_any`). Quoting keeps user
+    input from being read as FTS5 syntax.
+    """
+    return (" OR " if match_any else " AND ").join(f'"{term}"*' for term in _terms(text))
+
+
+def apply_search(query: Query, model: type, text: str, match_any: bool = False) -> Query:
+    """
+    Restrict `query` over `model` to rows matching `text`, best matches
+    first (bm25). Without FTS5, every word (any word, with `match_any`)
+    must appear in one of the indexed columns and the existing order is kept.
+    """
+    fts, columns = SEARCH_INDEXES[model]
+    terms = _terms(text)
+    if not terms:
+        return query
+    if not fts_enabled:
+        combine = or_ if match_any else and_
+        return query.filter(combine(*(
+            or_(*(getattr(model, name).ilike(f"%{term}%") for name in columns))
+            for term in terms
+        )))
+    fts_table = table(fts, column("rowid"))
+    return (
+        query.join(fts_table, fts_table.c.rowid == model.id)
+        .filter(literal_column(fts).op("MATCH")(match_expression(text, match_any)))
+        .order_by(func.bm25(literal_column(fts)))
+    )
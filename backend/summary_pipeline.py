@@ -0,0 +1,213 @@
+"""
+Background pipeline that fills ai_summary for cached external publications and trials
+"""
+import asyncio
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from models import ExternalPublication, ExternalTrial
+from routers import ai
+
+SUMMARY_PIPELINE_ENABLED = os.getenv("SUMMARY_PIPELINE_ENABLED", "true").lower() in ("1", "true", "yes")
+SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", "20"))
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+SUMMARY_SCAN_INTERVAL = float(os.getenv("SUMMARY_SCAN_INTERVAL", "60"))
+SUMMARY_QUEUE_MAX = int(os.getenv("SUMMARY_QUEUE_MAX", "10000"))
+# Rows whose summarization failed this many times (e.g. safety-blocked) are no longer retried
+SUMMARY_MAX_ATTEMPTS = int(os.getenv("SUMMARY_MAX_ATTEMPTS", "3"))
+
+# kind -> (model, external key column, text column, placeholder text that is not worth summarizing)
+SOURCES = {
+    "publication": (ExternalPublication, ExternalPublication.external_id, ExternalPublication.abstract, "No abstract available"),
+    "trial": (ExternalTrial, ExternalTrial.nct_id, ExternalTrial.description, "No description available"),
+}
+
+
+class SummaryPipeline:
+    """
+    Finds cached rows whose ai_summary is NULL, summarizes them in batches
+    with bounded concurrency and writes the summaries back in one
+    transaction per batch.
+
+    Rows are queued by the search endpoints as they are ingested, and a
+    periodic scan picks up anything missed (e.g. rows from before a restart).
+    Failed attempts are counted per row, and rows that reach
+    SUMMARY_MAX_ATTEMPTS are skipped until their text changes.
+    """
+
+    def __init__(self, batch_size: int = SUMMARY_BATCH_SIZE, concurrency: int = SUMMARY_CONCURRENCY,
+                 scan_interval: float = SUMMARY_SCAN_INTERVAL, queue_max: int = SUMMARY_QUEUE_MAX):
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.scan_interval = scan_interval
+        self.queue_max = queue_max
+        self.metrics = {"summarized": 0, "failed": 0, "batches": 0, "dropped": 0}
+        self.max_attempts = SUMMARY_MAX_ATTEMPTS
+        self._queue = None
+        self._queued = set()
+        self._tasks = []
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.queue_max)
+        self._tasks = [
+            asyncio.create_task(self._scan_forever()),
+            asyncio.create_task(self._process_forever()),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, kind: str, keys: Iterable[str]):
+        """
+        Queue rows for summarization by external key. Rows that already
+        have a summary are skipped when the batch is loaded.
+        """
+        if self._queue is None:
+            return
+        for key in keys:
+            item = (kind, key)
+            if item in self._queued:
+                continue
+            try:
+                self._queue.put_nowait(item)
+            except asyncio.QueueFull:
+                # The periodic scan will find it later
+                self.metrics["dropped"] += 1
+                return
+            self._queued.add(item)
+
+    async def _scan_forever(self):
+        while True:
+            if ai.model is not None:
+                try:
+                    for kind, keys in (await run_in_threadpool(self._find_unsummarized)).items():
+                        self.enqueue(kind, keys)
+                except Exception as e:
+                    print(f"Summary pipeline scan failed: {e}")
+            await asyncio.sleep(self.scan_interval)
+
+    def _find_unsummarized(self) -> Dict[str, List[str]]:
+        limit = max(self.queue_max - self._queue.qsize(), 0)
+        db = SessionLocal()
+        try:
+            found = {}
+            for kind, (model, key_column, text_column, placeholder) in SOURCES.items():
+                found[kind] = [
+                    key for (key,) in db.query(key_column).filter(
+                        *self._pending_filters(model, text_column, placeholder)
+                    ).order_by(model.id).limit(limit)
+                ]
+            return found
+        finally:
+            db.close()
+
+    def _pending_filters(self, model, text_column, placeholder) -> list:
+        # Unsummarized rows with text worth summarizing that have not failed too often
+        return [
+            model.ai_summary.is_(None),
+            text_column.isnot(None),
+            text_column != placeholder,
+            func.coalesce(model.summary_failures, 0) < self.max_attempts,
+        ]
+
+    async def _next_batch(self) -> List[Tuple[str, str]]:
+        batch = [await self._queue.get()]
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _process_forever(self):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def summarize_one(kind: str, key: str, text: str):
+            async with semaphore:
+                try:
+                    return kind, key, await ai.summarize(text)
+                except Exception as e:
+                    print(f"Summary pipeline failed for {kind} {key}: {e}")
+                    self.metrics["failed"] += 1
+                    return kind, key, None
+
+        while True:
+            batch = await self._next_batch()
+            try:
+                if ai.model is None:
+                    continue
+                texts = await run_in_threadpool(self._load_texts, batch)
+                results = await asyncio.gather(*(summarize_one(*item) for item in texts))
+                if results:
+                    await run_in_threadpool(self._write_summaries, results)
+                    self.metrics["summarized"] += sum(1 for _, _, summary in results if summary is not None)
+                self.metrics["batches"] += 1
+            except Exception as e:
+                print(f"Summary pipeline batch failed: {e}")
+            finally:
+                self._queued.difference_update(batch)
+
+    def _load_texts(self, batch: List[Tuple[str, str]]) -> List[Tuple[str, str, str]]:
+        db = SessionLocal()
+        try:
+            texts = []
+            for kind, (model, key_column, text_column, placeholder) in SOURCES.items():
+                keys = [key for item_kind, key in batch if item_kind == kind]
+                if not keys:
+                    continue
+                rows = db.query(key_column, text_column).filter(
+                    key_column.in_(keys),
+                    *self._pending_filters(model, text_column, placeholder)
+                )
+                texts.extend((kind, key, text) for key, text in rows)
+            return texts
+        finally:
+            db.close()
+
+    def _write_summaries(self, results: List[Tuple[str, str, Optional[str]]]):
+        """
+        Store the summaries and count a failed attempt for rows without one
+        """
+        db = SessionLocal()
+        try:
+            for kind, (model, key_column, _, _) in SOURCES.items():
+                table = model.__table__
+                pending = table.update().where(
+                    table.c[key_column.key] == bindparam("row_key"), table.c.ai_summary.is_(None)
+                )
+                summaries = [
+                    {"row_key": key, "summary": summary}
+                    for item_kind, key, summary in results if item_kind == kind and summary is not None
+                ]
+                if summaries:
+                    db.execute(pending.values(ai_summary=bindparam("summary")), summaries)
+                failures = [
+                    {"row_key": key}
+                    for item_kind, key, summary in results if item_kind == kind and summary is None
+                ]
+                if failures:
+                    db.execute(
+                        pending.values(summary_failures=func.coalesce(table.c.summary_failures, 0) + 1),
+                        failures
+                    )
+            db.commit()
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        return {
+            **self.metrics,
+            "enabled": SUMMARY_PIPELINE_ENABLED,
+            "running": bool(self._tasks),
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batch_size": self.batch_size,
+            "concurrency": self.concurrency,
+            "max_attempts": self.max_attempts,
+        }
+
+
+summary_pipeline = SummaryPipeline()
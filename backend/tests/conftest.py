@@ -0,0 +1,125 @@
+"""
+Shared test fixtures.
+
+The backend reads its configuration from the environment at import time,
+so the test defaults are set here, before any backend module is imported.
+The app database is a throwaway SQLite file unless TEST_DATABASE_URL points
+elsewhere (it is never taken from DATABASE_URL, so a configured production
+database cannot be written to by accident).
+
+Tests using the `backend_db` fixture run once per supported database: a
+throwaway SQLite file, an in-memory SQLite database, and PostgreSQL when
+TEST_POSTGRES_URL names a scratch database (its tables are dropped and
+recreated around each test).
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+import httpx
+import pytest
+
+TEST_DIR = tempfile.mkdtemp(prefix="curalink-tests-")
+
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{TEST_DIR}/curalink.db"
+os.environ["GOOGLE_API_KEY"] = ""  # no real model; tests install fakes
+os.environ["AI_CACHE_DB_PATH"] = ""  # memory-only summary cache
+os.environ["SUMMARY_PIPELINE_ENABLED"] = "false"
+os.environ["VECTOR_INDEX_DIR"] = os.path.join(TEST_DIR, "vector_index")
+os.environ["PUBMED_EUTILS_URL"] = "http://eutils.test/entrez/eutils"
+os.environ["CLINICALTRIALS_API_URL"] = "http://clinicaltrials.test/api/v2/studies"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http_client  # noqa: E402
+import main  # noqa: E402
+from database import Base, create_db_engine  # noqa: E402
+from migrations import migration_engine, run_migrations  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def run():
+    """
+    Run a coroutine to completion on one event loop shared by the session,
+    as under uvicorn (the app's module-level asyncio primitives bind to it)
+    """
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+def _drop_schema(engine):
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE IF EXISTS schema_version")
+
+
+@pytest.fixture(params=["sqlite", "sqlite-memory", "postgresql"])
+def backend_db(request, tmp_path):
+    """
+    Session factory bound to a freshly created and migrated schema, as the
+    app would build it from DATABASE_URL, once per supported backend
+    """
+    if request.param == "sqlite":
+        url = f"sqlite:///{tmp_path}/curalink.db"
+    elif request.param == "sqlite-memory":
+        url = "sqlite://"
+    else:
+        url = os.getenv("TEST_POSTGRES_URL")
+        if not url:
+            pytest.skip("TEST_POSTGRES_URL is not set")
+    engine = create_db_engine(url)
+    with migration_engine(engine) as schema_engine:
+        _drop_schema(schema_engine)
+        Base.metadata.create_all(bind=schema_engine)
+        run_migrations(schema_engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+    if request.param == "postgresql":
+        with migration_engine(engine) as schema_engine:
+            _drop_schema(schema_engine)
+
+
+@pytest.fixture
+def app_client():
+    """
+    Factory for an async client that calls the app in-process
+    """
+    return lambda: httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://testserver")
+
+
+class StubUpstream:
+    """
+    Answers outbound requests to one origin with `handler(request)` and
+    records every request it receives
+    """
+
+    def __init__(self, origin: str, handler):
+        self.origin = origin
+        self.handler = handler
+        self.requests = []
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(self._respond))
+
+    async def _respond(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return await self.handler(request)
+
+
+@pytest.fixture
+def stub_upstream():
+    """
+    Install stub upstreams in the shared HTTP client registry for the duration of a test
+    """
+    stubs = []
+
+    def install(origin: str, handler) -> StubUpstream:
+        stub = StubUpstream(origin, handler)
+        http_client._clients[origin] = stub.client
+        stubs.append(stub)
+        return stub
+
+    yield install
+    for stub in stubs:
+        http_client._clients.pop(stub.origin, None)
@@ -0,0 +1,188 @@
+"""
+Schema, bulk writes and pagination on every supported backend
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import Response
+from sqlalchemy import inspect, text
+
+import bulk
+from migrations import MIGRATIONS, Migration, migration_engine, run_migrations
+from database import create_db_engine
+from models import ExternalTrial, ExternalTrialSite, User
+from pagination import NEXT_CURSOR_HEADER, paginate
+from routers.external_apis import _store_trials
+
+
+def fetched_trial(n: int, **fields) -> dict:
+    trial = {
+        "nct_id": f"NCT{n:08d}",
+        "title": f"Trial {n}",
+        "condition": "Asthma",
+        "description": f"Description {n}",
+        "sites": [{"facility": f"Site {n}", "city": "Boston", "latitude": 42.36, "longitude": -71.06}],
+    }
+    trial.update(fields)
+    return trial
+
+
+def test_migrations_are_recorded_once(backend_db):
+    db = backend_db()
+    engine = db.get_bind()
+    with migration_engine(engine) as schema_engine:
+        run_migrations(schema_engine)  # a restart: nothing left to apply
+    versions = [version for (version,) in db.execute(text("SELECT version FROM schema_version ORDER BY version"))]
+    assert versions == [migration.version for migration in MIGRATIONS]
+    indexes = {index["name"] for index in inspect(engine).get_indexes("users")}
+    assert {"ix_users_created_id", "ix_users_role_created"} <= indexes
+    db.close()
+
+
+def test_store_trials_reports_only_new_and_changed_trials(backend_db):
+    db = backend_db()
+    trials = [fetched_trial(n) for n in range(3)]
+    assert _store_trials(db, trials) == ([t["nct_id"] for t in trials], [t["nct_id"] for t in trials])
+
+    db.query(ExternalTrial).update({"ai_summary": "cached summary"})
+    db.commit()
+    trials[1] = fetched_trial(1, description="Rewritten description")
+    nct_ids, changed = _store_trials(db, trials + [fetched_trial(3)])
+    assert changed == ["NCT00000001", "NCT00000003"]
+    assert len(nct_ids) == 4
+
+    summaries = dict(db.query(ExternalTrial.nct_id, ExternalTrial.ai_summary))
+    assert summaries == {
+        "NCT00000000": "cached summary",
+        "NCT00000001": None,  # its description changed
+        "NCT00000002": "cached summary",
+        "NCT00000003": None,
+    }
+    assert db.query(ExternalTrialSite).count() == 4  # sites replaced, not duplicated
+    db.close()
+
+
+def test_store_trials_upserts_in_batches(backend_db, monkeypatch):
+    monkeypatch.setattr("routers.external_apis.TRIAL_UPSERT_BATCH_SIZE", 7)
+    db = backend_db()
+    trials = [fetched_trial(n) for n in range(30)]
+    _store_trials(db, trials)
+    _, changed = _store_trials(db, trials)
+    assert changed == []
+    assert db.query(ExternalTrial).count() == 30
+    db.close()
+
+
+@pytest.mark.parametrize("rows", [5, 600], ids=["insert", "copy"])
+def test_bulk_insert_skips_conflicting_rows(backend_db, rows):
+    # 600 rows reach BULK_COPY_MIN_ROWS, so PostgreSQL loads them with COPY
+    db = backend_db()
+    first = [{"nct_id": f"NCT{n:08d}", "title": f"Trial {n}"} for n in range(rows)]
+    bulk.bulk_insert(db, ExternalTrial, first, conflict_columns=["nct_id"])
+    db.commit()
+    overlapping = [{"nct_id": f"NCT{n:08d}", "title": "Duplicate"} for n in range(rows // 2, rows + rows // 2)]
+    bulk.bulk_insert(db, ExternalTrial, overlapping, conflict_columns=["nct_id"])
+    db.commit()
+    assert db.query(ExternalTrial).count() == rows + rows // 2
+    # Only the rows past the end are new; the overlapping half kept its original titles
+    assert db.query(ExternalTrial).filter(ExternalTrial.title == "Duplicate").count() == rows // 2
+    assert db.query(ExternalTrial).filter(ExternalTrial.created_at.is_(None)).count() == 0
+    db.close()
+
+
+def test_pagination_visits_every_row_once(backend_db):
+    db = backend_db()
+    # Many rows share a created_at, so the id tie-breaker decides page boundaries
+    db.add_all([User(name=f"user {n}", role="patient") for n in range(23)])
+    db.commit()
+    db.query(User).filter(User.id % 2 == 0).update({"created_at": db.query(User.created_at).limit(1).scalar_subquery()})
+    db.commit()
+
+    seen, cursor = [], None
+    while True:
+        response = Response()
+        page = paginate(db.query(User), User, response, cursor, limit=5)
+        seen.extend(user.id for user in page)
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+    assert sorted(seen) == sorted(user_id for (user_id,) in db.query(User.id))
+    assert len(seen) == len(set(seen))
+    db.close()
+
+
+def test_invalid_index_is_rebuilt(backend_db):
+    db = backend_db()
+    engine = db.get_bind()
+    if engine.dialect.name != "postgresql":
+        pytest.skip("CREATE INDEX CONCURRENTLY is PostgreSQL only")
+    db.add_all([User(name="a", role="patient"), User(name="b", role="patient")])
+    db.commit()
+    db.close()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("DROP INDEX ix_users_role_created")
+        # Fails on the duplicate roles, leaving an INVALID index behind
+        with pytest.raises(Exception):
+            conn.exec_driver_sql("CREATE UNIQUE INDEX CONCURRENTLY ix_users_role_created ON users (role)")
+
+    migration = Migration(99, "test", indexes=[("ix_users_role_created", "users", ["role", "created_at", "id"])])
+    with migration_engine(engine) as schema_engine:
+        migration.apply(schema_engine)
+    with engine.connect() as conn:
+        valid, definition = conn.execute(text(
+            "SELECT indisvalid, pg_get_indexdef(indexrelid) FROM pg_index "
+            "WHERE indexrelid = to_regclass('ix_users_role_created')"
+        )).one()
+    assert valid
+    assert "UNIQUE" not in definition
+
+
+def test_concurrent_workers_apply_each_migration_once(backend_db, monkeypatch):
+    db = backend_db()
+    engine = db.get_bind()
+    db.close()
+    if engine.dialect.name != "postgresql":
+        pytest.skip("the migration advisory lock is PostgreSQL only")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM schema_version")  # every migration is pending again
+
+    applied, running, overlapped = [], [], []
+    apply = Migration.apply
+
+    def slow_apply(migration, schema_engine):
+        running.append(migration.version)
+        overlapped.append(len(running) > 1)
+        time.sleep(0.05)
+        apply(migration, schema_engine)
+        applied.append(migration.version)
+        running.remove(migration.version)
+
+    monkeypatch.setattr(Migration, "apply", slow_apply)
+
+    def start_worker(_):
+        with migration_engine(engine) as schema_engine:
+            run_migrations(schema_engine)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(pool.map(start_worker, range(3)))
+    assert sorted(applied) == [migration.version for migration in MIGRATIONS]
+    assert not any(overlapped)
+
+
+@pytest.mark.parametrize("url", ["sqlite://", "sqlite:///:memory:"])
+def test_in_memory_sqlite_is_one_database_shared_by_all_threads(url):
+    engine = create_db_engine(url)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE notes (body VARCHAR)")
+
+    def write(body):
+        # Sync endpoints and the write queue use their own threads
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO notes (body) VALUES (:body)"), {"body": body})
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(write, ["a", "b", "c", "d"]))
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM notes").scalar() == 4
+    engine.dispose()
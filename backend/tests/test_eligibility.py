@@ -0,0 +1,99 @@
+"""
+Local eligibility parsing and pre-filtering, on criteria phrased as real
+ClinicalTrials.gov records phrase them
+"""
+import httpx
+import pytest
+
+from eligibility import parse_age_bounds, prefilter, structured_eligibility
+
+ONCOLOGY_CRITERIA = """Inclusion Criteria:
+
+* Age ≥ 18 years
+* ECOG performance status ≤ 2
+* Life expectancy >= 3 months
+* Adequate organ function within 14 days prior to enrollment
+
+Exclusion Criteria:
+
+* Chemotherapy within <= 4 weeks of the first dose
+* Major surgery ≤ 28 days before randomization
+"""
+
+
+@pytest.mark.parametrize("text, expected", [
+    (ONCOLOGY_CRITERIA, (18, None)),
+    ("Life expectancy ≥ 12 weeks", (None, None)),
+    ("Life expectancy of at least 3 months", (None, None)),
+    ("Chemotherapy within <= 4 weeks", (None, None)),
+    ("Washout of ≤ 14 days from prior therapy", (None, None)),
+    ("Stable dosage >= 30 days before screening", (None, None)),
+    ("No prior radiotherapy between 3 and 6 months before enrollment", (None, None)),
+    ("Symptoms from 2 to 4 weeks before the visit", (None, None)),
+    ("Men or women aged 18 to 75 years", (18, 75)),
+    ("Age 40-65 years, inclusive", (40, 65)),
+    ("Participants between 40 and 65 years of age", (40, 65)),
+    ("Children aged 6 months to 5 years", (0.5, 5)),
+    ("Patients 18 years of age or older", (18, None)),
+    ("≥ 18 years of age at the time of consent", (18, None)),
+    ("Subjects at least 21 years old", (21, None)),
+    ("Aged up to 80 years", (None, 80)),
+    ("Age ≤ 75 years", (None, 75)),
+    ("Age: >= 12 years", (12, None)),
+    ("Minimum age: 50 years; Maximum age: 70 years", (50, 70)),
+    ("Infants 28 days of age or younger", (None, 28 / 365)),
+])
+def test_parse_age_bounds(text, expected):
+    assert parse_age_bounds(text) == pytest.approx(expected)
+
+
+def test_durations_do_not_exclude_adults():
+    passes, _, reasons = prefilter(45, "female", "lung cancer", "Non-small cell lung cancer", ONCOLOGY_CRITERIA)
+    assert passes, reasons
+
+    passes, _, reasons = prefilter(16, "female", "lung cancer", "Non-small cell lung cancer", ONCOLOGY_CRITERIA)
+    assert reasons == ["Below minimum age (18 years)"]
+
+
+def test_structured_ages_are_not_completed_from_text():
+    module = {
+        "minimumAge": "18 Years",
+        "sex": "ALL",
+        "eligibilityCriteria": "Inclusion Criteria:\n* Aged up to 75 years\nExclusion Criteria:\n* Chemotherapy within <= 4 weeks",
+    }
+    fields = structured_eligibility(module)
+    # No maximumAge means no upper limit, whatever the free text says
+    assert (fields["min_age_years"], fields["max_age_years"]) == (18, None)
+
+
+def test_text_ages_are_used_when_the_module_has_none():
+    fields = structured_eligibility({"eligibilityCriteria": "Inclusion Criteria:\n* Aged 40 to 65 years"})
+    assert (fields["min_age_years"], fields["max_age_years"]) == (40, 65)
+
+
+def test_match_admits_adults_to_trials_without_a_maximum_age(run, app_client, stub_upstream):
+    study = {
+        "protocolSection": {
+            "identificationModule": {"nctId": "NCT91600001", "briefTitle": "Adjuvant therapy in colorectal cancer"},
+            "statusModule": {"overallStatus": "RECRUITING"},
+            "conditionsModule": {"conditions": ["Colorectal Cancer"]},
+            "eligibilityModule": {
+                "minimumAge": "18 Years",
+                "sex": "ALL",
+                "eligibilityCriteria": "Inclusion Criteria:\n* Stage III colon cancer\n"
+                                       "Exclusion Criteria:\n* Chemotherapy within <= 4 weeks",
+            },
+        }
+    }
+
+    async def studies(request):
+        return httpx.Response(200, json={"studies": [study]})
+
+    stub_upstream("http://clinicaltrials.test", studies)
+
+    async def ingest_and_match():
+        async with app_client() as client:
+            await client.get("/api/external/clinicaltrials/search", params={"condition": "eligibility colorectal"})
+            return await client.get("/api/external/clinicaltrials/match", params={"age": 45, "condition": "colorectal cancer"})
+
+    assert [trial["nct_id"] for trial in run(ingest_and_match()).json()] == ["NCT91600001"]
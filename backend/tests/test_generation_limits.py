@@ -0,0 +1,123 @@
+"""
+Bounds on Gemini generations: the concurrency cap, per-call timeouts and
+cancellation when the client disconnects, against a slow local fake model
+"""
+import asyncio
+import time
+
+import pytest
+
+from routers import ai
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class SlowModel:
+    """
+    Stands in for genai.GenerativeModel: every generation takes `delay`
+    seconds. Records how many were running at once and which were cancelled.
+    """
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+        self.cancelled = 0
+
+    async def generate_content_async(self, prompt: str):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.running -= 1
+        return FakeResponse("Endocrinology")
+
+
+class GoneRequest:
+    """
+    A request whose client has already disconnected
+    """
+
+    async def is_disconnected(self) -> bool:
+        return True
+
+
+@pytest.fixture
+def slow_model(monkeypatch):
+    def install(delay: float, slots: int = 2, timeout: float = 5.0) -> SlowModel:
+        fake = SlowModel(delay)
+        monkeypatch.setattr(ai, "model", fake)
+        monkeypatch.setattr(ai, "_generation_slots", asyncio.Semaphore(slots))
+        monkeypatch.setattr(ai, "AI_TIMEOUT_SECONDS", timeout)
+        return fake
+
+    return install
+
+
+def test_generations_beyond_the_cap_wait_for_a_slot(run, app_client, slow_model):
+    fake = slow_model(delay=0.1, slots=2)
+
+    async def load():
+        async with app_client() as client:
+            calls = [
+                client.post("/api/ai/extract-conditions", params={"symptoms": f"thirst {n}"})
+                for n in range(6)
+            ]
+            started = time.perf_counter()
+            responses = asyncio.gather(*calls)
+            await asyncio.sleep(0.05)
+            # Other endpoints are served while the generations are queued
+            health = await client.get("/api/ai/health")
+            health_latency = time.perf_counter() - started
+            return await responses, health, health_latency, time.perf_counter() - started
+
+    responses, health, health_latency, elapsed = run(load())
+
+    assert [response.status_code for response in responses] == [200] * 6
+    assert fake.max_running == 2
+    assert elapsed >= 0.3  # six calls through two slots take three rounds
+    assert health.status_code == 200 and health_latency < 0.1
+    assert ai.generation_metrics["in_flight"] == 0
+
+
+def test_timed_out_generation_is_a_504(run, app_client, slow_model):
+    fake = slow_model(delay=5.0, timeout=0.05)
+    timeouts = ai.generation_metrics["timeouts"]
+
+    async def match():
+        async with app_client() as client:
+            return await client.post("/api/ai/match-experts", params={"condition": "type 2 diabetes"})
+
+    started = time.perf_counter()
+    response = run(match())
+
+    assert response.status_code == 504
+    assert "timed out" in response.json()["detail"]
+    assert time.perf_counter() - started < 1
+    assert fake.cancelled == 1 and fake.running == 0
+    assert ai.generation_metrics["timeouts"] == timeouts + 1
+
+
+def test_generation_is_cancelled_when_the_client_disconnects(run, slow_model):
+    fake = slow_model(delay=5.0, slots=1)
+    cancelled = ai.generation_metrics["cancelled"]
+
+    async def abandoned_then_next():
+        with pytest.raises(ai.ClientDisconnected):
+            await ai.generate_text("prompt", GoneRequest())
+        # The abandoned call gave its slot back
+        fake.delay = 0
+        return await asyncio.wait_for(ai.generate_text("prompt"), 1)
+
+    started = time.perf_counter()
+    assert run(abandoned_then_next()) == "Endocrinology"
+    assert time.perf_counter() - started < 1
+    assert fake.cancelled == 1 and fake.running == 0
+    assert ai.generation_metrics["cancelled"] == cancelled + 1
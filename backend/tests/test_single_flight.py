@@ -0,0 +1,102 @@
+"""
+Concurrent identical external searches share one upstream fetch
+"""
+import asyncio
+
+import httpx
+
+from routers import external_apis
+
+CONCURRENT_REQUESTS = 50
+
+
+def _study(nct_id: str, condition: str) -> dict:
+    return {
+        "protocolSection": {
+            "identificationModule": {"nctId": nct_id, "briefTitle": f"{condition} study {nct_id}"},
+            "statusModule": {"overallStatus": "RECRUITING"},
+            "conditionsModule": {"conditions": [condition]},
+            "designModule": {"phases": ["PHASE2"]},
+            "eligibilityModule": {"minimumAge": "18 Years", "sex": "ALL"},
+        }
+    }
+
+
+def _pubmed_article(pmid: str) -> str:
+    return (
+        f"<PubmedArticle><MedlineCitation><PMID>{pmid}</PMID><Article>"
+        f"<ArticleTitle>Article {pmid}</ArticleTitle><Journal><Title>J</Title></Journal>"
+        f"</Article></MedlineCitation></PubmedArticle>"
+    )
+
+
+def test_concurrent_trial_searches_make_one_upstream_call(run, app_client, stub_upstream):
+    async def studies(request: httpx.Request) -> httpx.Response:
+        # Slow enough that every client request arrives while the fetch is in flight
+        await asyncio.sleep(0.2)
+        condition = request.url.params["query.cond"]
+        return httpx.Response(200, json={"studies": [_study(f"NCT9000000{i}", condition) for i in range(5)]})
+
+    upstream = stub_upstream("http://clinicaltrials.test", studies)
+
+    async def load():
+        async with app_client() as client:
+            return await asyncio.gather(*[
+                client.get("/api/external/clinicaltrials/search", params={"condition": "singleflight asthma", "max_results": 5})
+                for _ in range(CONCURRENT_REQUESTS)
+            ])
+
+    responses = run(load())
+
+    assert [response.status_code for response in responses] == [200] * CONCURRENT_REQUESTS
+    assert {tuple(trial["nct_id"] for trial in response.json()) for response in responses} == {
+        tuple(f"NCT9000000{i}" for i in range(5))
+    }
+    assert len(upstream.requests) == 1
+    assert external_apis.search_flight.stats()["in_flight"] == 0
+
+
+def test_concurrent_pubmed_searches_make_one_upstream_call(run, app_client, stub_upstream):
+    async def eutils(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.2)
+        if request.url.path.endswith("esearch.fcgi"):
+            return httpx.Response(200, json={"esearchresult": {"idlist": ["81000001", "81000002"]}})
+        ids = request.url.params["id"].split(",")
+        body = "<PubmedArticleSet>" + "".join(_pubmed_article(pmid) for pmid in ids) + "</PubmedArticleSet>"
+        return httpx.Response(200, text=body)
+
+    upstream = stub_upstream("http://eutils.test", eutils)
+
+    async def load():
+        async with app_client() as client:
+            return await asyncio.gather(*[
+                client.get("/api/external/pubmed/search", params={"query": "singleflight asthma", "max_results": 2})
+                for _ in range(CONCURRENT_REQUESTS)
+            ])
+
+    responses = run(load())
+
+    assert [response.status_code for response in responses] == [200] * CONCURRENT_REQUESTS
+    assert all([article["external_id"] for article in response.json()] == ["81000001", "81000002"]
+               for response in responses)
+    # One esearch and one efetch for all of them
+    assert [request.url.path.rsplit("/", 1)[-1] for request in upstream.requests] == ["esearch.fcgi", "efetch.fcgi"]
+
+
+def test_failed_fetch_is_not_shared_with_later_requests(run, app_client, stub_upstream):
+    attempts = []
+
+    async def studies(request: httpx.Request) -> httpx.Response:
+        attempts.append(request)
+        if len(attempts) == 1:
+            return httpx.Response(400, json={"error": "bad request"})
+        return httpx.Response(200, json={"studies": [_study("NCT90000099", "retry")]})
+
+    stub_upstream("http://clinicaltrials.test", studies)
+
+    async def search():
+        async with app_client() as client:
+            return await client.get("/api/external/clinicaltrials/search", params={"condition": "singleflight retry"})
+
+    assert run(search()).json() == []
+    assert [trial["nct_id"] for trial in run(search()).json()] == ["NCT90000099"]
@@ -0,0 +1,165 @@
+"""
+Server-Sent Events streaming of summaries and eligibility analysis,
+against a local fake of Gemini's streaming API
+"""
+import asyncio
+import json
+import time
+
+from routers import ai
+from schemas import SummarizeRequest
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self._text = text
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            # Gemini raises for chunks that carry no text parts (e.g. safety metadata)
+            raise ValueError("chunk has no text")
+        return self._text
+
+
+class FakeStream:
+    def __init__(self, chunks, delay: float, error: Exception = None):
+        self.chunks = chunks
+        self.delay = delay
+        self.error = error
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(self.delay)
+            yield FakeChunk(chunk)
+        if self.error:
+            raise self.error
+
+
+class FakeStreamingModel:
+    """
+    Stands in for genai.GenerativeModel: streams the configured chunks
+    with a delay before each one
+    """
+
+    def __init__(self, chunks, delay: float = 0.0, error: Exception = None):
+        self.chunks = chunks
+        self.delay = delay
+        self.error = error
+        self.calls = []
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        self.calls.append((prompt, stream))
+        return FakeStream(self.chunks, self.delay, self.error)
+
+
+def _events(body: str):
+    """
+    (event, data) pairs of an SSE body; unnamed events are "message"
+    """
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+
+def test_summary_streams_partial_text_then_done(run, app_client, monkeypatch):
+    fake = FakeStreamingModel(["Aspirin ", None, "lowers ", "risk."])
+    monkeypatch.setattr(ai, "model", fake)
+    text = "sse test: a long abstract about aspirin and cardiovascular risk"
+
+    async def summarize_twice():
+        async with app_client() as client:
+            first = await client.post("/api/ai/summarize/stream", json={"text": text})
+            second = await client.post("/api/ai/summarize/stream", json={"text": text})
+        return first, second
+
+    first, second = run(summarize_twice())
+
+    assert first.headers["content-type"].startswith("text/event-stream")
+    assert _events(first.text) == [
+        ("message", {"text": "Aspirin "}),
+        ("message", {"text": "lowers "}),
+        ("message", {"text": "risk."}),
+        ("done", {"summary": "Aspirin lowers risk."}),
+    ]
+    assert fake.calls[0][1] is True  # the streaming API was used
+    # The finished summary was cached: the repeat request makes no model call
+    assert _events(second.text) == [
+        ("message", {"text": "Aspirin lowers risk."}),
+        ("done", {"summary": "Aspirin lowers risk.", "cached": True}),
+    ]
+    assert len(fake.calls) == 1
+
+
+def test_first_event_arrives_before_generation_finishes(run, monkeypatch):
+    monkeypatch.setattr(ai, "model", FakeStreamingModel(["one ", "two ", "three ", "four"], delay=0.1))
+
+    async def time_events():
+        response = await ai.summarize_text_stream(SummarizeRequest(text="sse test: time to first byte"))
+        started = time.perf_counter()
+        arrivals = []
+        async for _ in response.body_iterator:
+            arrivals.append(time.perf_counter() - started)
+        return arrivals
+
+    arrivals = run(time_events())
+
+    assert len(arrivals) == 5  # four text events and "done"
+    assert arrivals[0] < 0.25
+    assert arrivals[-1] >= 0.4
+
+
+def test_eligibility_stream_ends_with_parsed_result(run, app_client, monkeypatch):
+    monkeypatch.setattr(ai, "model", FakeStreamingModel(["Eligible: Yes\n", "Explanation: age and ", "diagnosis match"]))
+
+    async def analyze():
+        async with app_client() as client:
+            return await client.post("/api/ai/analyze-eligibility/stream", params={
+                "patient_age": 54,
+                "patient_condition": "type 2 diabetes",
+                "patient_symptoms": "fatigue",
+                "trial_criteria": "Adults 40-65 with type 2 diabetes",
+            })
+
+    events = _events(run(analyze()).text)
+
+    assert [event for event, _ in events] == ["message", "message", "message", "done"]
+    assert events[-1][1] == {"eligible": "yes", "explanation": "age and diagnosis match", "confidence": "medium"}
+
+
+def test_stream_failure_is_reported_as_error_event(run, app_client, monkeypatch):
+    monkeypatch.setattr(ai, "model", FakeStreamingModel(["Partial "], error=RuntimeError("quota exceeded")))
+
+    async def summarize():
+        async with app_client() as client:
+            return await client.post("/api/ai/summarize/stream", json={"text": "sse test: failing upstream"})
+
+    events = _events(run(summarize()).text)
+
+    assert events[0] == ("message", {"text": "Partial "})
+    assert events[-1][0] == "error"
+    assert "quota exceeded" in events[-1][1]["detail"]
+    assert ai.summary_cache.get(ai.summary_cache_key("sse test: failing upstream")) is None
+
+
+def test_empty_stream_is_an_error_and_not_cached(run, app_client, monkeypatch):
+    # Every chunk is text-less, as when Gemini blocks the answer for safety
+    fake = FakeStreamingModel([None, None])
+    monkeypatch.setattr(ai, "model", fake)
+    text = "sse test: blocked answer"
+
+    async def summarize_twice():
+        async with app_client() as client:
+            first = await client.post("/api/ai/summarize/stream", json={"text": text})
+            second = await client.post("/api/ai/summarize/stream", json={"text": text})
+        return first, second
+
+    first, second = run(summarize_twice())
+
+    assert _events(first.text) == [("error", {"detail": "Summarization failed: the model returned no text"})]
+    assert ai.summary_cache.get(ai.summary_cache_key(text)) is None
+    # Nothing was cached, so the repeat request asks the model again
+    assert _events(second.text)[-1][0] == "error"
+    assert len(fake.calls) == 2
@@ -0,0 +1,66 @@
+"""
+Batched summarization: cache separation from single summaries and request size limits
+"""
+import re
+
+from routers import ai
+from schemas import AI_SUMMARIZE_BATCH_MAX_TEXTS
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeBatchModel:
+    """
+    Answers packed prompts with one <<<SUMMARY n>>> block per document and
+    single prompts with one summary
+    """
+
+    def __init__(self):
+        self.prompts = []
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        self.prompts.append(prompt)
+        documents = re.findall(r"<<<DOC (\d+)>>>", prompt)
+        if documents:
+            return FakeResponse("\n".join(f"<<<SUMMARY {n}>>>\nbatch summary {n}" for n in documents))
+        return FakeResponse("single summary")
+
+
+def test_batch_summaries_are_not_served_as_single_summaries(run, app_client, monkeypatch):
+    fake = FakeBatchModel()
+    monkeypatch.setattr(ai, "model", fake)
+    texts = ["batch test: first abstract", "batch test: second abstract"]
+
+    async def calls():
+        async with app_client() as client:
+            batch = await client.post("/api/ai/summarize/batch", json={"items": [{"text": t} for t in texts]})
+            repeat = await client.post("/api/ai/summarize/batch", json={"items": [{"text": t} for t in texts]})
+            single = await client.post("/api/ai/summarize", json={"text": texts[0]})
+        return batch, repeat, single
+
+    batch, repeat, single = run(calls())
+
+    assert [item["summary"] for item in batch.json()["summaries"]] == ["batch summary 1", "batch summary 2"]
+    assert len(fake.prompts) == 2  # one packed call, then the single summary below
+    # The batch endpoint reuses its own results...
+    assert repeat.json() == batch.json()
+    # ...but /summarize only serves summaries made with its own prompt
+    assert single.json() == {"summary": "single summary"}
+    assert ai.summary_cache.get(ai.summary_cache_key(texts[1])) is None
+    assert ai.summary_cache.get(ai.summary_cache_key(texts[1], ai.BATCH_SUMMARY_PROMPT_VERSION)) == "batch summary 2"
+
+
+def test_oversized_batch_is_rejected(run, app_client, monkeypatch):
+    fake = FakeBatchModel()
+    monkeypatch.setattr(ai, "model", fake)
+    items = [{"text": f"batch test: text {n}"} for n in range(AI_SUMMARIZE_BATCH_MAX_TEXTS + 1)]
+
+    async def call():
+        async with app_client() as client:
+            return await client.post("/api/ai/summarize/batch", json={"items": items})
+
+    assert run(call()).status_code == 422
+    assert fake.prompts == []
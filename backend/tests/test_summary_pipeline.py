@@ -0,0 +1,63 @@
+"""
+Background summarization of cached external records
+"""
+import asyncio
+
+from database import SessionLocal
+from models import ExternalPublication
+from routers import ai
+from summary_pipeline import SummaryPipeline
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self._text = text
+
+    @property
+    def text(self) -> str:
+        # Like a safety-blocked Gemini response, which has no text to return
+        if "BLOCKED" in self._text:
+            raise ValueError("response was blocked")
+        return f"Summary of: {self._text[-40:]}"
+
+
+class FakeModel:
+    def __init__(self):
+        self.prompts = []
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        self.prompts.append(prompt)
+        return FakeResponse(prompt.strip())
+
+
+def test_failed_rows_are_retried_a_bounded_number_of_times(run, monkeypatch):
+    fake = FakeModel()
+    monkeypatch.setattr(ai, "model", fake)
+    db = SessionLocal()
+    db.add_all([
+        ExternalPublication(external_id="pipeline-ok", source="pubmed", title="ok", abstract="pipeline fine abstract"),
+        ExternalPublication(external_id="pipeline-blocked", source="pubmed", title="blocked", abstract="pipeline BLOCKED abstract"),
+    ])
+    db.commit()
+
+    pipeline = SummaryPipeline(scan_interval=0.02)
+
+    async def run_pipeline():
+        pipeline.start()
+        await asyncio.sleep(0.5)  # many scan intervals
+        await pipeline.stop()
+
+    run(run_pipeline())
+
+    calls = lambda marker: sum(marker in prompt for prompt in fake.prompts)
+    assert calls("pipeline fine abstract") == 1
+    assert calls("pipeline BLOCKED abstract") == pipeline.max_attempts
+
+    db.expire_all()
+    rows = {row.external_id: row for row in db.query(ExternalPublication).filter(
+        ExternalPublication.external_id.in_(["pipeline-ok", "pipeline-blocked"]))}
+    assert rows["pipeline-ok"].ai_summary.startswith("Summary of:")
+    assert rows["pipeline-ok"].summary_failures is None
+    assert rows["pipeline-blocked"].ai_summary is None
+    assert rows["pipeline-blocked"].summary_failures == pipeline.max_attempts
+    db.close()
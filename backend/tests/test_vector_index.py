@@ -0,0 +1,50 @@
+"""
+Semantic search index shared by several worker processes
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from vector_index import HashingEmbedder, VectorIndex
+
+
+def _add_rows(directory: str, worker: int, rows: int, batch: int):
+    # Each worker process opens the index itself, as a uvicorn worker does at import
+    index = VectorIndex(directory, HashingEmbedder())
+    for start in range(0, rows, batch):
+        row_ids = [worker * 100000 + n for n in range(start, start + batch)]
+        index.add("trial", row_ids, [f"worker {worker} trial {n} asthma inhaler" for n in row_ids])
+
+
+def test_workers_appending_concurrently_keep_every_row(tmp_path):
+    directory = str(tmp_path)
+    workers, rows, batch = 4, 600, 25  # 2400 rows: the files are regrown past 1024 and 2048
+    reader = VectorIndex(directory, HashingEmbedder())
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as pool:
+        list(pool.map(_add_rows, [directory] * workers, range(workers), [rows] * workers, [batch] * workers))
+
+    reopened = VectorIndex(directory, HashingEmbedder())
+    assert reopened.count == workers * rows
+    expected = {("trial", worker * 100000 + n) for worker in range(workers) for n in range(rows)}
+    assert all(item in reopened for item in expected)
+
+    # A process that was already running picks up the other workers' rows on its next search
+    results = reader.search("worker 2 trial 200007 asthma inhaler", k=1)
+    assert reader.count == workers * rows
+    assert results[0][:2] == ("trial", 200007)
+
+
+def test_workers_replace_and_append_without_clobbering(tmp_path):
+    first = VectorIndex(str(tmp_path), HashingEmbedder())
+    second = VectorIndex(str(tmp_path), HashingEmbedder())
+    first.add("publication", [7], ["statins and cholesterol"])
+    # Replaces the first worker's row 7 and appends row 9 after it
+    second.add("publication", [7, 9], ["statins and muscle pain", "ace inhibitors and cough"])
+    # A stale row count here would land on row 9's slot
+    first.add("publication", [8], ["beta blockers and fatigue"])
+
+    reopened = VectorIndex(str(tmp_path), HashingEmbedder())
+    assert reopened.count == 3
+    assert reopened.search("statins and muscle pain", k=1)[0][:2] == ("publication", 7)
+    assert reopened.search("ace inhibitors and cough", k=1)[0][:2] == ("publication", 9)
+    assert reopened.search("beta blockers and fatigue", k=1)[0][:2] == ("publication", 8)
@@ -0,0 +1,400 @@
+"""
+Local semantic search: text embeddings for cached external trials and
+publications, stored in a memory-mapped float32 matrix.
+
+The index directory may be shared by several worker processes: appends
+take an exclusive file lock and first pick up rows other workers added.
+Where file locks are unavailable (Windows), only a single worker may
+write, so the indexer is disabled when WEB_CONCURRENCY is above 1.
+"""
+import json
+import os
+import re
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import ExternalPublication, ExternalTrial
+
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "./vector_index")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL")  # sentence-transformers model name; hashing embedder if unset
+# Search is a memory-bandwidth-bound scan: 1M x 96 float32 is ~40 ms on one core
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "96"))
+VECTOR_SEARCH_CHUNK_ROWS = int(os.getenv("VECTOR_SEARCH_CHUNK_ROWS", "65536"))
+# Worker processes serving the app (uvicorn's --workers defaults to it)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+# kind -> (model, external key column, code stored in the id map)
+SOURCES = {
+    "trial": (ExternalTrial, ExternalTrial.nct_id, 1),
+    "publication": (ExternalPublication, ExternalPublication.external_id, 2),
+}
+_KIND_BY_CODE = {code: kind for kind, (_, _, code) in SOURCES.items()}
+_ID_BITS = 40
+
+# Lay phrases rewritten to the clinical term before hashing, so both embed alike
+MEDICAL_SYNONYMS = {
+    "heart attack": "myocardial infarction",
+    "high blood pressure": "hypertension",
+    "low blood pressure": "hypotension",
+    "high cholesterol": "hypercholesterolemia",
+    "high blood sugar": "hyperglycemia",
+    "low blood sugar": "hypoglycemia",
+    "sugar diabetes": "diabetes mellitus",
+    "brain attack": "stroke",
+    "mini stroke": "transient ischemic attack",
+    "kidney failure": "renal failure",
+    "kidney disease": "renal disease",
+    "liver cancer": "hepatocellular carcinoma",
+    "skin cancer": "melanoma",
+    "blood cancer": "leukemia",
+    "blood clot": "thrombosis",
+    "heart failure": "cardiac failure",
+    "irregular heartbeat": "arrhythmia",
+    "shortness of breath": "dyspnea",
+    "memory loss": "dementia",
+    "bone loss": "osteoporosis",
+    "joint pain": "arthralgia",
+    "migraine headache": "migraine",
+    "stomach ulcer": "peptic ulcer",
+}
+_SYNONYM_PATTERN = re.compile(r"\b(" + "|".join(map(re.escape, MEDICAL_SYNONYMS)) + r")\b")
+
+
+class HashingEmbedder:
+    """
+    Offline fallback embedder: signed feature hashing of words, word bigrams
+    and character trigrams with sublinear term frequency, L2-normalized
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> Dict[Tuple[str, float], int]:
+        """
+        Counts of (feature, weight): words weigh 1, bigrams 0.5 and trigrams 0.25
+        """
+        text = _SYNONYM_PATTERN.sub(lambda match: MEDICAL_SYNONYMS[match.group(1)], text.lower())
+        words = re.findall(r"[a-z0-9]+", text)
+        features: Dict[Tuple[str, float], int] = {}
+        for word in words:
+            features[(word, 1.0)] = features.get((word, 1.0), 0) + 1
+            # Trigrams let "diabetic" and "diabetes" share most of their features
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                gram = ("#" + padded[i:i + 3], 0.25)
+                features[gram] = features.get(gram, 0) + 1
+        for first, second in zip(words, words[1:]):
+            bigram = (f"{first} {second}", 0.5)
+            features[bigram] = features.get(bigram, 0) + 1
+        return features
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for (feature, weight), count in self._features(text or "").items():
+                h = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if h & 0x80000000 else -1.0
+                vectors[row, h % self.dim] += sign * weight * (1.0 + np.log(count))
+        return _normalize(vectors)
+
+
+class SentenceTransformerEmbedder:
+    """
+    Local neural embedder from the optional sentence-transformers package
+    """
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"st-{model_name}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return _normalize(np.asarray(self.model.encode(texts), dtype=np.float32))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def get_embedder():
+    """
+    The configured local embedder, falling back to hashing so search works offline
+    """
+    if EMBEDDING_MODEL:
+        try:
+            return SentenceTransformerEmbedder(EMBEDDING_MODEL)
+        except Exception as e:
+            print(f"⚠️ WARNING: Could not load embedding model {EMBEDDING_MODEL} ({e}). Using hashing embedder.")
+    return HashingEmbedder(EMBEDDING_DIM)
+
+
+class VectorIndex:
+    """
+    Unit vectors in a memory-mapped float32 matrix (vectors.f32) plus an
+    int64 id map (keys.i64, kind code << 40 | row id), grown by doubling.
+    Search is an exact, chunked matrix-vector cosine scan.
+
+    meta.json holds the committed row count. Writers append under an
+    exclusive lock on index.lock after reloading it, so processes sharing
+    the directory never write over each other's rows.
+    """
+
+    def __init__(self, directory: str, embedder):
+        self.directory = directory
+        self.embedder = embedder
+        self.dim = embedder.dim
+        self._lock = threading.Lock()
+        self._rows: Dict[int, int] = {}
+        os.makedirs(directory, exist_ok=True)
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._lock_path = os.path.join(directory, "index.lock")
+        self._meta_seen = None
+        self.count = 0
+        with self._exclusive():
+            meta = self._read_meta()
+            if meta.get("embedder") != embedder.name or meta.get("dim") != self.dim:
+                # Vectors from another embedder are not comparable; start over and let backfill() refill
+                self._open(1024)
+                self._write_meta()
+            else:
+                self._open(max(meta["capacity"], 1024))
+                self._refresh()
+
+    @contextmanager
+    def _exclusive(self):
+        """
+        Hold the index's cross-process write lock (a no-op without fcntl)
+        """
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _meta_signature(self):
+        try:
+            stat = os.stat(self._meta_path)
+        except OSError:
+            return None
+        # meta.json is replaced, never rewritten in place, so its inode changes on every write
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _refresh(self):
+        """
+        Map the rows other processes committed since this one last looked
+        """
+        self._meta_seen = self._meta_signature()
+        meta = self._read_meta()
+        count = meta.get("count", 0)
+        if meta.get("embedder") != self.embedder.name or count <= self.count:
+            return
+        if max(meta["capacity"], count) > self.capacity:
+            self._open(max(meta["capacity"], count))
+        keys = self.keys[self.count:count]
+        for row, key in enumerate(keys.tolist(), start=self.count):
+            self._rows[key] = row
+        self.kinds[self.count:count] = keys >> _ID_BITS
+        self.count = count
+
+    def refresh(self):
+        """
+        Pick up vectors added by other worker processes, if meta.json changed
+        """
+        with self._lock:
+            if self._meta_signature() != self._meta_seen:
+                self._refresh()
+
+    def _read_meta(self) -> dict:
+        try:
+            with open(self._meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self):
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"embedder": self.embedder.name, "dim": self.dim,
+                       "count": self.count, "capacity": self.capacity}, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def _map(self, name: str, dtype, shape: Tuple[int, ...]) -> np.memmap:
+        path = os.path.join(self.directory, name)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        mode = "r+b" if os.path.exists(path) else "w+b"
+        with open(path, mode) as f:
+            if os.fstat(f.fileno()).st_size < size:
+                f.truncate(size)
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def _open(self, capacity: int):
+        self.capacity = capacity
+        self.vectors = self._map("vectors.f32", np.float32, (capacity, self.dim))
+        self.keys = self._map("keys.i64", np.int64, (capacity,))
+        # Kind codes kept in memory so filtered searches do not decode the id map
+        self.kinds = np.zeros(capacity, dtype=np.int8)
+        self.kinds[:self.count] = self.keys[:self.count] >> _ID_BITS
+
+    @staticmethod
+    def _key(kind: str, row_id: int) -> int:
+        return (SOURCES[kind][2] << _ID_BITS) | row_id
+
+    def __contains__(self, item: Tuple[str, int]) -> bool:
+        return self._key(*item) in self._rows
+
+    def add(self, kind: str, row_ids: List[int], texts: List[str]):
+        """
+        Embed `texts` and insert or replace the vectors of the given rows
+        """
+        if not row_ids:
+            return
+        vectors = self.embedder.embed(texts)
+        with self._lock, self._exclusive():
+            self._refresh()
+            for row_id, vector in zip(row_ids, vectors):
+                key = self._key(kind, row_id)
+                row = self._rows.get(key)
+                if row is None:
+                    if self.count == self.capacity:
+                        self.vectors.flush()
+                        self.keys.flush()
+                        self._open(self.capacity * 2)
+                    row = self.count
+                    self.count += 1
+                    self._rows[key] = row
+                    self.keys[row] = key
+                    self.kinds[row] = SOURCES[kind][2]
+                self.vectors[row] = vector
+            self.vectors.flush()
+            self.keys.flush()
+            self._write_meta()
+            self._meta_seen = self._meta_signature()
+
+    def search(self, text: str, k: int = 10, kind: Optional[str] = None) -> List[Tuple[str, int, float]]:
+        """
+        Top-k (kind, row id, cosine similarity) for `text`, best first
+        """
+        self.refresh()
+        with self._lock:
+            count, vectors, keys, kinds = self.count, self.vectors, self.keys, self.kinds
+        if count == 0:
+            return []
+        query = self.embedder.embed([text])[0]
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, VECTOR_SEARCH_CHUNK_ROWS):
+            end = min(start + VECTOR_SEARCH_CHUNK_ROWS, count)
+            np.dot(vectors[start:end], query, out=scores[start:end])
+        if kind is not None:
+            scores[kinds[:count] != SOURCES[kind][2]] = -np.inf
+        k = min(k, count)
+        top = np.argpartition(scores, count - k)[count - k:]
+        top = top[np.argsort(-scores[top])]
+        mask = (1 << _ID_BITS) - 1
+        return [
+            (_KIND_BY_CODE[int(keys[row]) >> _ID_BITS], int(keys[row]) & mask, float(scores[row]))
+            for row in top if np.isfinite(scores[row])
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "embedder": self.embedder.name,
+            "dim": self.dim,
+            "vectors": self.count,
+            "capacity": self.capacity,
+        }
+
+
+def _record_text(kind: str, record) -> str:
+    if kind == "trial":
+        return " ".join(filter(None, [record.title, record.condition, record.description]))
+    return " ".join(filter(None, [record.title, record.abstract]))
+
+
+def index_records(db: Session, kind: str, keys: List[str]):
+    """
+    Embed cached records of `kind` by external key (NCT number or PubMed ID)
+    """
+    if not keys:
+        return
+    model, key_column, _ = SOURCES[kind]
+    records = db.query(model).filter(key_column.in_(keys)).all()
+    vector_index.add(kind, [record.id for record in records], [_record_text(kind, record) for record in records])
+
+
+def _index_in_new_session(kind: str, keys: List[str]):
+    db = SessionLocal()
+    try:
+        index_records(db, kind, keys)
+    except Exception as e:
+        print(f"Vector indexing failed for {kind} records: {e}")
+    finally:
+        db.close()
+
+
+def enqueue(kind: str, keys: List[str]):
+    """
+    Embed freshly ingested records on the indexing thread, off the request path
+    """
+    if keys and INDEX_WRITER_ENABLED:
+        _indexer.submit(_index_in_new_session, kind, list(keys))
+
+
+def backfill(batch_size: int = 500):
+    """
+    Embed cached records that have no vector yet (e.g. rows from before the
+    index existed, or after switching embedders)
+    """
+    db = SessionLocal()
+    try:
+        vector_index.refresh()
+        for kind, (model, _, _) in SOURCES.items():
+            missing = [row_id for (row_id,) in db.query(model.id) if (kind, row_id) not in vector_index]
+            for start in range(0, len(missing), batch_size):
+                records = db.query(model).filter(model.id.in_(missing[start:start + batch_size])).all()
+                vector_index.add(kind, [record.id for record in records],
+                                 [_record_text(kind, record) for record in records])
+    except Exception as e:
+        print(f"Vector index backfill failed: {e}")
+    finally:
+        db.close()
+
+
+vector_index = VectorIndex(VECTOR_INDEX_DIR, get_embedder())
+# One worker thread: embedding is CPU-bound and the index has a single writer per process
+_indexer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vector-index")
+# Without file locks, several worker processes would write over each other's rows
+INDEX_WRITER_ENABLED = fcntl is not None or WEB_CONCURRENCY <= 1
+if not INDEX_WRITER_ENABLED:
+    print("⚠️ WARNING: File locks are unavailable and WEB_CONCURRENCY > 1; the semantic search index is read-only.")
+
+
+def start_backfill():
+    if INDEX_WRITER_ENABLED:
+        _indexer.submit(backfill)
+
+
+def stop():
+    """
+    Drop pending indexing work on shutdown; backfill() catches up on the next start
+    """
+    _indexer.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,32 @@
+import { useState } from 'react';
+
+function LoadMore({ nextCursor, onLoad, label = 'Load more' }) {
+  const [loading, setLoading] = useState(false);
+
+  if (!nextCursor) {
+    return null;
+  }
+
+  const handleClick = async () => {
+    setLoading(true);
+    try {
+      await onLoad(nextCursor);
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  return (
+    <div className="flex justify-center mt-6">
+      <button
+        onClick={handleClick}
+        disabled={loading}
+        className="px-6 py-3 bg-white border-2 border-gray-300 text-gray-700 rounded-lg hover:border-primary hover:text-primary transition-colors font-medium disabled:opacity-50 disabled:cursor-not-allowed"
+      >
+        {loading ? 'Loading...' : label}
+      </button>
+    </div>
+  );
+}
+
+export default LoadMore;
@@ -3,15 +3,17 @@ import { useNavigate } from 'react-router-dom';
 import api from '../services/api';
 import Loader from '../components/Loader';
 import Toast from '../components/Toast';
+import LoadMore from '../components/LoadMore';
 
 function Collaborators() {
   const navigate = useNavigate();
   const [user, setUser] = useState(null);
   const [collaborators, setCollaborators] = useState([]);
-  const [connections, setConnections] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [toast, setToast] = useState(null);
   const [searchSpecialty, setSearchSpecialty] = useState('');
+  const [activeSpecialty, setActiveSpecialty] = useState('');
 
   useEffect(() => {
     const userData = JSON.parse(localStorage.getItem('user'));
@@ -25,12 +27,10 @@ function Collaborators() {
 
   const loadData = async (userData) => {
     try {
-      const [collabData, connData] = await Promise.all([
-        api.getCollaborators(userData.id),
-        api.getConnections(userData.id)
-      ]);
-      setCollaborators(collabData);
-      setConnections(connData);
+      // Each collaborator comes with the status of any connection to this user
+      const page = await api.getCollaborators(userData.id, activeSpecialty);
+      setCollaborators(page.items);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Error loading data:', error);
       setToast({ message: 'Failed to load collaborators', type: 'error' });
@@ -42,14 +42,26 @@ function Collaborators() {
     if (!user) return;
     setLoading(true);
     try {
-      const data = await api.getCollaborators(user.id, searchSpecialty);
-      setCollaborators(data);
+      const page = await api.getCollaborators(user.id, searchSpecialty);
+      setCollaborators(page.items);
+      setNextCursor(page.nextCursor);
+      setActiveSpecialty(searchSpecialty);
     } catch (error) {
       setToast({ message: 'Search failed', type: 'error' });
     }
     setLoading(false);
   };
 
+  const loadMoreCollaborators = async (cursor) => {
+    try {
+      const page = await api.getCollaborators(user.id, activeSpecialty, cursor);
+      setCollaborators(current => [...current, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      setToast({ message: 'Failed to load more collaborators', type: 'error' });
+    }
+  };
+
   const handleConnect = async (collaboratorId) => {
     try {
       await api.createConnection({
@@ -64,12 +76,7 @@ function Collaborators() {
     }
   };
 
-  const getConnectionStatus = (collaboratorId) => {
-    const conn = connections.find(c => 
-      (c.requester_id === collaboratorId || c.receiver_id === collaboratorId)
-    );
-    return conn?.status;
-  };
+  const connected = collaborators.filter(c => c.connection_status === 'accepted');
 
   if (loading) {
     return <Loader text="Loading collaborators..." />;
@@ -111,20 +118,16 @@ function Collaborators() {
         <div className="mb-8">
           <h2 className="text-2xl font-bold text-gray-900 mb-4">My Connections</h2>
           <div className="grid md:grid-cols-2 lg:grid-cols-4 gap-4">
-            {connections.filter(c => c.status === 'accepted').map(conn => {
-              const collabId = conn.requester_id === user.id ? conn.receiver_id : conn.requester_id;
-              const collab = collaborators.find(c => c.id === collabId);
-              return collab ? (
-                <div key={conn.id} className="bg-white rounded-xl p-4 shadow-md">
-                  <div className="w-12 h-12 bg-green-100 rounded-full flex items-center justify-center mb-2">
-                    <span className="text-2xl">✓</span>
-                  </div>
-                  <h3 className="font-semibold text-gray-900">{collab.name}</h3>
-                  <p className="text-sm text-gray-600 truncate">{collab.specialties}</p>
+            {connected.map(collab => (
+              <div key={collab.id} className="bg-white rounded-xl p-4 shadow-md">
+                <div className="w-12 h-12 bg-green-100 rounded-full flex items-center justify-center mb-2">
+                  <span className="text-2xl">✓</span>
                 </div>
-              ) : null;
-            })}
-            {connections.filter(c => c.status === 'accepted').length === 0 && (
+                <h3 className="font-semibold text-gray-900">{collab.name}</h3>
+                <p className="text-sm text-gray-600 truncate">{collab.specialties}</p>
+              </div>
+            ))}
+            {connected.length === 0 && (
               <p className="text-gray-600 col-span-4">No connections yet</p>
             )}
           </div>
@@ -134,7 +137,7 @@ function Collaborators() {
         <h2 className="text-2xl font-bold text-gray-900 mb-6">Potential Collaborators</h2>
         <div className="grid md:grid-cols-2 lg:grid-cols-3 gap-6">
           {collaborators.map(collab => {
-            const status = getConnectionStatus(collab.id);
+            const status = collab.connection_status;
             return (
               <div key={collab.id} className="bg-white rounded-2xl p-6 shadow-md hover:shadow-xl transition-all">
                 <div className="flex items-start gap-4 mb-4">
@@ -206,6 +209,7 @@ function Collaborators() {
             </div>
           )}
         </div>
+        <LoadMore nextCursor={nextCursor} onLoad={loadMoreCollaborators} label="Load more collaborators" />
       </div>
     </div>
   );
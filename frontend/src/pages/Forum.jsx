@@ -3,11 +3,13 @@ import { useNavigate } from 'react-router-dom';
 import api from '../services/api';
 import Loader from '../components/Loader';
 import Toast from '../components/Toast';
+import LoadMore from '../components/LoadMore';
 
 function Forum() {
   const navigate = useNavigate();
   const [user, setUser] = useState(null);
   const [posts, setPosts] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [toast, setToast] = useState(null);
   const [newPost, setNewPost] = useState('');
@@ -24,14 +26,25 @@ function Forum() {
 
   const loadPosts = async () => {
     try {
-      const data = await api.getForumPosts();
-      setPosts(data);
+      const page = await api.getForumPosts();
+      setPosts(page.items);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Error loading posts:', error);
     }
     setLoading(false);
   };
 
+  const loadMorePosts = async (cursor) => {
+    try {
+      const page = await api.getForumPosts(null, cursor);
+      setPosts(current => [...current, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      setToast({ message: 'Failed to load more posts', type: 'error' });
+    }
+  };
+
   const handleSubmitPost = async (e) => {
     e.preventDefault();
     if (!newPost.trim()) return;
@@ -122,6 +135,7 @@ function Forum() {
               </div>
             ))
           )}
+          <LoadMore nextCursor={nextCursor} onLoad={loadMorePosts} label="Load older posts" />
         </div>
       </div>
     </div>
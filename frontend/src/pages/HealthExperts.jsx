@@ -3,11 +3,14 @@ import { useNavigate } from 'react-router-dom';
 import * as api from '../services/api';
 import Loader from '../components/Loader';
 import Toast from '../components/Toast';
+import LoadMore from '../components/LoadMore';
 
 function HealthExperts() {
   const navigate = useNavigate();
   const [user, setUser] = useState(null);
   const [experts, setExperts] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [expertsCondition, setExpertsCondition] = useState(null);
   const [loading, setLoading] = useState(true);
   const [toast, setToast] = useState(null);
   const [searchCondition, setSearchCondition] = useState('');
@@ -31,8 +34,10 @@ function HealthExperts() {
 
   const loadExperts = async (condition = null) => {
     try {
-      const data = await api.getHealthExperts(condition);
-      setExperts(data);
+      const page = await api.getHealthExperts(condition);
+      setExperts(page.items);
+      setNextCursor(page.nextCursor);
+      setExpertsCondition(condition);
     } catch (error) {
       console.error('Error loading experts:', error);
       setToast({ message: 'Failed to load experts', type: 'error' });
@@ -40,6 +45,16 @@ function HealthExperts() {
     setLoading(false);
   };
 
+  const loadMoreExperts = async (cursor) => {
+    try {
+      const page = await api.getHealthExperts(expertsCondition, null, cursor);
+      setExperts(current => [...current, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      setToast({ message: 'Failed to load more experts', type: 'error' });
+    }
+  };
+
   const handleAIMatch = async () => {
     if (!user.condition) {
       setToast({ message: 'Please set your condition in profile', type: 'error' });
@@ -268,6 +283,7 @@ function HealthExperts() {
             </div>
           )}
         </div>
+        <LoadMore nextCursor={nextCursor} onLoad={loadMoreExperts} label="Load more experts" />
       </div>
     </div>
   );
@@ -3,12 +3,15 @@ import { useNavigate } from 'react-router-dom';
 import api from '../services/api';
 import Card from '../components/Card';
 import Loader from '../components/Loader';
+import LoadMore from '../components/LoadMore';
 
 function PatientDashboard() {
   const navigate = useNavigate();
   const [user, setUser] = useState(null);
   const [trials, setTrials] = useState([]);
+  const [trialsCursor, setTrialsCursor] = useState(null);
   const [publications, setPublications] = useState([]);
+  const [hasMorePublications, setHasMorePublications] = useState(false);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -43,7 +46,8 @@ function PatientDashboard() {
         external: true
       }));
       
-      setTrials([...internalTrials, ...formattedExternalTrials]);
+      setTrials([...internalTrials.items, ...formattedExternalTrials]);
+      setTrialsCursor(internalTrials.nextCursor);
       
       // Combine and format publications
       const formattedExternalPubs = externalPubs.map((pub, index) => ({
@@ -56,13 +60,24 @@ function PatientDashboard() {
         external: true
       }));
       
-      setPublications([...internalPubs, ...formattedExternalPubs]);
+      setPublications([...internalPubs.items, ...formattedExternalPubs]);
+      setHasMorePublications(Boolean(internalPubs.nextCursor));
     } catch (error) {
       console.error('Error loading data:', error);
     }
     setLoading(false);
   };
 
+  const loadMoreTrials = async (cursor) => {
+    try {
+      const page = await api.getTrials(user.condition, null, null, cursor);
+      setTrials(current => [...current, ...page.items]);
+      setTrialsCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error loading trials:', error);
+    }
+  };
+
   const handleSummarize = async (text) => {
     const result = await api.summarizeText(text);
     return result.summary;
@@ -88,7 +103,7 @@ function PatientDashboard() {
           <div className="flex justify-between items-center mb-6">
             <h2 className="text-3xl font-bold text-gray-900">🔬 Recommended Clinical Trials</h2>
             <span className="bg-blue-100 text-blue-700 px-4 py-2 rounded-full font-semibold">
-              {trials.length} trials found
+              {trials.length}{trialsCursor ? '+' : ''} trials found
             </span>
           </div>
           
@@ -108,6 +123,7 @@ function PatientDashboard() {
               ))}
             </div>
           )}
+          <LoadMore nextCursor={trialsCursor} onLoad={loadMoreTrials} label="Load more trials" />
         </div>
 
         {/* Publications Section */}
@@ -115,7 +131,7 @@ function PatientDashboard() {
           <div className="flex justify-between items-center mb-6">
             <h2 className="text-3xl font-bold text-gray-900">📚 Latest Research Publications</h2>
             <span className="bg-purple-100 text-purple-700 px-4 py-2 rounded-full font-semibold">
-              {publications.length} publications
+              {publications.length}{hasMorePublications ? '+' : ''} publications
             </span>
           </div>
           
@@ -3,12 +3,15 @@ import { useNavigate } from 'react-router-dom';
 import api from '../services/api';
 import Loader from '../components/Loader';
 import Toast from '../components/Toast';
+import LoadMore from '../components/LoadMore';
 
 function ResearcherDashboard() {
   const navigate = useNavigate();
   const [user, setUser] = useState(null);
   const [trials, setTrials] = useState([]);
+  const [trialsCursor, setTrialsCursor] = useState(null);
   const [publications, setPublications] = useState([]);
+  const [publicationsCursor, setPublicationsCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [toast, setToast] = useState(null);
   const [showTrialForm, setShowTrialForm] = useState(false);
@@ -43,20 +46,42 @@ function ResearcherDashboard() {
 
   const loadData = async (userData) => {
     try {
-      const [trialsData, pubsData] = await Promise.all([
-        api.getTrials(),
-        api.getPublications()
+      // Only this researcher's trials and publications, first page of each
+      const [trialsPage, pubsPage] = await Promise.all([
+        api.getTrials(null, null, userData.id),
+        api.getPublications(userData.id)
       ]);
       
-      // Filter by researcher if they have an ID
-      setTrials(userData.id ? trialsData.filter(t => t.researcher_id === userData.id) : trialsData);
-      setPublications(userData.id ? pubsData.filter(p => p.researcher_id === userData.id) : pubsData);
+      setTrials(trialsPage.items);
+      setTrialsCursor(trialsPage.nextCursor);
+      setPublications(pubsPage.items);
+      setPublicationsCursor(pubsPage.nextCursor);
     } catch (error) {
       console.error('Error loading data:', error);
     }
     setLoading(false);
   };
 
+  const loadMoreTrials = async (cursor) => {
+    try {
+      const page = await api.getTrials(null, null, user.id, cursor);
+      setTrials(current => [...current, ...page.items]);
+      setTrialsCursor(page.nextCursor);
+    } catch (error) {
+      setToast({ message: 'Failed to load trials', type: 'error' });
+    }
+  };
+
+  const loadMorePublications = async (cursor) => {
+    try {
+      const page = await api.getPublications(user.id, cursor);
+      setPublications(current => [...current, ...page.items]);
+      setPublicationsCursor(page.nextCursor);
+    } catch (error) {
+      setToast({ message: 'Failed to load publications', type: 'error' });
+    }
+  };
+
   const handleCreateTrial = async (e) => {
     e.preventDefault();
     try {
@@ -205,7 +230,7 @@ function ResearcherDashboard() {
 
         {/* My Trials */}
         <div className="mb-8">
-          <h2 className="text-3xl font-bold text-gray-900 mb-6">🔬 My Clinical Trials ({trials.length})</h2>
+          <h2 className="text-3xl font-bold text-gray-900 mb-6">🔬 My Clinical Trials ({trials.length}{trialsCursor ? '+' : ''})</h2>
           <div className="grid md:grid-cols-2 lg:grid-cols-3 gap-6">
             {trials.map(trial => (
               <div key={trial.id} className="bg-white rounded-2xl p-6 shadow-md hover:shadow-xl transition-all">
@@ -223,11 +248,12 @@ function ResearcherDashboard() {
               </div>
             )}
           </div>
+          <LoadMore nextCursor={trialsCursor} onLoad={loadMoreTrials} label="Load more trials" />
         </div>
 
         {/* My Publications */}
         <div>
-          <h2 className="text-3xl font-bold text-gray-900 mb-6">📚 My Publications ({publications.length})</h2>
+          <h2 className="text-3xl font-bold text-gray-900 mb-6">📚 My Publications ({publications.length}{publicationsCursor ? '+' : ''})</h2>
           <div className="grid md:grid-cols-2 lg:grid-cols-3 gap-6">
             {publications.map(pub => (
               <div key={pub.id} className="bg-white rounded-2xl p-6 shadow-md hover:shadow-xl transition-all">
@@ -241,6 +267,7 @@ function ResearcherDashboard() {
               </div>
             )}
           </div>
+          <LoadMore nextCursor={publicationsCursor} onLoad={loadMorePublications} label="Load more publications" />
         </div>
       </div>
     </div>
@@ -9,6 +9,14 @@ const api = axios.create({
   },
 });
 
+// List endpoints return one page at a time, newest first. Each list call
+// resolves to { items, nextCursor }; pass nextCursor back to load the next
+// page (it is null on the last page).
+const getPage = async (url, params = {}, cursor = null) => {
+  const response = await api.get(url, { params: cursor ? { ...params, cursor } : params });
+  return { items: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+};
+
 // ============ User Endpoints ============
 export const createUser = async (userData) => {
   const response = await api.post('/users/signup', userData);
@@ -33,10 +41,9 @@ export const loginUser = async (email = null, name = null) => {
   return response.data;
 };
 
-export const getAllUsers = async (role = null) => {
+export const getAllUsers = async (role = null, cursor = null) => {
   const params = role ? { role } : {};
-  const response = await api.get('/users/', { params });
-  return response.data;
+  return getPage('/users/', params, cursor);
 };
 
 // ============ Trial Endpoints ============
@@ -45,12 +52,12 @@ export const createTrial = async (trialData) => {
   return response.data;
 };
 
-export const getTrials = async (condition = null, location = null) => {
+export const getTrials = async (condition = null, location = null, researcherId = null, cursor = null) => {
   const params = {};
   if (condition) params.condition = condition;
   if (location) params.location = location;
-  const response = await api.get('/trials/', { params });
-  return response.data;
+  if (researcherId) params.researcher_id = researcherId;
+  return getPage('/trials/', params, cursor);
 };
 
 export const getTrial = async (trialId) => {
@@ -74,10 +81,9 @@ export const createPublication = async (publicationData) => {
   return response.data;
 };
 
-export const getPublications = async (researcherId = null) => {
+export const getPublications = async (researcherId = null, cursor = null) => {
   const params = researcherId ? { researcher_id: researcherId } : {};
-  const response = await api.get('/publications/', { params });
-  return response.data;
+  return getPage('/publications/', params, cursor);
 };
 
 export const getPublication = async (publicationId) => {
@@ -101,10 +107,9 @@ export const createForumPost = async (postData) => {
   return response.data;
 };
 
-export const getForumPosts = async (authorId = null) => {
+export const getForumPosts = async (authorId = null, cursor = null) => {
   const params = authorId ? { author_id: authorId } : {};
-  const response = await api.get('/forum/', { params });
-  return response.data;
+  return getPage('/forum/', params, cursor);
 };
 
 export const getForumPost = async (postId) => {
@@ -160,12 +165,11 @@ export const createConnection = async (connectionData) => {
   return response.data;
 };
 
-export const getConnections = async (userId = null, status = null) => {
+export const getConnections = async (userId = null, status = null, cursor = null) => {
   const params = {};
   if (userId) params.user_id = userId;
   if (status) params.status = status;
-  const response = await api.get('/connections/', { params });
-  return response.data;
+  return getPage('/connections/', params, cursor);
 };
 
 export const updateConnection = async (connectionId, status) => {
@@ -173,18 +177,16 @@ export const updateConnection = async (connectionId, status) => {
   return response.data;
 };
 
-export const getCollaborators = async (userId, specialty = null) => {
+export const getCollaborators = async (userId, specialty = null, cursor = null) => {
   const params = specialty ? { specialty } : {};
-  const response = await api.get(`/connections/collaborators/${userId}`, { params });
-  return response.data;
+  return getPage(`/connections/collaborators/${userId}`, params, cursor);
 };
 
-export const getHealthExperts = async (condition = null, location = null) => {
+export const getHealthExperts = async (condition = null, location = null, cursor = null) => {
   const params = {};
   if (condition) params.condition = condition;
   if (location) params.location = location;
-  const response = await api.get('/connections/experts', { params });
-  return response.data;
+  return getPage('/connections/experts', params, cursor);
 };
 
 // ============ Meeting Request Endpoints ============
@@ -193,12 +195,11 @@ export const createMeetingRequest = async (meetingData) => {
   return response.data;
 };
 
-export const getMeetingRequests = async (userId = null, status = null) => {
+export const getMeetingRequests = async (userId = null, status = null, cursor = null) => {
   const params = {};
   if (userId) params.user_id = userId;
   if (status) params.status = status;
-  const response = await api.get('/meetings/', { params });
-  return response.data;
+  return getPage('/meetings/', params, cursor);
 };
 
 export const updateMeetingRequest = async (meetingId, status) => {